@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from config import METRICS_ENABLED
+from services import metrics
+
+router = APIRouter(
+    tags=["metrics"]
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus scrape endpoint (text format 0.0.4) for this worker process.
+    """
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
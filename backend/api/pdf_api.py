@@ -1,64 +1,178 @@
-from fastapi import APIRouter, UploadFile, File
-from fastapi.responses import StreamingResponse
-from services.pdf_service import filter_pages, create_pdf_with_pages, filter_spcific_pages
-from config import KEYWORDS
-import io   
+import json
+import re
+from typing import List, Literal, Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import StreamingResponse, FileResponse, Response
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from services.abstract_service import stream_abstract
+from services.extraction_service import run_cached_extraction, resolve_keywords, locate_pages
+from services.result_cache import get_result_cache
+from services.upload_service import spool_upload, pdf_file_response, remove_file
+from config import KEYWORD_PROFILES, PDF_COMPACT_OUTPUT
 
 router = APIRouter()
 
+_DOC_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+async def _extract(file: UploadFile, mode: str, keywords: list[str], compact: bool = PDF_COMPACT_OUTPUT, index: bool = False):
+    # อ่านไฟล์เป็น chunk: ไฟล์เล็กเก็บใน memory ไฟล์ใหญ่เขียนลงดิสก์ (พร้อมคำนวณ sha256)
+    upload = await spool_upload(file)
+    try:
+        matched_pages, doc_id, pdf_path = await run_cached_extraction(upload.source, upload.sha256, mode, keywords, compact, index)
+    finally:
+        upload.cleanup()
+
+    if not matched_pages:
+        return {"message": "No pages matched keywords"}
+
+    # ส่ง document id ใน header X-PDF-UUID และ hash ของไฟล์ต้นฉบับสำหรับ /pdf-index
+    return pdf_file_response(pdf_path, {"X-PDF-UUID": doc_id, "X-Document-Hash": upload.sha256})
+
+
 @router.post("/extract-keyword-pages")
-async def extract_keyword_pages(file: UploadFile = File(...)):
+async def extract_keyword_pages(file: UploadFile = File(...), index: bool = Form(False)):
     """
     Extracts pages from a PDF file that contain specific keywords.
-    The process is done entirely in memory without writing to disk.
+    Large uploads are spooled to disk and the result is streamed back in chunks
+    (see services/upload_service.py for the memory bound).
+    PyMuPDF work runs on the PDF process pool so the event loop stays free,
+    and repeat uploads are answered from the result cache.
+    index=true also stores the page text for /pdf-index.
     """
-    # อ่านไฟล์ทั้งหมดเป็น bytes เข้าสู่ memory
-    content = await file.read()
-    
-    # สร้าง file-like object จาก bytes
-    file_obj = io.BytesIO(content)
+    keywords, mode = resolve_keywords("abstract")
+    return await _extract(file, mode, keywords, index=index)
 
+@router.post("/extract-specific-pages")
+async def extract_specific_pages(file: UploadFile = File(...), index: bool = Form(False)):
+    """
+    Extracts the last page containing "บทที่ 5" and the page after it.
+    Large uploads are spooled to disk and the result is streamed back in chunks.
+    PyMuPDF work runs on the PDF process pool so the event loop stays free,
+    and repeat uploads are answered from the result cache.
+    index=true also stores the page text for /pdf-index.
+    """
+    keywords, mode = resolve_keywords("chapter-5")
+    return await _extract(file, mode, keywords, index=index)
 
-    matched_pages = filter_pages(file_obj, KEYWORDS)
 
-    if not matched_pages:
-        return {"message": "No pages matched keywords"}
+@router.post("/extract-pages")
+async def extract_pages(
+    file: UploadFile = File(...),
+    profile: Optional[str] = Form(None),
+    keywords: Optional[List[str]] = Form(None),
+    mode: Optional[str] = Form(None),
+    compact: bool = Form(PDF_COMPACT_OUTPUT),
+    response: Literal["pdf", "pages"] = Form("pdf"),
+    index: bool = Form(False),
+):
+    """
+    General section extractor: pick a named keyword profile (see /keyword-profiles)
+    or pass keywords inline, optionally overriding the scan mode
+    ("all" or "last-occurrence").
 
-    # สร้าง PDF ใหม่จากหน้าที่ตรงกันใน memory
-    output_bytes, pdf_uuid = create_pdf_with_pages(file_obj, matched_pages)
-    
+    compact=true strips unused objects, deflates streams and subsets fonts in
+    the filtered PDF (off by default: several times slower to write for a
+    modest size saving). response="pages" skips building a PDF and returns only
+    the selected pages with the character offsets of every keyword match in
+    the page text, for clients that already have the file. index=true
+    stores the page text and the upload for /pdf-index (last-occurrence
+    scans then also read every page once).
+    """
+    try:
+        keywords, mode = resolve_keywords(profile, keywords, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return StreamingResponse(
-        iter([output_bytes]),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=filtered.pdf",
-        "X-PDF-UUID": pdf_uuid }   # ส่ง UUID ใน header นี้
-    )
+    if response == "pages":
+        upload = await spool_upload(file)
+        try:
+            pages = await locate_pages(upload.source, upload.sha256, mode, keywords, index)
+        finally:
+            upload.cleanup()
+        return {"doc_hash": upload.sha256, "pages": pages}
 
-@router.post("/extract-specific-pages")
-async def extract_keyword_pages(file: UploadFile = File(...)):
+    return await _extract(file, mode, keywords, compact, index)
+
+
+@router.get("/keyword-profiles")
+async def get_keyword_profiles():
     """
-    Extracts pages from a PDF file that contain specific keywords.
-    The process is done entirely in memory without writing to disk.
+    รายชื่อ keyword profile ที่ใช้ได้กับ /extract-pages
     """
-    # อ่านไฟล์ทั้งหมดเป็น bytes เข้าสู่ memory
-    content = await file.read()
-    
-    # สร้าง file-like object จาก bytes
-    file_obj = io.BytesIO(content)
+    return KEYWORD_PROFILES
 
-    matched_pages = filter_spcific_pages(file_obj)
 
-    if not matched_pages:
-        return {"message": "No pages matched keywords"}
+@router.post("/extract-abstract")
+async def extract_abstract(file: UploadFile = File(...)):
+    """
+    Extracts the Thai/English abstract and keywords as structured fields,
+    streamed as NDJSON: a "start" line, one "page" line per page that added
+    text and a final "result" line (see services/abstract_service.py).
+    Errors after the stream has started arrive as a {"type": "error"} line.
+    """
+    upload = await spool_upload(file)
 
-    # สร้าง PDF ใหม่จากหน้าที่ตรงกันใน memory
-    output_bytes, pdf_uuid = create_pdf_with_pages(file_obj, matched_pages)
-    
+    async def ndjson():
+        try:
+            async for event in stream_abstract(upload.source):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print(f"Error extracting abstract: {e}")
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
 
+    # ลบไฟล์ชั่วคราวใน background task: ทำงานแม้ client ตัดการเชื่อมต่อก่อนอ่าน stream จบ
     return StreamingResponse(
-        iter([output_bytes]),
+        ndjson(),
+        media_type="application/x-ndjson",
+        headers={"X-Document-Hash": upload.sha256},
+        background=BackgroundTask(upload.cleanup),
+    )
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # เทียบแบบ weak: ไม่สน prefix W/
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+@router.get("/pdfs/{doc_id}")
+async def get_stored_pdf(doc_id: str, request: Request):
+    """
+    Serves a filtered PDF by the id returned in X-PDF-UUID, without uploading
+    the original again. Supports Range requests (the browser PDF viewer loads
+    pages incrementally) and ETag / If-None-Match (304 when unchanged).
+    PDFs live in the size-capped result cache, so old ids eventually 404.
+    """
+    cache = get_result_cache()
+    stored = None
+    if cache is not None and _DOC_ID.match(doc_id):
+        stored = await run_in_threadpool(cache.get_pdf, doc_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    serve_path, sha256, _ = stored
+    headers = {
+        "ETag": f'"{sha256}"',
+        "Cache-Control": "private, max-age=86400",
+        "X-PDF-UUID": doc_id,
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        remove_file(serve_path)
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse ของ starlette จัดการ Range / If-Range ให้ และใช้ ETag ที่ส่งไปแทนค่า default
+    return FileResponse(
+        serve_path,
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=filtered.pdf",
-        "X-PDF-UUID": pdf_uuid }   # ส่ง UUID ใน header นี้
-    )
\ No newline at end of file
+        filename=f"{doc_id}.pdf",
+        content_disposition_type="inline",
+        headers=headers,
+        background=BackgroundTask(remove_file, serve_path),
+    )
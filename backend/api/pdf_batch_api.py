@@ -0,0 +1,68 @@
+from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status
+from fastapi.responses import FileResponse
+from services.batch_service import create_job, get_job_status, get_result_path
+from services.extraction_service import resolve_keywords
+
+router = APIRouter(
+    prefix="/extract-batch",
+    tags=["pdf"]
+)
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def create_batch_job(
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    profile: Optional[str] = Form(None),
+    keywords: Optional[List[str]] = Form(None),
+    mode: Optional[str] = Form(None),
+):
+    """
+    รับ PDF หลายไฟล์ (multipart `files`) และ/หรือไฟล์ zip (`archive`)
+    แล้วคืน job id ทันที ไฟล์จะถูกประมวลผลแบบขนานใน background
+    เลือก keyword ได้เหมือน /extract-pages (profile หรือ keywords)
+    """
+    try:
+        keywords, mode = resolve_keywords(profile, keywords, mode)
+        job = await create_job(files or [], archive, keywords, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "total": job["total"],
+        "status_url": f"/extract-batch/{job['job_id']}",
+        "result_url": f"/extract-batch/{job['job_id']}/result",
+    }
+
+
+@router.get("/{job_id}")
+async def get_batch_job(job_id: str):
+    """
+    สถานะของ job และความคืบหน้าของแต่ละไฟล์
+    """
+    job = get_job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/result")
+async def get_batch_result(job_id: str):
+    """
+    ดาวน์โหลด zip ของ PDF ที่กรองแล้วทั้งหมด (พร้อม manifest.json)
+    """
+    job = get_job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    result_path = get_result_path(job_id)
+    if job["status"] != "done" or result_path is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is not finished (status: {job['status']})."
+        )
+
+    return FileResponse(result_path, media_type="application/zip", filename=f"{job_id}.zip")
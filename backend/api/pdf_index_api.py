@@ -0,0 +1,161 @@
+import re
+from fastapi import APIRouter, HTTPException, Query
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse
+from typing import List, Literal, Optional
+from model import IndexExtractRequest
+from config import THUMBNAIL_DEFAULT_DPI, THUMBNAIL_MAX_DPI
+from services import page_index
+from services.extraction_service import run_cached_extraction, resolve_keywords
+from services.thumbnail_service import get_thumbnail, render_missing, SourceNotFound
+from services.upload_service import remove_file, pdf_file_response
+
+router = APIRouter(
+    prefix="/pdf-index",
+    tags=["pdf"]
+)
+
+_DOC_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+
+async def _get_indexed_document(doc_hash: str) -> dict:
+    document = None
+    if _DOC_HASH.match(doc_hash):
+        document = await run_in_threadpool(page_index.get_document, doc_hash)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document is not indexed")
+    return document
+
+
+@router.get("/{doc_hash}")
+async def get_indexed_document(doc_hash: str):
+    """
+    ข้อมูลของเอกสารใน index (doc_hash คือ X-Document-Hash ที่ได้จาก /extract-keyword-pages ที่ส่ง index=true)
+    """
+    document = await _get_indexed_document(doc_hash)
+    document["has_source"] = page_index.get_source_store().contains(doc_hash)
+    return document
+
+
+@router.get("/{doc_hash}/pages")
+async def query_indexed_pages(
+    doc_hash: str,
+    profile: Optional[str] = None,
+    keywords: Optional[List[str]] = Query(None),
+    mode: Optional[Literal["all", "last-occurrence"]] = None,
+):
+    """
+    ค้นหาหน้าที่มี keyword (profile หรือ keywords) จากข้อความที่ index ไว้ โดยไม่ต้องเปิด PDF
+    """
+    try:
+        keywords, mode = resolve_keywords(profile, keywords, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await _get_indexed_document(doc_hash)
+    pages = await run_in_threadpool(page_index.query_pages, doc_hash, keywords, mode)
+    return {"doc_hash": doc_hash, "pages": pages}
+
+
+@router.get("/{doc_hash}/search")
+async def search_indexed_document(doc_hash: str, q: str = Query(..., min_length=3), limit: int = 50):
+    """
+    ค้นหาวลีแบบ full-text (FTS5 trigram) ในเอกสาร
+    """
+    await _get_indexed_document(doc_hash)
+    results = await run_in_threadpool(page_index.search, doc_hash, q, limit)
+    return {"doc_hash": doc_hash, "results": results}
+
+
+@router.post("/{doc_hash}/extract")
+async def extract_indexed_pages(doc_hash: str, request: IndexExtractRequest):
+    """
+    สร้าง PDF จากหน้าที่ตรงกับ keyword (profile หรือ keywords) โดยใช้ต้นฉบับที่เก็บไว้และข้อความใน index
+    """
+    try:
+        keywords, mode = resolve_keywords(request.profile, request.keywords, request.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await _get_indexed_document(doc_hash)
+
+    source = await run_in_threadpool(page_index.get_source_store().get, doc_hash)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Source PDF is no longer stored; upload it again")
+    _, source_path = source
+
+    try:
+        matched_pages, doc_id, pdf_path = await run_cached_extraction(source_path, doc_hash, mode, keywords)
+    finally:
+        remove_file(source_path)
+
+    if not matched_pages:
+        return {"message": "No pages matched keywords"}
+
+    return pdf_file_response(pdf_path, {"X-PDF-UUID": doc_id, "X-Document-Hash": doc_hash})
+
+
+@router.get("/{doc_hash}/thumbnails")
+async def get_matched_thumbnails(
+    doc_hash: str,
+    profile: Optional[str] = None,
+    keywords: Optional[List[str]] = Query(None),
+    mode: Optional[Literal["all", "last-occurrence"]] = None,
+    dpi: int = Query(THUMBNAIL_DEFAULT_DPI, ge=12, le=THUMBNAIL_MAX_DPI),
+    format: Literal["png", "jpeg"] = "png",
+):
+    """
+    หน้าที่ตรงกับ keyword พร้อม URL ของ thumbnail แต่ละหน้า
+    thumbnail ที่ยังไม่มีใน cache จะถูก render ในครั้งเดียวก่อนตอบกลับ
+    """
+    try:
+        keywords, mode = resolve_keywords(profile, keywords, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await _get_indexed_document(doc_hash)
+    pages = await run_in_threadpool(page_index.query_pages, doc_hash, keywords, mode)
+
+    try:
+        pages = await render_missing(doc_hash, pages, dpi, format)
+    except SourceNotFound:
+        raise HTTPException(status_code=404, detail="Source PDF is no longer stored; upload it again")
+
+    return {
+        "doc_hash": doc_hash,
+        "pages": [
+            {"page": page, "url": f"/pdf-index/{doc_hash}/thumbnails/{page}?dpi={dpi}&format={format}"}
+            for page in pages
+        ],
+    }
+
+
+@router.get("/{doc_hash}/thumbnails/{page}")
+async def get_page_thumbnail(
+    doc_hash: str,
+    page: int,
+    dpi: int = Query(THUMBNAIL_DEFAULT_DPI, ge=12, le=THUMBNAIL_MAX_DPI),
+    format: Literal["png", "jpeg"] = "png",
+):
+    """
+    Thumbnail ของหน้าเดียว (render ครั้งแรกแล้วเก็บใน cache บนดิสก์)
+    """
+    if not _DOC_HASH.match(doc_hash):
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    try:
+        thumbnail = await get_thumbnail(doc_hash, page, dpi, format)
+    except SourceNotFound:
+        raise HTTPException(status_code=404, detail="Source PDF is no longer stored; upload it again")
+    if thumbnail is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+    serve_path, media_type = thumbnail
+    return FileResponse(
+        serve_path,
+        media_type=media_type,
+        # key มาจาก hash ของเนื้อไฟล์ ภาพของ URL เดิมจึงไม่เปลี่ยน
+        headers={"Cache-Control": "public, max-age=86400, immutable"},
+        background=BackgroundTask(remove_file, serve_path),
+    )
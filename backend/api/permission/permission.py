@@ -1,6 +1,6 @@
 
 from fastapi import APIRouter, HTTPException
-from services.supabase_service import Depends, role_required, create_token, authenticate_user, get_student_profile, get_student_team, get_teacher_profile, get_student_profile_for_sheet, get_team_profile_for_sheet
+from services.supabase_service import Depends, role_required, create_token, authenticate_user, get_student_profile, get_student_team, get_teacher_profile, get_student_profile_for_sheet, get_team_profile_for_sheet, get_current_user, get_bootstrap
 from fastapi.security import OAuth2PasswordRequestForm
 
 router = APIRouter(
@@ -10,8 +10,8 @@ router = APIRouter(
 
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await authenticate_user(form_data.username, form_data.password)
     print(user)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -19,40 +19,48 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/teacher-only")
-def teacher_only(user = Depends(role_required(["teacher"]))):
+async def teacher_only(user = Depends(role_required(["teacher"]))):
     return {"msg": f"Hello teacher {user['id']}"}
 
 
 @router.get("/student-or-teacher")
-def student_or_teacher(user = Depends(role_required(["student", "teacher"]))):
+async def student_or_teacher(user = Depends(role_required(["student", "teacher"]))):
     return {"msg": f"Hello {user['role']} {user['id']}"}
 
 
+@router.get("/bootstrap")
+async def bootstrap(user = Depends(get_current_user)):
+    """
+    ข้อมูลทั้งหมดที่หน้าแรกต้องใช้ (โปรไฟล์, ทีม, overview, เอกสาร) ใน request เดียว
+    """
+    return await get_bootstrap(user)
+
+
 @router.get("/get-student-profile/{sid}")
-def student_profile(sid: str):
-    response = get_student_profile(sid)
+async def student_profile(sid: str):
+    response = await get_student_profile(sid)
     return response
 
 @router.get("/get-student-profile-for-sheet/{sid}")
-def student_profile_for_sheet(sid: str):
-    response = get_student_profile_for_sheet(sid)
+async def student_profile_for_sheet(sid: str):
+    response = await get_student_profile_for_sheet(sid)
     return response
 
 
 @router.get("/get-student-team/{sid}")
-def student_team(sid: str):
-    response = get_student_team(sid)
+async def student_team(sid: str):
+    response = await get_student_team(sid)
     return response
 
 
 @router.get("/get-teacher-profile/{sid}")   
-def student_profile(sid: str):
-    response = get_teacher_profile(sid)
+async def student_profile(sid: str):
+    response = await get_teacher_profile(sid)
     return response 
 
 
 @router.get("/get-team-profile-for-sheet/{teamid}")   
-def student_profile(teamid: str):
-    response = get_team_profile_for_sheet(teamid)
+async def student_profile(teamid: str):
+    response = await get_team_profile_for_sheet(teamid)
     return response 
 
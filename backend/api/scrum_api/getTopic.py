@@ -1,8 +1,8 @@
 # app/routes.py
 from fastapi import APIRouter, HTTPException, Depends
-from services.supabase_service import process_topic_action,get_project_by_team, update_project_goal, get_current_user
+from services.supabase_service import process_topic_action, process_topic_decisions,get_project_by_team, get_team_dashboard, update_project_goal, get_current_user
 # is_user_member_of_team
-from model import TopicActionRequest, GoalUpdateRequest
+from model import TopicActionRequest, TopicBatchActionRequest, GoalUpdateRequest
 
 
 # สร้าง instance ของ APIRouter
@@ -12,9 +12,9 @@ router = APIRouter(
 )
 
 @router.put("/action/{tpid}")
-def handle_topic_action(tpid: str, request: TopicActionRequest):
+async def handle_topic_action(tpid: str, request: TopicActionRequest):
     try:
-        result = process_topic_action(tpid, request.action, request.tid, request.teamid, request.topicName ,request.year ,request.remark)
+        result = await process_topic_action(tpid, request.action, request.tid, request.teamid, request.topicName ,request.year ,request.remark)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -24,15 +24,36 @@ def handle_topic_action(tpid: str, request: TopicActionRequest):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
     
 
+@router.put("/action")
+async def handle_topic_actions(request: TopicBatchActionRequest):
+    """
+    อนุมัติ/ปฏิเสธหลายหัวข้อในคำขอเดียว แต่ละหัวข้อสำเร็จหรือล้มเหลวทั้งชุด (transaction ต่อหัวข้อ)
+    """
+    decisions = [d.model_dump(mode="json") for d in request.decisions]
+    try:
+        results = await process_topic_decisions(decisions)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    return {"results": results}
+
+
 @router.get("/overview/{tmid}")
 async def get_overview(tmid: str):
-    response = get_project_by_team(tmid)
+    response = await get_project_by_team(tmid)
     return response
 
 
+@router.get("/dashboard/{tmid}")
+async def get_dashboard(tmid: str):
+    """
+    Overview และเอกสารของทีมใน request เดียว (query เดียวไปที่ Supabase)
+    """
+    return await get_team_dashboard(tmid)
+
+
 
 @router.patch("/overview/{team_id}/goal")
-def update_goal_route(
+async def update_goal_route(
     team_id: str, 
     request: GoalUpdateRequest,
     current_user_id: str = Depends(get_current_user) # ได้ user_id จาก token
@@ -43,7 +64,7 @@ def update_goal_route(
     
     print(team_id, current_user_id)
     # ส่ง current_user_id ไปให้ service function เพื่อทำการตรวจสอบสิทธิ์
-    updated_project = update_project_goal(
+    updated_project = await update_project_goal(
         team_id=team_id, 
         new_goal=request.goal,
         user_id=current_user_id.get("id")
@@ -1,39 +1,61 @@
 import pytz 
-from fastapi import APIRouter, HTTPException, status
-from services.supabase_service import datetime, get_projects,update_milestone,get_milestone,get_group_task, get_topic, get_project_suggestions, get_project_name, set_project_suggestions
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.responses import StreamingResponse
+from services.supabase_service import datetime, get_projects,update_milestone,get_milestone,get_group_task, get_topic, get_project_suggestions, get_project_name, set_project_suggestions, role_required
 
 from fastapi_cache.decorator import cache
 import httpx
 from model import MilestoneUpdate, MilestoneData
+from services.export_service import EXPORT_TABLES, EXPORT_FORMATS, stream_export
+from services import metrics
 
 router = APIRouter(
     prefix="/api/scrum", # กำหนด prefix สำหรับทุก endpoints ใน router นี้
     tags=["scrum"]
 )
 
+def export_response(table: str, fmt: str) -> StreamingResponse:
+    # ทยอยส่งทีละหน้า (range request) แทนการโหลดทั้งตารางเป็น list เดียว
+    return StreamingResponse(
+        stream_export(table, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{fmt}"'},
+    )
+
+
 @router.get("/test-table")
 async def testgetfn():
-    result = get_projects()
+    result = await get_projects()
     return result
 
 
 @router.get("/milestone")
 async def getmilestone():
-    result = get_milestone()
+    result = await get_milestone()
     return result
 
 
+@router.get("/export/{table}")
+async def export_table(table: str, format: Literal["ndjson", "csv"] = "ndjson", user = Depends(role_required(["teacher"]))):
+    """
+    Export ทั้งตารางแบบ streaming เป็น NDJSON หรือ CSV (เฉพาะอาจารย์: ตาราง student มี sid ที่ใช้ login)
+    """
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table '{table}'. Available: {', '.join(EXPORT_TABLES)}")
+    return export_response(table, format)
+
+
 # ดึงเอา Total_task และ task ที่ complete ของทีม
 @router.get("/group_task_complete/{team_id}")
 async def get_group_task_api(team_id: str):
-    result = get_group_task(team_id)
+    result = await get_group_task(team_id)
     return {"summary": result}
 
 # teacher ดูกลุ่มที่เสนอชื่อมาหาคุณ
 @router.get("/topic/{teacher_id}")
-@cache(expire=60)
 async def get_topic_api(teacher_id: int):
-    result = get_topic(teacher_id)
+    result = await get_topic(teacher_id)
     return result
 
 
@@ -50,7 +72,8 @@ async def get_team_stat_api(team_id: str):
         
         async with httpx.AsyncClient() as client:
             # ส่งข้อมูลไปยัง n8n Webhook และรอรับ response กลับ
-            response = await client.post(n8n_webhook_url, json=payload, timeout=120)
+            with metrics.track("n8n"):
+                response = await client.post(n8n_webhook_url, json=payload, timeout=120)
             response.raise_for_status()
 
         # นำ JSON ที่ได้รับจาก n8n มาเป็น response body ของ FastAPI
@@ -88,7 +111,7 @@ async def get_project_suggestions_api(
     team_id: str,
 ):
 
-    data =  get_project_name(team_id)
+    data = await get_project_name(team_id)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project name not found")
 
@@ -99,7 +122,8 @@ async def get_project_suggestions_api(
         
         async with httpx.AsyncClient() as client:
             # ส่งข้อมูลไปยัง n8n Webhook และรอรับ response กลับ
-            response = await client.post(n8n_webhook_url, json=payload, timeout=120)
+            with metrics.track("n8n"):
+                response = await client.post(n8n_webhook_url, json=payload, timeout=120)
             response.raise_for_status()
 
         # นำ JSON ที่ได้รับจาก n8n มาเป็น response body ของ FastAPI
@@ -146,7 +170,7 @@ async def update_project_milestones(update_data: MilestoneUpdate):
                 update_dict[key] = aware_dt.isoformat() # 🎯 ใช้ .isoformat() 🎯
     try:
         # 2. เรียก Service Layer เพื่อทำการอัปเดตใน Supabase
-        updated_data = update_milestone(pmid_to_update, update_dict)
+        updated_data = await update_milestone(pmid_to_update, update_dict)
         
         if not updated_data:
             # อาจเกิดขึ้นถ้า pmid ไม่ถูกต้อง หรืออัปเดตไม่สำเร็จ
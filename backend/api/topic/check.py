@@ -1,10 +1,11 @@
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from pydantic import BaseModel
 import httpx 
-from services.supabase_service import check_topic_for_team, submit_new_project, get_current_user, check_topic_for_sent, check_teacher_teams_for_projects
+from services.supabase_service import check_topic_for_team, submit_new_project, get_current_user, check_topic_for_sent, check_teacher_teams_for_projects, get_teacher_team_progress
+from services import metrics
+from config import TEAM_PROGRESS_PAGE_SIZE, TEAM_PROGRESS_MAX_PAGE_SIZE
 from typing import Annotated
-from fastapi_cache.decorator import cache
 
 router = APIRouter(
     prefix="/api/topics", 
@@ -36,7 +37,8 @@ async def check_topic_first_ai(item: CheckTopic):
         
         async with httpx.AsyncClient() as client:
             # ส่งข้อมูลไปยัง n8n Webhook และรอรับ response กลับ
-            response = await client.post(n8n_webhook_url, json=payload, timeout=60)
+            with metrics.track("n8n"):
+                response = await client.post(n8n_webhook_url, json=payload, timeout=60)
             response.raise_for_status()
 
         # นำ JSON ที่ได้รับจาก n8n มาเป็น response body ของ FastAPI
@@ -67,7 +69,8 @@ async def check_topic_secound_ai(item: CheckTopic):
         
         async with httpx.AsyncClient() as client:
             # ส่งข้อมูลไปยัง n8n Webhook และรอรับ response กลับ
-            response = await client.post(n8n_webhook_url, json=payload, timeout=60)
+            with metrics.track("n8n"):
+                response = await client.post(n8n_webhook_url, json=payload, timeout=60)
             response.raise_for_status()
 
         # นำ JSON ที่ได้รับจาก n8n มาเป็น response body ของ FastAPI
@@ -88,23 +91,23 @@ async def check_topic_secound_ai(item: CheckTopic):
     
 
 @router.get("/check-topic-for-team/{team_id}")
-def check_topic_for_team_api(team_id: str):
+async def check_topic_for_team_api(team_id: str):
     """
     Endpoint เพื่อตรวจสอบว่าทีมนี้มีหัวข้อแล้วหรือยัง
     """
-    has_topic = check_topic_for_team(team_id)
+    has_topic = await check_topic_for_team(team_id)
     return has_topic
 
 
 
 @router.post("/projects/submit")
-def submit_project(project: ProjectSubmission, current_user: Annotated[str, Depends(get_current_user)]):
+async def submit_project(project: ProjectSubmission, current_user: Annotated[str, Depends(get_current_user)]):
     """
     Endpoint สำหรับส่งหัวข้อโครงงานใหม่
     """ 
     # ตรวจสอบว่าทีมนี้มีหัวข้อแล้วหรือยัง
     print(project)
-    if check_topic_for_sent(project.teamid):    
+    if await check_topic_for_sent(project.teamid):    
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="This team has already submitted a project topic."
@@ -112,22 +115,41 @@ def submit_project(project: ProjectSubmission, current_user: Annotated[str, Depe
 
     # ส่งข้อมูลไปยัง service เพื่อบันทึกลงฐานข้อมูล
     try:
-        result = submit_new_project(project.dict())
+        result = await submit_new_project(project.dict())
         return {"status": "success", "data": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
 @router.get("/team-progress/{tid}")
-@cache(expire=60)
-def check_topic_for_team_api(tid: str):
+async def check_topic_for_team_api(tid: str):
     """
     Endpoint เพื่อตรวจสอบว่าทีมนี้มีหัวข้อแล้วหรือยัง
     """
-    has_team = check_teacher_teams_for_projects(tid)
+    has_team = await check_teacher_teams_for_projects(tid)
     return has_team
 
 
+@router.get("/team-progress/{tid}/page")
+async def team_progress_page(
+    tid: str,
+    limit: int = Query(TEAM_PROGRESS_PAGE_SIZE, ge=1, le=TEAM_PROGRESS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    year: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated project columns, e.g. pid,topic,status"),
+):
+    """
+    โครงงานของทีมที่อาจารย์ดูแล แบบแบ่งหน้า (keyset ตาม year, pid)
+    ส่ง next_cursor กลับมาเป็น cursor เพื่อขอหน้าถัดไป
+    """
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        return await get_teacher_team_progress(tid, limit, cursor, year, status, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/team_stat")
 async def team_stat(item: CheckTopic):
     """
@@ -140,7 +162,8 @@ async def team_stat(item: CheckTopic):
         
         async with httpx.AsyncClient() as client:
             # ส่งข้อมูลไปยัง n8n Webhook และรอรับ response กลับ
-            response = await client.post(n8n_webhook_url, json=payload, timeout=60)
+            with metrics.track("n8n"):
+                response = await client.post(n8n_webhook_url, json=payload, timeout=60)
             response.raise_for_status()
 
         # นำ JSON ที่ได้รับจาก n8n มาเป็น response body ของ FastAPI
@@ -0,0 +1,333 @@
+"""
+Benchmarks for services/pdf_service.py and the PDF extraction routes.
+
+Run from backend/:
+
+    python -m benchmarks.bench_pdf
+    python -m benchmarks.bench_pdf --pages 10 100 --fonts base14 --repeat 5
+    python -m benchmarks.bench_pdf --baseline benchmarks/results/baseline.json
+
+Synthetic theses (benchmarks/synthetic.py) from 10 to 1000 pages are scanned
+with filter_pages / filter_spcific_pages, cut with create_pdf_with_pages and
+sent through /extract-keyword-pages and /extract-specific-pages. Every case
+runs in a fresh spawned process, so its peak RSS is not inflated by earlier
+cases; route cases also report the peak RSS of the PDF pool workers.
+
+Thai theses use BENCH_THAI_FONT, a system Thai font or MuPDF's built-in
+one, so the embedded/subset fonts always contain "บทที่ 5". base14 theses are
+English only: their filter_spcific_pages / /extract-specific-pages results
+measure a scan that never finds the keyword and are marked
+"keyword_absent". A Thai thesis whose chapter 5 is not found fails the run.
+
+The result cache and page text index are switched off so every run measures
+the cold path. Results are written as JSON (--output); with --baseline the run
+exits with status 1 when any case is slower or uses more memory than the
+baseline by more than --threshold.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_PAGES = [10, 50, 100, 250, 500, 1000]
+
+FUNCTION_CASES = ["filter_pages", "filter_spcific_pages", "create_pdf_with_pages"]
+ROUTE_CASES = ["/extract-keyword-pages", "/extract-specific-pages"]
+CASES = FUNCTION_CASES + ROUTE_CASES
+# case ที่ค้นหา "บทที่ 5" แบบ last-occurrence (หยุดเมื่อเจอจากท้ายเอกสาร)
+CHAPTER_5_CASES = ["filter_spcific_pages", "/extract-specific-pages"]
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _peak_rss_mb(who) -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(who).ru_maxrss
+    # Linux รายงานเป็น KB, macOS เป็น bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(rss / divisor, 1)
+
+
+def _mb(value: float | None) -> str:
+    # function case ไม่มี process pool และบางระบบไม่มี resource: แสดง n/a แทน NoneMB
+    return "n/a" if value is None else f"{value}MB"
+
+
+def _bench_function(case: str, pdf_path: str, repeat: int, warmup: int) -> dict:
+    from config import KEYWORDS
+    from services import pdf_service
+
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+
+    if case == "filter_pages":
+        def call():
+            return len(pdf_service.filter_pages(io.BytesIO(data), KEYWORDS)), None
+    elif case == "filter_spcific_pages":
+        def call():
+            return len(pdf_service.filter_spcific_pages(io.BytesIO(data))), None
+    else:
+        # หาหน้าก่อน (ไม่จับเวลา) แล้ววัดเฉพาะการสร้าง PDF
+        pages = pdf_service.filter_pages(io.BytesIO(data), KEYWORDS)
+
+        def call():
+            output_bytes, _ = pdf_service.create_pdf_with_pages(data, pages)
+            return len(pages), len(output_bytes)
+
+    seconds, first, (matched, output_bytes) = _measure(call, repeat, warmup)
+    return {
+        "seconds": seconds,
+        "first_s": first,
+        "matched_pages": matched,
+        "output_bytes": output_bytes,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "pool_peak_rss_mb": None,
+    }
+
+
+def _bench_route(case: str, pdf_path: str, repeat: int, warmup: int) -> dict:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from api.pdf_api import router
+    from services.pdf_executor import shutdown_executor
+
+    app = FastAPI()
+    app.include_router(router)
+
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+
+    try:
+        with TestClient(app) as client:
+            def call():
+                response = client.post(case, files={"file": ("thesis.pdf", data, "application/pdf")})
+                response.raise_for_status()
+                if response.headers.get("content-type") == "application/pdf":
+                    return None, len(response.content)
+                return 0, None
+
+            # warmup ครั้งแรกรวมเวลา spawn worker ของ process pool ด้วย
+            seconds, first, (matched, output_bytes) = _measure(call, repeat, warmup)
+    finally:
+        # รอให้ worker ปิดจริงก่อน เพื่อให้ RUSAGE_CHILDREN รวม worker ทุกตัว
+        shutdown_executor(wait=True)
+
+    return {
+        "seconds": seconds,
+        "first_s": first,
+        "matched_pages": matched,
+        "output_bytes": output_bytes,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "pool_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+
+def _measure(call, repeat: int, warmup: int) -> tuple[list[float], float, object]:
+    """
+    Runs call() warmup + repeat times. Returns (timed seconds, first call seconds, last result).
+    """
+    seconds = []
+    first = None
+    result = None
+    for i in range(warmup + repeat):
+        started = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - started
+        if first is None:
+            first = elapsed
+        if i >= warmup:
+            seconds.append(elapsed)
+    return seconds, first, result
+
+
+def _child_main(conn, case: str, pdf_path: str, repeat: int, warmup: int):
+    try:
+        bench = _bench_route if case in ROUTE_CASES else _bench_function
+        conn.send(("ok", bench(case, pdf_path, repeat, warmup)))
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def run_case(case: str, pdf_path: str, repeat: int, warmup: int) -> dict:
+    """
+    Runs one case in a fresh spawned process and returns its raw measurements.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child_main, args=(child_conn, case, pdf_path, repeat, warmup))
+    proc.start()
+    child_conn.close()
+    try:
+        status, payload = parent_conn.recv()
+    except EOFError:
+        status, payload = "error", f"benchmark process exited with code {proc.exitcode}"
+    finally:
+        proc.join()
+
+    if status != "ok":
+        raise RuntimeError(payload)
+    return payload
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summarize(case: str, thesis: dict, raw: dict) -> dict:
+    median = statistics.median(raw["seconds"])
+    return {
+        "case": case,
+        "pages": thesis["pages"],
+        "font": thesis["font"],
+        "thai": thesis["thai"],
+        "pdf_bytes": thesis["bytes"],
+        # ไม่มี "บทที่ 5" ในเอกสาร: วัดการสแกนทั้งไฟล์ที่ไม่เจอ ไม่ใช่การหยุดกลางทาง
+        "keyword_absent": case in CHAPTER_5_CASES and not thesis["chapter_5"],
+        "matched_pages": raw["matched_pages"],
+        "output_bytes": raw["output_bytes"],
+        "seconds": [round(s, 6) for s in raw["seconds"]],
+        "median_s": round(median, 6),
+        "min_s": round(min(raw["seconds"]), 6),
+        "first_s": round(raw["first_s"], 6),
+        "pages_per_sec": round(thesis["pages"] / median, 1) if median > 0 else None,
+        "peak_rss_mb": raw["peak_rss_mb"],
+        "pool_peak_rss_mb": raw["pool_peak_rss_mb"],
+    }
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """
+    Returns a message per case that is slower (median) or bigger (peak RSS)
+    than the same (case, pages, font) in the baseline by more than threshold.
+    """
+    base = {(r["case"], r["pages"], r["font"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = base.get((r["case"], r["pages"], r["font"]))
+        if old is None:
+            continue
+        name = f"{r['case']} pages={r['pages']} font={r['font']}"
+        for metric in ("median_s", "peak_rss_mb", "pool_peak_rss_mb"):
+            if r.get(metric) is None or not old.get(metric):
+                continue
+            change = r[metric] / old[metric] - 1
+            if change > threshold:
+                regressions.append(f"{name}: {metric} {old[metric]} -> {r[metric]} (+{change:.0%})")
+    return regressions
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    from benchmarks.synthetic import FONT_MODES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=DEFAULT_PAGES)
+    parser.add_argument("--fonts", nargs="+", choices=FONT_MODES, default=list(FONT_MODES),
+                        help="base14 is English only, so its chapter 5 cases are marked keyword_absent")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--match-ratio", type=float, default=0.05,
+                        help="share of body pages that also mention an abstract keyword")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative slowdown / RSS growth before a case counts as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    # ปิด cache/index และเก็บไฟล์ไว้ใน temp เพื่อวัด cold path ทุกครั้ง (process ลูกได้ env นี้ด้วย)
+    work_dir = tempfile.mkdtemp(prefix="siam-bench-")
+    os.environ["RESULT_CACHE_ENABLED"] = "false"
+    os.environ["PAGE_INDEX_ENABLED"] = "false"
+    os.environ["SIAM_DATA_DIR"] = os.path.join(work_dir, "data")
+
+    import fitz
+    from benchmarks.synthetic import thai_font_buffer, generate_thesis
+
+    fonts = args.fonts
+    if any(f != "base14" for f in fonts) and thai_font_buffer() is None:
+        print("No Thai font found (set BENCH_THAI_FONT); running base14 only.")
+        fonts = [f for f in fonts if f == "base14"]
+
+    results = []
+    try:
+        for font in fonts:
+            for pages in args.pages:
+                pdf_path = os.path.join(work_dir, f"thesis-{font}-{pages}.pdf")
+                thesis = generate_thesis(pdf_path, pages, args.match_ratio, font, args.seed)
+                for case in args.cases:
+                    summary = _summarize(case, thesis, run_case(case, pdf_path, args.repeat, args.warmup))
+                    if case in CHAPTER_5_CASES and thesis["chapter_5"] and not (summary["matched_pages"] or summary["output_bytes"]):
+                        raise RuntimeError(f"{case} font={font} pages={pages}: 'บทที่ 5' was not found in a thesis that contains it")
+                    results.append(summary)
+                    print(
+                        f"{case:<26} font={font:<8} pages={pages:<5} "
+                        f"median={summary['median_s']:.3f}s {summary['pages_per_sec']} pages/s "
+                        f"rss={_mb(summary['peak_rss_mb'])} pool_rss={_mb(summary['pool_peak_rss_mb'])}"
+                        + (" (keyword absent)" if summary["keyword_absent"] else "")
+                    )
+                os.remove(pdf_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pdf_max_workers": os.getenv("PDF_MAX_WORKERS"),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (threshold {args.threshold:.0%}).")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
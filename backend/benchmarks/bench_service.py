@@ -0,0 +1,201 @@
+"""
+Offline throughput benchmark of the Supabase service layer.
+
+Run from backend/:
+
+    python -m benchmarks.bench_service
+    python -m benchmarks.bench_service --teams 2000 --concurrency 1 16 64 --requests 2000
+    python -m benchmarks.bench_service --baseline benchmarks/results/service-baseline.json
+
+The service functions run against the SQLite repository
+(services/sqlite_repository.py) seeded with --teams synthetic teams, so no
+Supabase project or network is needed. Each call runs in its own request
+scope (fresh loaders, as in a real request) with the Redis entity cache off,
+so the numbers measure the service code plus the repository, not cache hits.
+
+For every case and concurrency level --requests calls are spread over that
+many concurrent workers; the report gives requests/s and latency
+percentiles. With --baseline the run exits with status 1 when a case's p50
+latency grew by more than --threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_pdf import RESULTS_DIR, _git_commit
+
+CASES = [
+    "get_project_by_team",
+    "get_documents_by_team_id",
+    "get_bootstrap",
+    "check_teacher_teams_for_projects",
+    "get_teacher_team_progress",
+]
+
+
+def _case_call(case: str, service, rng: random.Random, team_ids: list[str], student_ids: list[str], teacher_ids: list[int]):
+    if case == "get_project_by_team":
+        return lambda: service.get_project_by_team(rng.choice(team_ids))
+    if case == "get_documents_by_team_id":
+        return lambda: service.get_documents_by_team_id(rng.choice(team_ids))
+    if case == "get_bootstrap":
+        return lambda: service.get_bootstrap({"id": rng.choice(student_ids), "role": "student"})
+    if case == "check_teacher_teams_for_projects":
+        return lambda: service.check_teacher_teams_for_projects(str(rng.choice(teacher_ids)))
+    if case == "get_teacher_team_progress":
+        return lambda: service.get_teacher_team_progress(str(rng.choice(teacher_ids)), 20, fields=["pid", "topic", "status", "year"])
+    raise ValueError(case)
+
+
+async def _run_case(call, requests: int, concurrency: int) -> tuple[list[float], float]:
+    from services.entity_loader import request_scope
+
+    latencies: list[float] = []
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            with request_scope():
+                start = time.perf_counter()
+                await call()
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """
+    Returns a message per (case, concurrency) whose p50 latency grew by more
+    than threshold compared with the baseline.
+    """
+    base = {(r["case"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = base.get((r["case"], r["concurrency"]))
+        if old is None or not old.get("p50_ms"):
+            continue
+        change = r["p50_ms"] / old["p50_ms"] - 1
+        if change > threshold:
+            regressions.append(f"{r['case']} concurrency={r['concurrency']}: p50_ms {old['p50_ms']} -> {r['p50_ms']} (+{change:.0%})")
+    return regressions
+
+
+async def _bench(args) -> list[dict]:
+    from services import supabase_service as service
+    from services.repository import get_repository, init_repository, close_repository
+
+    await init_repository()
+    try:
+        repository = get_repository()
+        # ทีมที่มี project (ทีมที่ไม่มีจะได้ 404 จาก get_project_by_team)
+        team_ids = [row["teamid"] for row in await repository.select("project", "teamid")]
+        student_ids = [row["sid"] for row in await repository.select("student", "sid")]
+        teacher_ids = [row["tid"] for row in await repository.select("teacher", "tid")]
+
+        results = []
+        for case in args.cases:
+            for concurrency in args.concurrency:
+                rng = random.Random(args.seed)
+                call = _case_call(case, service, rng, team_ids, student_ids, teacher_ids)
+                await _run_case(call, min(args.requests, 50), concurrency)  # warmup
+                latencies, elapsed = await _run_case(call, args.requests, concurrency)
+                summary = {
+                    "case": case,
+                    "concurrency": concurrency,
+                    "requests": len(latencies),
+                    "requests_per_sec": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+                    "p50_ms": round(statistics.median(latencies) * 1000, 3),
+                    "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+                    "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+                }
+                results.append(summary)
+                print(
+                    f"{case:<34} concurrency={concurrency:<4} {summary['requests_per_sec']} req/s "
+                    f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms"
+                )
+        return results
+    finally:
+        await close_repository()
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--students-per-team", type=int, default=3)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--requests", type=int, default=500, help="calls per case and concurrency level")
+    parser.add_argument("--db", help="SQLite file to use (default: a temporary file)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/service-<time>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative p50 growth before a case counts as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="siam-bench-service-")
+    # ต้องตั้งก่อน import config: ใช้ SQLite ที่เติมข้อมูลจำลอง และปิด entity cache
+    os.environ["DATA_BACKEND"] = "sqlite"
+    os.environ["SQLITE_REPOSITORY_PATH"] = args.db or os.path.join(work_dir, "service.sqlite3")
+    os.environ["SQLITE_SEED_TEAMS"] = str(args.teams)
+    os.environ["SQLITE_SEED_STUDENTS_PER_TEAM"] = str(args.students_per_team)
+    os.environ["SQLITE_SEED_YEARS"] = str(args.years)
+    os.environ["ENTITY_CACHE_ENABLED"] = "false"
+
+    try:
+        results = asyncio.run(_bench(args))
+    finally:
+        if not args.db:
+            for name in os.listdir(work_dir):
+                os.remove(os.path.join(work_dir, name))
+            os.rmdir(work_dir)
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("service-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
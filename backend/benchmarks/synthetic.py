@@ -0,0 +1,229 @@
+"""
+Synthetic Thai/English theses for the PDF benchmarks.
+
+A generated thesis looks like the real uploads as far as the scanners care:
+a title page, a Thai and an English abstract page (บทคัดย่อ / คำสำคัญ,
+Abstract / Keywords), then chapters with "บทที่ N" headings. "บทที่ 5" sits at
+about 80% of the document and repeats in the running header of every
+chapter 5 page, so the last-occurrence scan has something to walk back to.
+
+match_ratio controls how many body pages also mention an abstract keyword,
+which drives the number of pages create_pdf_with_pages has to copy.
+
+Thai text needs a Thai font: BENCH_THAI_FONT, a system font from
+THAI_FONT_CANDIDATES, or else the Noto Serif Thai built into MuPDF, so the
+embedded/subset modes run everywhere. base14 theses are English only and
+have no "บทที่ 5" (their description says so in "chapter_5").
+"""
+import os
+import random
+import re
+
+import fitz
+
+# ตำแหน่งที่มักมีฟอนต์ไทยบน Linux / macOS / Windows (ใช้ BENCH_THAI_FONT เพื่อระบุเอง)
+THAI_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/noto/NotoSansThai-Regular.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansThai-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSansThai-Regular.ttf",
+    "/usr/share/fonts/truetype/tlwg/Garuda.ttf",
+    "/usr/share/fonts/truetype/tlwg/Loma.ttf",
+    "/Library/Fonts/Thonburi.ttf",
+    "/System/Library/Fonts/Thonburi.ttc",
+    "C:\\Windows\\Fonts\\tahoma.ttf",
+]
+
+# font modes: base14 = Helvetica ไม่ฝังฟอนต์ (อังกฤษอย่างเดียว),
+# embedded = ฝังฟอนต์ไทยทั้งไฟล์, subset = ฝังเฉพาะ glyph ที่ใช้
+FONT_MODES = ("base14", "embedded", "subset")
+
+_THAI_WORDS = (
+    "การศึกษา ระบบ ข้อมูล ผลการวิจัย พบว่า ผู้ใช้งาน ประสิทธิภาพ การพัฒนา "
+    "แบบจำลอง การประเมิน ความพึงพอใจ กลุ่มตัวอย่าง เครื่องมือ วิธีการ ทดลอง "
+    "มหาวิทยาลัย นักศึกษา โครงงาน เทคโนโลยี สารสนเทศ การวิเคราะห์ ผลลัพธ์"
+).split()
+
+_ENGLISH_WORDS = (
+    "the system data results show that users performance development model "
+    "evaluation satisfaction sample tools method experiment university students "
+    "project technology information analysis outcome design approach"
+).split()
+
+# ข้อความไทยเขียนด้วยฟอนต์ไทย ส่วนอื่น (ตัวเลข/อังกฤษ/เครื่องหมาย) ด้วย Helvetica
+# เพราะฟอนต์ไทยบางตัว (รวมถึงตัวที่ฝังใน MuPDF) ไม่มี glyph ละติน
+_THAI_RUN = re.compile("[\u0e00-\u0e7f]+|[^\u0e00-\u0e7f]+")
+
+_THAI_CHAPTERS = ["บทนำ", "ทฤษฎีและงานวิจัยที่เกี่ยวข้อง", "วิธีดำเนินการวิจัย", "ผลการวิจัย", "สรุปผลและข้อเสนอแนะ"]
+_ENGLISH_CHAPTERS = ["Introduction", "Literature Review", "Methodology", "Results", "Conclusion"]
+
+
+def find_thai_font() -> str | None:
+    path = os.getenv("BENCH_THAI_FONT")
+    if path:
+        return path if os.path.exists(path) else None
+    for candidate in THAI_FONT_CANDIDATES:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def thai_font_buffer() -> tuple[bytes, str] | None:
+    """
+    Returns (font file bytes, name) of a Thai font: find_thai_font() first,
+    then MuPDF's built-in Noto Serif Thai. None only when PyMuPDF was built
+    without its Noto fonts and no font file was found.
+    """
+    path = find_thai_font()
+    if path:
+        with open(path, "rb") as f:
+            return f.read(), os.path.basename(path)
+    try:
+        font = fitz.Font(script=fitz.mupdf.UCDN_SCRIPT_THAI)
+    except Exception:
+        return None
+    if not font.has_glyph(ord("บ")):
+        return None
+    return font.buffer, font.name
+
+
+def _write_text(writer: fitz.TextWriter, rect: fitz.Rect, text: str, thai_font: fitz.Font, latin_font: fitz.Font, fontsize: float, widths: dict):
+    """
+    Wraps text into rect word by word, switching fonts per Thai / non-Thai
+    run. Lines that do not fit are dropped, like insert_textbox(). widths
+    caches word widths across calls (the vocabulary is small).
+    """
+    def runs_of(word):
+        return [(run, thai_font if "\u0e00" <= run[0] <= "\u0e7f" else latin_font) for run in _THAI_RUN.findall(word)]
+
+    def width_of(word):
+        if word not in widths:
+            widths[word] = sum(font.text_length(run, fontsize=fontsize) for run, font in runs_of(word))
+        return widths[word]
+
+    space = width_of(" ")
+    line_height = fontsize * 1.4
+    y = rect.y0 + fontsize
+    for paragraph in text.split("\n"):
+        lines = [[]]
+        x = 0
+        for word in paragraph.split(" "):
+            if lines[-1] and x + width_of(word) > rect.width:
+                lines.append([])
+                x = 0
+            lines[-1].append(word)
+            x += width_of(word) + space
+
+        for words in lines:
+            if y > rect.y1:
+                return
+            # run ที่ติดกันและใช้ฟอนต์เดียวกันรวมเป็น append เดียว (ช่องว่างใช้ฟอนต์ของ run ก่อนหน้า)
+            pieces = []
+            for index, word in enumerate(words):
+                for run, font in runs_of(word + (" " if index < len(words) - 1 else "")):
+                    if pieces and pieces[-1][1] is font:
+                        pieces[-1][0] += run
+                    elif run.isspace() and pieces:
+                        pieces[-1][0] += run
+                    else:
+                        pieces.append([run, font])
+            point = fitz.Point(rect.x0, y)
+            for piece, font in pieces:
+                _, point = writer.append(point, piece, font=font, fontsize=fontsize)
+            y += line_height
+
+
+def _paragraph(rng: random.Random, thai: bool, words: int = 120) -> str:
+    parts = []
+    if thai:
+        parts.extend(rng.choice(_THAI_WORDS) for _ in range(words // 2))
+    parts.extend(rng.choice(_ENGLISH_WORDS) for _ in range(words // 2 if thai else words))
+    rng.shuffle(parts)
+    return " ".join(parts) + "."
+
+
+def _page_texts(pages: int, match_ratio: float, thai: bool, rng: random.Random) -> list[tuple[str, str]]:
+    """
+    Returns (header, body) per page.
+    """
+    texts = [("", "Synthetic Thesis\nวิทยานิพนธ์สังเคราะห์" if thai else "Synthetic Thesis")]
+    if pages > 1:
+        abstract = ("บทคัดย่อ\n" + _paragraph(rng, True) + "\nคำสำคัญ: ระบบ, ข้อมูล\n\n") if thai else ""
+        abstract += "Abstract\n" + _paragraph(rng, False) + "\nKeywords: system, data"
+        texts.append(("", abstract))
+
+    body_pages = pages - len(texts)
+    chapter_titles = _THAI_CHAPTERS if thai else _ENGLISH_CHAPTERS
+    # บทที่ 1-4 เฉลี่ยกันใน 80% แรก บทที่ 5 ใช้ 20% ท้าย
+    chapter_5_start = int(body_pages * 0.8)
+    previous_chapter = None
+    for index in range(body_pages):
+        if index < chapter_5_start:
+            chapter = 1 + index * 4 // chapter_5_start
+        else:
+            chapter = 5
+        first_page = chapter != previous_chapter
+        previous_chapter = chapter
+
+        label = f"บทที่ {chapter}" if thai else f"Chapter {chapter}"
+        header = label if chapter == 5 else ""
+        body = ""
+        if first_page:
+            body += f"{label}\n{chapter_titles[chapter - 1]}\n\n"
+        body += _paragraph(rng, thai, 220)
+        if rng.random() < match_ratio:
+            body += "\n" + rng.choice(["Abstract", "Keywords", "บทคัดย่อ", "คำสำคัญ"] if thai else ["Abstract", "Keywords"])
+        texts.append((header, body))
+
+    return texts[:pages]
+
+
+def generate_thesis(path: str, pages: int, match_ratio: float = 0.05, font: str = "embedded", seed: int = 0) -> dict:
+    """
+    Writes a synthetic thesis of `pages` pages to path and returns a description
+    of it for the result file. font="base14" writes English text only; the
+    embedded/subset modes need a Thai font (see thai_font_buffer).
+    """
+    if font not in FONT_MODES:
+        raise ValueError(f"Invalid font mode. Must be one of {FONT_MODES}.")
+
+    thai_font = thai_font_buffer() if font != "base14" else None
+    thai = thai_font is not None
+    if font != "base14" and not thai:
+        raise FileNotFoundError("No Thai font found; set BENCH_THAI_FONT to a .ttf file.")
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    try:
+        if thai:
+            fonts = (fitz.Font(fontbuffer=thai_font[0]), fitz.Font("helv"))
+            widths = {9: {}, 11: {}}
+        for header, body in _page_texts(pages, match_ratio, thai, rng):
+            page = doc.new_page(width=595, height=842)
+            if thai:
+                writer = fitz.TextWriter(page.rect)
+                if header:
+                    _write_text(writer, fitz.Rect(72, 40, 523, 60), header, *fonts, fontsize=9, widths=widths[9])
+                _write_text(writer, fitz.Rect(72, 72, 523, 790), body, *fonts, fontsize=11, widths=widths[11])
+                writer.write_text(page)
+                continue
+            if header:
+                page.insert_text((72, 50), header, fontname="helv", fontsize=9)
+            page.insert_textbox(fitz.Rect(72, 72, 523, 790), body, fontname="helv", fontsize=11)
+
+        if font == "subset":
+            doc.subset_fonts()
+        doc.save(path, garbage=3, deflate=True)
+    finally:
+        doc.close()
+
+    return {
+        "pages": pages,
+        "font": font,
+        "thai": thai,
+        "thai_font": thai_font[1] if thai else None,
+        # หน้าที่มี "บทที่ 5" มีเฉพาะฉบับภาษาไทย: base14 ไม่มีให้ last-occurrence scan หยุด
+        "chapter_5": thai,
+        "match_ratio": match_ratio,
+        "seed": seed,
+        "bytes": os.path.getsize(path),
+    }
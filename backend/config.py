@@ -1 +1,130 @@
+import os
+
+from dotenv import load_dotenv
+
+# โหลด .env ก่อนอ่านค่าใดๆ ด้านล่าง (config ถูก import ก่อน load_dotenv() ใน main.py)
+load_dotenv()
+
 KEYWORDS = ["บทคัดย่อ", "คำสำคัญ", "Abstract", "Keywords"]
+CHAPTER_5_KEYWORDS = ["บทที่ 5"]
+
+# ชุด keyword ที่ตั้งชื่อไว้ เลือกได้ต่อ request (profile=...) แทนการเพิ่ม endpoint ต่อ section
+# mode: "all" = ทุกหน้าที่เจอ, "last-occurrence" = หน้าสุดท้ายที่เจอ + หน้าถัดไป
+KEYWORD_PROFILES = {
+    "abstract": {"keywords": KEYWORDS, "mode": "all"},
+    "chapter-5": {"keywords": CHAPTER_5_KEYWORDS, "mode": "last-occurrence"},
+    "references": {"keywords": ["บรรณานุกรม", "เอกสารอ้างอิง", "References", "Bibliography"], "mode": "all"},
+    "acknowledgements": {"keywords": ["กิตติกรรมประกาศ", "Acknowledgements", "Acknowledgments"], "mode": "all"},
+}
+# จำนวน matcher ที่ compile แล้วเก็บไว้ต่อ process (LRU)
+MATCHER_CACHE_SIZE = int(os.getenv("MATCHER_CACHE_SIZE", "32"))
+
+# --- Abstract / keywords extraction (services/abstract_service.py) ---
+# จำนวนหน้าที่อ่านต่อรอบใน process pool (ผลลัพธ์ถูกส่งกลับทีละรอบ)
+ABSTRACT_CHUNK_PAGES = int(os.getenv("ABSTRACT_CHUNK_PAGES", "4"))
+# บทคัดย่ออยู่ในส่วนต้นของเล่ม: อ่านไม่เกินจำนวนหน้านี้ (0 = ทั้งเล่ม)
+ABSTRACT_MAX_PAGES = int(os.getenv("ABSTRACT_MAX_PAGES", "40"))
+
+# --- Supabase / PostgREST connection pool (services/supabase_service.py) ---
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "30"))
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "50"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "20"))
+# วินาทีที่เก็บ connection ว่างไว้ใช้ซ้ำ
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60"))
+
+# --- Read-through entity cache in Redis (services/entity_cache.py) ---
+ENTITY_CACHE_ENABLED = os.getenv("ENTITY_CACHE_ENABLED", "true").lower() == "true"
+# ทุก write ล้าง key ที่เกี่ยวข้องเอง จึงตั้ง TTL ยาวได้ (วินาที)
+ENTITY_CACHE_TTL = int(os.getenv("ENTITY_CACHE_TTL", str(6 * 60 * 60)))
+# student/teacher/team ถูกแก้จากนอก service นี้ด้วย (เช่น การจัดทีม) จึงเก็บไว้สั้นๆ เท่านั้น (วินาที)
+ENTITY_CACHE_SHORT_TTL = int(os.getenv("ENTITY_CACHE_SHORT_TTL", "60"))
+
+# --- Teacher team-progress pagination (/api/topics/team-progress/{tid}/page) ---
+TEAM_PROGRESS_PAGE_SIZE = int(os.getenv("TEAM_PROGRESS_PAGE_SIZE", "20"))
+TEAM_PROGRESS_MAX_PAGE_SIZE = int(os.getenv("TEAM_PROGRESS_MAX_PAGE_SIZE", "100"))
+
+# --- Streaming table export (services/export_service.py) ---
+# จำนวนแถวต่อ range request ตอน export
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+# --- Verified-principal cache (services/principal_cache.py) ---
+# วินาทีที่เชื่อผลการตรวจว่าผู้ใช้มีอยู่จริง (ไม่เกิน exp ของ token; 0 = ปิด cache)
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+# Redis channel สำหรับลบ principal ออกจาก cache ของทุก worker
+PRINCIPAL_INVALIDATE_CHANNEL = os.getenv("PRINCIPAL_INVALIDATE_CHANNEL", "principal-invalidate")
+
+# --- PDF processing (services/pdf_executor.py) ---
+# จำนวน process สูงสุดที่ใช้ประมวลผล PDF
+PDF_MAX_WORKERS = int(os.getenv("PDF_MAX_WORKERS", str(os.cpu_count() or 1)))
+# จำนวน request PDF ที่ประมวลผลพร้อมกันได้ต่อ worker ของ uvicorn ที่เหลือต้องรอคิว
+PDF_MAX_CONCURRENCY = int(os.getenv("PDF_MAX_CONCURRENCY", "2"))
+# เอกสารที่มีหน้ามากกว่านี้จะถูกแบ่งเป็นช่วงหน้า (shard) กระจายไปหลาย process
+PDF_SHARD_MIN_PAGES = int(os.getenv("PDF_SHARD_MIN_PAGES", "120"))
+# จำนวนหน้าต่อ shard
+PDF_SHARD_PAGES = int(os.getenv("PDF_SHARD_PAGES", "50"))
+
+# ลดขนาด PDF ผลลัพธ์: ลบ object ที่ไม่ใช้, บีบอัด stream และ subset ฟอนต์ (ค่าเริ่มต้นของ request)
+# ปิดไว้เป็นค่าเริ่มต้น: ช้ากว่าการบันทึกปกติหลายเท่าแต่ไฟล์เล็กลงไม่มาก จึงให้ขอเป็นราย request
+PDF_COMPACT_OUTPUT = os.getenv("PDF_COMPACT_OUTPUT", "false").lower() == "true"
+
+# --- Upload / response streaming (services/upload_service.py) ---
+# ไฟล์ที่ใหญ่กว่านี้จะถูกเขียนลงดิสก์แทนการเก็บใน memory (bytes)
+PDF_SPOOL_THRESHOLD = int(os.getenv("PDF_SPOOL_THRESHOLD", str(8 * 1024 * 1024)))
+# ขนาดไฟล์ upload สูงสุดที่รับ (bytes)
+PDF_MAX_UPLOAD_BYTES = int(os.getenv("PDF_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+# ขนาด chunk ที่ใช้อ่าน upload และส่ง response
+PDF_STREAM_CHUNK = int(os.getenv("PDF_STREAM_CHUNK", str(64 * 1024)))
+# โฟลเดอร์สำหรับไฟล์ชั่วคราว (ค่าเริ่มต้นคือ temp ของระบบ)
+PDF_TMP_DIR = os.getenv("PDF_TMP_DIR") or None
+
+# --- Local data directory for caches/indexes ---
+DATA_DIR = os.getenv("SIAM_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+# --- PDF result cache (services/result_cache.py) ---
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(DATA_DIR, "result_cache"))
+# ขนาดรวมสูงสุดของ cache บนดิสก์ เมื่อเกินจะลบรายการที่ใช้ล่าสุดนานที่สุดออก (LRU)
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# --- Page thumbnails (services/thumbnail_service.py) ---
+THUMBNAIL_DIR = os.getenv("THUMBNAIL_DIR", os.path.join(DATA_DIR, "thumbnails"))
+THUMBNAIL_MAX_BYTES = int(os.getenv("THUMBNAIL_MAX_BYTES", str(256 * 1024 * 1024)))
+THUMBNAIL_DEFAULT_DPI = int(os.getenv("THUMBNAIL_DEFAULT_DPI", "48"))
+THUMBNAIL_MAX_DPI = int(os.getenv("THUMBNAIL_MAX_DPI", "150"))
+THUMBNAIL_JPEG_QUALITY = int(os.getenv("THUMBNAIL_JPEG_QUALITY", "75"))
+
+# --- Batch PDF extraction jobs (services/batch_service.py) ---
+BATCH_DIR = os.getenv("BATCH_DIR", os.path.join(DATA_DIR, "batch_jobs"))
+# จำนวนไฟล์ที่ประมวลผลพร้อมกันต่อ job (งาน PyMuPDF จริงยังถูกจำกัดด้วย PDF_MAX_CONCURRENCY)
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+BATCH_MAX_ARCHIVE_BYTES = int(os.getenv("BATCH_MAX_ARCHIVE_BYTES", str(4 * 1024 * 1024 * 1024)))
+# job ที่เก่ากว่านี้ (วินาที) จะถูกลบพร้อมไฟล์ผลลัพธ์
+BATCH_JOB_TTL = int(os.getenv("BATCH_JOB_TTL", str(24 * 60 * 60)))
+
+# --- Per-page text index (services/page_index.py) ---
+PAGE_INDEX_ENABLED = os.getenv("PAGE_INDEX_ENABLED", "true").lower() == "true"
+PAGE_INDEX_PATH = os.getenv("PAGE_INDEX_PATH", os.path.join(DATA_DIR, "page_index.sqlite3"))
+# ขนาดข้อความที่เก็บรวมทุกเอกสาร (text + norm, ไม่รวม FTS) เกินแล้วลบเอกสารที่ index ไว้นานที่สุดก่อน
+PAGE_INDEX_MAX_BYTES = int(os.getenv("PAGE_INDEX_MAX_BYTES", str(1024 * 1024 * 1024)))
+# เอกสารที่ index ไว้นานกว่านี้ (วินาที) จะถูกลบ (0 = ไม่จำกัดอายุ)
+PAGE_INDEX_MAX_AGE = int(os.getenv("PAGE_INDEX_MAX_AGE", str(30 * 24 * 60 * 60)))
+# ไฟล์ PDF ต้นฉบับตาม document hash สำหรับดึงหน้าจาก index โดยไม่ต้อง upload ใหม่
+SOURCE_STORE_DIR = os.getenv("SOURCE_STORE_DIR", os.path.join(DATA_DIR, "sources"))
+SOURCE_STORE_MAX_BYTES = int(os.getenv("SOURCE_STORE_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))
+
+# --- Data backend for supabase_service (services/repository.py) ---
+# "supabase" (ค่าเริ่มต้น) หรือ "sqlite" สำหรับรัน/benchmark แบบ offline
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase").lower()
+# ":memory:" หรือ path ของไฟล์ SQLite (ฐานข้อมูลว่างจะถูกเติมข้อมูลจำลองตอน startup)
+SQLITE_REPOSITORY_PATH = os.getenv("SQLITE_REPOSITORY_PATH", ":memory:")
+SQLITE_SEED_TEAMS = int(os.getenv("SQLITE_SEED_TEAMS", "200"))
+SQLITE_SEED_STUDENTS_PER_TEAM = int(os.getenv("SQLITE_SEED_STUDENTS_PER_TEAM", "3"))
+SQLITE_SEED_YEARS = int(os.getenv("SQLITE_SEED_YEARS", "5"))
+
+# --- Request metrics (services/metrics.py) ---
+# counter/histogram แบบ Prometheus ที่ /metrics (แยกต่อ worker process)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# header Server-Timing ที่แยกเวลา db / n8n / pdf ของแต่ละ response
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
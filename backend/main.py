@@ -1,12 +1,21 @@
 from fastapi import FastAPI
 
 from api.pdf_api import router as pdf_router
+from api.pdf_batch_api import router as pdf_batch_router
+from api.pdf_index_api import router as pdf_index_router
 from api.topic.check import router as check_router
 from api.scrum_api.scrum import router as scrum_router
 from api.permission.permission import router as permission_router
 from api.scrum_api.getTopic import router as topicAction_router
 from api.document.document import router as document_router
 from api.document.milestone import router as milestone_router
+from api.metrics_api import router as metrics_router
+from services.pdf_executor import shutdown_executor
+from services.repository import init_repository, close_repository
+from services.principal_cache import start_invalidation_listener, stop_invalidation_listener
+from services.entity_loader import RequestScopeMiddleware
+from services.entity_cache import init_entity_cache
+from services.metrics import MetricsMiddleware
 
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_cache import FastAPICache
@@ -33,19 +42,41 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# loader ของ student/team/project แยกต่อ request (services/entity_loader.py)
+app.add_middleware(RequestScopeMiddleware)
+# เวลา db / n8n / pdf ต่อ request (Server-Timing) และ metrics ที่ /metrics
+app.add_middleware(MetricsMiddleware)
 
 redis_api = os.getenv("REDIS_API")
 @app.on_event("startup")
 async def startup():
+    # สร้าง repository ตาม DATA_BACKEND (Supabase: async client + connection pool เดียวต่อ worker)
+    await init_repository()
+
     # เชื่อมต่อกับ Redis
     redis = aioredis.from_url(redis_api, encoding="utf8", decode_responses=True)
     FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    # cache ข้อมูลจาก Supabase ตาม entity (ล้างเมื่อมีการเขียน)
+    init_entity_cache(redis)
+    # รับข้อความลบผู้ใช้จาก Redis เพื่อล้าง principal cache ของ worker นี้
+    start_invalidation_listener(redis)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # ปิด process pool ของงาน PDF
+    shutdown_executor()
+    await stop_invalidation_listener()
+    await close_repository()
 
 
 app.include_router(pdf_router)
+app.include_router(pdf_batch_router)
+app.include_router(pdf_index_router)
 app.include_router(check_router)
 app.include_router(scrum_router)
 app.include_router(permission_router)
 app.include_router(topicAction_router)
 app.include_router(document_router)
-app.include_router(milestone_router)
\ No newline at end of file
+app.include_router(milestone_router)
+app.include_router(metrics_router)
\ No newline at end of file
@@ -19,6 +19,15 @@ class TopicActionRequest(BaseModel):
     year: str
 
 
+class TopicDecision(TopicActionRequest):
+    tpid: str
+    action: ActionType
+
+
+class TopicBatchActionRequest(BaseModel):
+    decisions: List[TopicDecision] = Field(..., min_length=1)
+
+
 class ProjectData(BaseModel):
     title: str
     team: List[str]
@@ -55,4 +64,9 @@ class MilestoneUpdate(BaseModel):
     proposal: Optional[str] = None
     research_doc: Optional[str] = None
     proposal_slide: Optional[str] = None
-    final_slide_project: Optional[str] = None
\ No newline at end of file
+    final_slide_project: Optional[str] = None
+
+class IndexExtractRequest(BaseModel):
+    profile: Optional[str] = None
+    keywords: Optional[List[str]] = None
+    mode: Optional[Literal["all", "last-occurrence"]] = None
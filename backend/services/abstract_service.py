@@ -0,0 +1,182 @@
+"""
+Structured abstract / keywords extraction.
+
+Pages are read from the front of the document in small chunks on the PDF
+process pool, cleaned with text_service, and fed to AbstractParser, which
+tracks the section it is in across pages. stream_abstract() yields an event
+per page that contributed text, so a client can render the abstract before
+the rest of the document has been read:
+
+    {"type": "start", "page_count": 120}
+    {"type": "page", "page": 3, "fields": {"abstract_th": "..."}}
+    {"type": "page", "page": 4, "fields": {"abstract_th": "...", "keywords_th": "..."}}
+    {"type": "result", "abstract_th": "...", "keywords_th": [...], "abstract_en": "...", "keywords_en": [...], "pages": [3, 4, 5]}
+"""
+import re
+from typing import AsyncIterator
+
+from config import KEYWORDS, ABSTRACT_CHUNK_PAGES, ABSTRACT_MAX_PAGES
+from services import pdf_service
+from services.pdf_executor import run_pdf_task
+from services.text_service import contains_keywords
+
+FIELDS = ("abstract_th", "keywords_th", "abstract_en", "keywords_en")
+
+# หัวข้อที่เปิด section (ข้อความที่เหลือในบรรทัดเดียวกันเป็นเนื้อหาของ section)
+_HEADINGS = [
+    (re.compile(r"^บทคัดย่อ\s*[:：]?\s*(.*)$"), "abstract_th"),
+    (re.compile(r"^คำสำคัญ\s*[:：]?\s*(.*)$"), "keywords_th"),
+    (re.compile(r"^abstract\b\s*[:：]?\s*(.*)$", re.IGNORECASE), "abstract_en"),
+    (re.compile(r"^key\s*words?\b\s*[:：]?\s*(.*)$", re.IGNORECASE), "keywords_en"),
+]
+# หัวข้อที่ปิด section ปัจจุบัน
+_SECTION_END = re.compile(
+    r"^(?:บทที่\s*[0-9๐-๙]+|chapter\s+\d+|สารบัญ|table\s+of\s+contents|contents\b|"
+    r"กิตติกรรมประกาศ|ประกาศคุณูปการ|acknowledge?ments?\b)",
+    re.IGNORECASE,
+)
+# บรรทัดสารบัญ เช่น "บทคัดย่อภาษาไทย ........ ค" ไม่ใช่หัวข้อจริง
+_TOC_LINE = re.compile(r"(?:\.{3,}|…)\s*\S{0,4}$")
+# เลขหน้าส่วนหน้าของเล่มเป็นพยัญชนะไทย (ก, ข, ค, ...)
+_PAGE_LETTER = re.compile(r"^\(?[ก-ฮ]\)?$")
+_KEYWORD_SEPARATORS = re.compile(r"\s*[,;，、]\s*")
+_THAI_CHAR = re.compile("[\u0e00-\u0e7f]")
+
+_FOLDED_KEYWORDS = [kw.casefold() for kw in KEYWORDS]
+
+
+def _join(text: str, line: str) -> str:
+    if not text:
+        return line
+    # บรรทัดภาษาไทยตัดตรงรอยต่อคำโดยไม่มีช่องว่าง จึงต่อกันตรงๆ
+    if _THAI_CHAR.match(text[-1]) and _THAI_CHAR.match(line[0]):
+        return text + line
+    return text + " " + line
+
+
+def split_keywords(text: str, thai: bool = False) -> list[str]:
+    """
+    Splits a keywords line on commas/semicolons. Thai keyword lines without
+    separators are split on spaces instead.
+    """
+    text = text.strip().rstrip(".")
+    if not text:
+        return []
+    if _KEYWORD_SEPARATORS.search(text) or not thai:
+        parts = _KEYWORD_SEPARATORS.split(text)
+    else:
+        parts = text.split()
+    return [part.strip() for part in parts if part.strip()]
+
+
+class AbstractParser:
+    """
+    Collects the Thai/English abstract and keywords from cleaned page texts fed
+    in page order. A keywords section ends with its line unless the line ends
+    with a separator; abstracts run until the next known heading. A field that
+    has been filled is never reopened (e.g. by a later table of contents).
+    """
+
+    def __init__(self):
+        self.fields = {field: "" for field in FIELDS}
+        self.pages: list[int] = []
+        self._section: str | None = None
+        self._closed: set[str] = set()
+
+    @property
+    def in_section(self) -> bool:
+        return self._section is not None
+
+    @property
+    def done(self) -> bool:
+        return len(self._closed) == len(FIELDS)
+
+    def _close(self):
+        if self._section is not None and self.fields[self._section]:
+            self._closed.add(self._section)
+        self._section = None
+
+    def _open(self, line: str) -> tuple[str, str] | None:
+        for pattern, field in _HEADINGS:
+            match = pattern.match(line)
+            if match:
+                return field, match.group(1)
+        return None
+
+    def feed(self, page_no: int, text: str) -> dict[str, str]:
+        """
+        Parses one cleaned page and returns the text it added per field.
+        """
+        added: dict[str, str] = {}
+        for line in text.split("\n"):
+            if not line or _TOC_LINE.search(line) or _PAGE_LETTER.match(line):
+                continue
+
+            heading = self._open(line)
+            if heading is not None:
+                self._close()
+                field, line = heading
+                if field not in self._closed:
+                    self._section = field
+                if not line:
+                    continue
+            elif _SECTION_END.match(line):
+                self._close()
+                continue
+
+            if self._section is None:
+                continue
+
+            section = self._section
+            self.fields[section] = _join(self.fields[section], line)
+            added[section] = _join(added.get(section, ""), line)
+            if section.startswith("keywords") and not line.endswith((",", ";", "，", "、")):
+                self._close()
+
+        if added:
+            self.pages.append(page_no)
+        return added
+
+    def result(self) -> dict:
+        return {
+            "abstract_th": self.fields["abstract_th"] or None,
+            "keywords_th": split_keywords(self.fields["keywords_th"], thai=True),
+            "abstract_en": self.fields["abstract_en"] or None,
+            "keywords_en": split_keywords(self.fields["keywords_en"]),
+            "pages": self.pages,
+        }
+
+
+async def stream_abstract(source: bytes | str) -> AsyncIterator[dict]:
+    """
+    Reads the document (bytes or a file path) ABSTRACT_CHUNK_PAGES pages at a
+    time on the PDF process pool and yields the events described in the module
+    docstring. Stops once all four fields are complete or after
+    ABSTRACT_MAX_PAGES pages.
+    """
+    parser = AbstractParser()
+    start = 0
+    stop = None
+
+    while stop is None or start < stop:
+        chunk_stop = start + ABSTRACT_CHUNK_PAGES if stop is None else min(start + ABSTRACT_CHUNK_PAGES, stop)
+        page_count, pages = await run_pdf_task(pdf_service.read_clean_pages, source, start, chunk_stop)
+        if stop is None:
+            stop = min(page_count, ABSTRACT_MAX_PAGES) if ABSTRACT_MAX_PAGES > 0 else page_count
+            yield {"type": "start", "page_count": page_count}
+
+        for page_no, text in pages:
+            # หน้าที่ไม่มี keyword และไม่ได้อยู่ต่อจาก section เดิม ข้ามได้เลย
+            if not parser.in_section and not contains_keywords(text.casefold(), _FOLDED_KEYWORDS):
+                continue
+            added = parser.feed(page_no, text)
+            if added:
+                yield {"type": "page", "page": page_no, "fields": added}
+            if parser.done:
+                break
+
+        if parser.done:
+            break
+        start = chunk_stop
+
+    yield {"type": "result", **parser.result()}
@@ -0,0 +1,298 @@
+"""
+Batch PDF extraction jobs.
+
+A job lives in BATCH_DIR/<job_id>/:
+
+    input/     uploaded PDFs (deleted one by one once processed)
+    output/    filtered PDFs waiting to be zipped
+    status.json  job and per-file progress, readable by any uvicorn worker
+    result.zip   filtered PDFs + manifest.json once the job is done
+
+Files are only ever streamed to and from disk, so a job of 100+ theses
+never holds more than one chunk per file in memory.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+import zipfile
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from config import BATCH_DIR, BATCH_MAX_WORKERS, BATCH_MAX_FILES, BATCH_MAX_ARCHIVE_BYTES, BATCH_JOB_TTL, PDF_MAX_UPLOAD_BYTES, PDF_STREAM_CHUNK
+from services.extraction_service import run_cached_extraction
+from services.upload_service import save_upload, remove_file
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# job ที่กำลังรันใน process นี้ (เก็บ reference ของ task ไว้ไม่ให้ถูก GC)
+_jobs: dict[str, "BatchJob"] = {}
+_tasks: dict[str, asyncio.Task] = {}
+
+
+def _safe_name(name: str | None, index: int) -> str:
+    # ตัด path ออกเหลือแค่ชื่อไฟล์ (กัน zip slip / path traversal)
+    base = os.path.basename((name or "").replace("\\", "/")).strip()
+    return base or f"document_{index + 1}.pdf"
+
+
+class BatchJob:
+    def __init__(self, job_id: str, keywords: list[str], mode: str = "all"):
+        self.job_id = job_id
+        self.keywords = keywords
+        self.mode = mode
+        self.status = "queued"
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.files: list[dict] = []
+
+    @property
+    def dir(self) -> str:
+        return os.path.join(BATCH_DIR, self.job_id)
+
+    def add_file(self, name: str, path: str, sha256: str):
+        self.files.append({
+            "name": name,
+            "status": "queued",
+            "pages": [],
+            "doc_id": None,
+            "error": None,
+            "_path": path,
+            "_sha256": sha256,
+        })
+
+    def to_dict(self) -> dict:
+        done = sum(1 for f in self.files if f["status"] in ("done", "no-match", "error"))
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": self.error,
+            "total": len(self.files),
+            "processed": done,
+            "created_at": self.created_at,
+            "files": [
+                {k: v for k, v in f.items() if not k.startswith("_")}
+                for f in self.files
+            ],
+        }
+
+    def write_status(self, data: dict):
+        # เขียนแบบ atomic เพื่อให้ worker อื่นอ่านได้เสมอ
+        tmp_path = os.path.join(self.dir, f"status.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.dir, "status.json"))
+
+    async def save(self):
+        # snapshot บน event loop แล้วค่อยเขียนไฟล์ใน thread
+        await run_in_threadpool(self.write_status, self.to_dict())
+
+
+def _job_dir(job_id: str) -> str | None:
+    if not _JOB_ID.match(job_id):
+        return None
+    return os.path.join(BATCH_DIR, job_id)
+
+
+def cleanup_expired_jobs():
+    """
+    Removes job directories older than BATCH_JOB_TTL.
+    """
+    if not os.path.isdir(BATCH_DIR):
+        return
+    expire_before = time.time() - BATCH_JOB_TTL
+    for entry in os.scandir(BATCH_DIR):
+        if entry.name in _jobs or not entry.is_dir():
+            continue
+        if entry.stat().st_mtime < expire_before:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _unpack_archive(archive_path: str, input_dir: str, start_index: int) -> list[tuple[str, str, str]]:
+    """
+    Extracts the PDFs of a zip archive one entry at a time (blocking; run in a thread).
+    Returns [(name, path, sha256)].
+    """
+    extracted = []
+    with zipfile.ZipFile(archive_path) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                continue
+            if start_index + len(extracted) >= BATCH_MAX_FILES:
+                break
+
+            index = start_index + len(extracted)
+            path = os.path.join(input_dir, f"{index:04d}.pdf")
+            digest = hashlib.sha256()
+            size = 0
+            with zf.open(info) as src, open(path, "wb") as out:
+                while True:
+                    chunk = src.read(PDF_STREAM_CHUNK)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    # กัน zip bomb: จำกัดขนาดหลังแตกไฟล์ต่อ entry
+                    if size > PDF_MAX_UPLOAD_BYTES:
+                        raise ValueError(f"'{info.filename}' is larger than {PDF_MAX_UPLOAD_BYTES} bytes.")
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            extracted.append((_safe_name(info.filename, index), path, digest.hexdigest()))
+    return extracted
+
+
+def _build_result_zip(job: BatchJob):
+    """
+    Zips the filtered PDFs and a manifest into result.zip (blocking; run in a thread).
+    PDFs are already compressed, so entries are stored as-is.
+    """
+    output_dir = os.path.join(job.dir, "output")
+    tmp_path = os.path.join(job.dir, "result.zip.tmp")
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as zf:
+        used_names = set()
+        for index, f in enumerate(job.files):
+            output_path = os.path.join(output_dir, f"{index:04d}.pdf")
+            if f["status"] != "done" or not os.path.exists(output_path):
+                continue
+
+            stem, _ = os.path.splitext(f["name"])
+            arcname = f"{stem}_filtered.pdf"
+            if arcname in used_names:
+                arcname = f"{stem}_{index + 1}_filtered.pdf"
+            used_names.add(arcname)
+
+            zf.write(output_path, arcname)
+            remove_file(output_path)
+
+        zf.writestr("manifest.json", json.dumps(job.to_dict(), ensure_ascii=False, indent=2))
+    os.replace(tmp_path, os.path.join(job.dir, "result.zip"))
+
+
+async def _process_file(job: BatchJob, index: int):
+    entry = job.files[index]
+    entry["status"] = "processing"
+    await job.save()
+
+    input_path = entry["_path"]
+    try:
+        matched_pages, doc_id, pdf_path = await run_cached_extraction(
+            input_path, entry["_sha256"], job.mode, job.keywords
+        )
+        entry["pages"] = matched_pages
+        entry["doc_id"] = doc_id
+        if pdf_path is None:
+            entry["status"] = "no-match"
+        else:
+            await run_in_threadpool(shutil.move, pdf_path, os.path.join(job.dir, "output", f"{index:04d}.pdf"))
+            entry["status"] = "done"
+    except Exception as e:
+        print(f"Error processing batch file {entry['name']}: {e}")
+        entry["status"] = "error"
+        entry["error"] = str(e)
+    finally:
+        remove_file(input_path)
+
+    await job.save()
+
+
+async def _run_job(job: BatchJob, archive_path: str | None):
+    try:
+        job.status = "running"
+        if archive_path is not None:
+            extracted = await run_in_threadpool(
+                _unpack_archive, archive_path, os.path.join(job.dir, "input"), len(job.files)
+            )
+            remove_file(archive_path)
+            for name, path, sha256 in extracted:
+                job.add_file(name, path, sha256)
+        await job.save()
+
+        # worker pool ขนาดจำกัด ดึงไฟล์จากคิวทีละไฟล์
+        pending = iter(range(len(job.files)))
+
+        async def worker():
+            for index in pending:
+                await _process_file(job, index)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, BATCH_MAX_WORKERS))))
+
+        await run_in_threadpool(_build_result_zip, job)
+        job.status = "done"
+    except Exception as e:
+        print(f"Error running batch job {job.job_id}: {e}")
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        await job.save()
+        _jobs.pop(job.job_id, None)
+        _tasks.pop(job.job_id, None)
+
+
+async def create_job(files: list[UploadFile], archive: UploadFile | None, keywords: list[str], mode: str = "all") -> dict:
+    """
+    Saves the uploads to a new job directory and starts processing in the background.
+    Returns the initial job status.
+    """
+    if not files and archive is None:
+        raise ValueError("No files provided.")
+    if len(files) > BATCH_MAX_FILES:
+        raise ValueError(f"Too many files (max {BATCH_MAX_FILES}).")
+
+    await run_in_threadpool(cleanup_expired_jobs)
+
+    job = BatchJob(uuid.uuid4().hex, keywords, mode)
+    input_dir = os.path.join(job.dir, "input")
+    os.makedirs(input_dir)
+    os.makedirs(os.path.join(job.dir, "output"))
+
+    try:
+        for index, file in enumerate(files):
+            path = os.path.join(input_dir, f"{index:04d}.pdf")
+            _, sha256 = await save_upload(file, path)
+            job.add_file(_safe_name(file.filename, index), path, sha256)
+
+        archive_path = None
+        if archive is not None:
+            archive_path = os.path.join(job.dir, "archive.zip")
+            await save_upload(archive, archive_path, BATCH_MAX_ARCHIVE_BYTES)
+    except BaseException:
+        shutil.rmtree(job.dir, ignore_errors=True)
+        raise
+
+    await job.save()
+
+    _jobs[job.job_id] = job
+    _tasks[job.job_id] = asyncio.create_task(_run_job(job, archive_path))
+    return job.to_dict()
+
+
+def get_job_status(job_id: str) -> dict | None:
+    """
+    Returns the job status, from memory when the job runs in this process,
+    otherwise from its status.json (jobs may run in another uvicorn worker).
+    """
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job.to_dict()
+
+    job_dir = _job_dir(job_id)
+    if job_dir is None:
+        return None
+    try:
+        with open(os.path.join(job_dir, "status.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def get_result_path(job_id: str) -> str | None:
+    job_dir = _job_dir(job_id)
+    if job_dir is None:
+        return None
+    path = os.path.join(job_dir, "result.zip")
+    return path if os.path.exists(path) else None
@@ -0,0 +1,171 @@
+"""
+Size-capped LRU store of files on local disk, shared by every uvicorn worker on the host.
+
+Each entry is a small JSON metadata file plus an optional blob:
+
+    <key>.json   metadata (written last, so its presence means the entry is complete)
+    <key>.<ext>  blob, e.g. a PDF
+
+Entries are touched on every hit and the least recently used ones are removed
+once the directory grows past max_bytes.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def link_or_copy(src: str, dst: str):
+    # hard link ไม่มีค่าใช้จ่าย แต่ใช้ข้าม filesystem ไม่ได้ (เช่น PDF_TMP_DIR อยู่คนละดิสก์)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class DiskLRUStore:
+    def __init__(self, directory: str, max_bytes: int, blob_ext: str = "pdf"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.blob_ext = blob_ext
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def blob_path(self, key: str) -> str:
+        return self._path(key, self.blob_ext)
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._path(key, "json"))
+
+    def get(self, key: str) -> tuple[dict, str | None] | None:
+        """
+        Returns (meta, serve_path) or None on a miss.
+        serve_path is a private hard link to the blob that the caller must delete
+        after use, so eviction cannot remove a file being streamed. It is None
+        for entries stored without a blob.
+        """
+        meta_path = self._path(key, "json")
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if not meta.pop("_blob", False):
+            os.utime(meta_path)
+            return meta, None
+
+        blob_path = self.blob_path(key)
+        serve_path = self._path(f"{key}.{uuid.uuid4().hex}", "serve")
+        try:
+            os.link(blob_path, serve_path)
+        except FileNotFoundError:
+            return None
+
+        # อัปเดตเวลาใช้งานล่าสุดสำหรับ LRU
+        os.utime(meta_path)
+        os.utime(blob_path)
+        return meta, serve_path
+
+    def put(self, key: str, meta: dict, blob_path: str | None = None) -> str | None:
+        """
+        Stores an entry. blob_path (usually a temp file) is hard-linked or copied into
+        the store, so the caller still owns it. Returns the key, or None when the
+        entry could not be written (storing is best effort).
+        """
+        stored = self._write(key, meta, blob_path)
+        if stored is not None:
+            self.evict()
+        return stored
+
+    def put_bytes(self, key: str, meta: dict, data: bytes) -> str | None:
+        """
+        Same as put() for a blob held in memory.
+        """
+        stored = self._write_bytes(key, meta, data)
+        if stored is not None:
+            self.evict()
+        return stored
+
+    def put_bytes_many(self, entries: list[tuple[str, dict, bytes]]) -> list[str]:
+        """
+        put_bytes() for a batch of (key, meta, data): evicts once after the
+        last write instead of scanning the directory per entry. Returns the
+        keys that were stored.
+        """
+        stored = [key for key, meta, data in entries if self._write_bytes(key, meta, data) is not None]
+        if stored:
+            self.evict()
+        return stored
+
+    def _write(self, key: str, meta: dict, blob_path: str | None) -> str | None:
+        try:
+            if blob_path is not None:
+                tmp_link = self._path(f"{key}.{uuid.uuid4().hex}", "tmp")
+                link_or_copy(blob_path, tmp_link)
+                os.replace(tmp_link, self.blob_path(key))
+
+            # เขียน json หลัง blob เพื่อให้ get() ไม่เจอ entry ที่ยังไม่ครบ
+            tmp_meta = self._path(f"{key}.{uuid.uuid4().hex}", "tmp")
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump({**meta, "_blob": blob_path is not None}, f, ensure_ascii=False)
+            os.replace(tmp_meta, self._path(key, "json"))
+        except OSError as e:
+            print(f"Error writing {self.directory} entry {key}: {e}")
+            return None
+        return key
+
+    def _write_bytes(self, key: str, meta: dict, data: bytes) -> str | None:
+        tmp_path = self._path(f"{key}.{uuid.uuid4().hex}", "tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            return self._write(key, meta, tmp_path)
+        except OSError as e:
+            print(f"Error writing {self.directory} entry {key}: {e}")
+            return None
+        finally:
+            _remove_quietly(tmp_path)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the store fits in max_bytes.
+        """
+        entries = {}
+        total = 0
+        stale_before = time.time() - 3600
+        for entry in os.scandir(self.directory):
+            key, _, ext = entry.name.partition(".")
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            if ext not in ("json", self.blob_ext):
+                # link ชั่วคราว (.serve/.tmp) ที่ค้างจาก process ที่ตายไป
+                if st.st_mtime < stale_before:
+                    _remove_quietly(entry.path)
+                continue
+            size, mtime = entries.get(key, (0, 0.0))
+            entries[key] = (size + st.st_size, max(mtime, st.st_mtime))
+            total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            # ลบ json ก่อนเพื่อให้ entry หายจาก get() ทันที
+            for ext in ("json", self.blob_ext):
+                _remove_quietly(self._path(key, ext))
+            total -= size
+            if total <= self.max_bytes:
+                break
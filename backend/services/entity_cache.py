@@ -0,0 +1,105 @@
+"""
+Read-through cache of Supabase rows in Redis, keyed by entity.
+
+Read functions in supabase_service go through cached() / get_many() with
+keys like ("project", teamid) or ("topic_by_teacher", tid); write
+functions call invalidate() with exactly the keys they change, so entries
+can live for ENTITY_CACHE_TTL (long) without serving stale data.
+invalidate() also drops the keys from the request's entity loaders, so a
+read after a write in the same request sees the new row.
+
+student, teacher and team rows are also written outside this service (team
+assignment, direct table edits), where nothing invalidates them. Those
+entities, and the reads that embed them, only live for
+ENTITY_CACHE_SHORT_TTL. Values are stored as JSON; a cached None means
+"known not to exist".
+
+The cache is shared by all workers through the Redis client passed to
+init_entity_cache() at startup. Without it (or when Redis fails) every call
+falls through to the database.
+"""
+import json
+from typing import Any, Awaitable, Callable, Iterable
+
+from config import ENTITY_CACHE_ENABLED, ENTITY_CACHE_TTL, ENTITY_CACHE_SHORT_TTL
+from services.entity_loader import clear_loaded
+
+_PREFIX = "entity"
+
+# entity ที่มีการเขียนจากนอก service นี้ (ไม่มีใครล้าง cache ให้): team_aggregate รวม student/teacher,
+# team_progress ขึ้นกับ team.teacherid
+SHORT_TTL_ENTITIES = frozenset({"student", "teacher", "team", "team_aggregate", "team_progress"})
+
+_redis = None
+
+
+def init_entity_cache(redis):
+    global _redis
+    _redis = redis if ENTITY_CACHE_ENABLED else None
+
+
+def entity_key(entity: str, entity_id) -> str:
+    return f"{_PREFIX}:{entity}:{entity_id}"
+
+
+def entity_ttl(entity: str) -> int:
+    return ENTITY_CACHE_SHORT_TTL if entity in SHORT_TTL_ENTITIES else ENTITY_CACHE_TTL
+
+
+async def get_many(entity: str, ids: Iterable) -> dict[str, Any]:
+    """
+    Returns {id: value} for the ids that are cached (value may be None).
+    """
+    ids = [str(i) for i in ids]
+    if _redis is None or not ids:
+        return {}
+    try:
+        values = await _redis.mget([entity_key(entity, i) for i in ids])
+    except Exception as e:
+        print(f"Entity cache read error: {e}")
+        return {}
+    return {i: json.loads(v) for i, v in zip(ids, values) if v is not None}
+
+
+async def set_many(entity: str, values: dict):
+    if _redis is None or not values:
+        return
+    try:
+        async with _redis.pipeline(transaction=False) as pipe:
+            for entity_id, value in values.items():
+                pipe.set(entity_key(entity, entity_id), json.dumps(value, default=str), ex=entity_ttl(entity))
+            await pipe.execute()
+    except Exception as e:
+        print(f"Entity cache write error: {e}")
+
+
+async def cached(entity: str, entity_id, load: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Returns the cached value of (entity, entity_id), or awaits load() and
+    caches its result. Exceptions from load() are not cached.
+    """
+    hits = await get_many(entity, [entity_id])
+    if str(entity_id) in hits:
+        return hits[str(entity_id)]
+
+    value = await load()
+    await set_many(entity, {str(entity_id): value})
+    return value
+
+
+async def invalidate(*keys: tuple[str, Any]):
+    """
+    Deletes (entity, id) entries, e.g. invalidate(("project", teamid)).
+    Keys with a None id are ignored.
+    """
+    keys = [(entity, entity_id) for entity, entity_id in keys if entity_id is not None]
+    for entity, entity_id in keys:
+        # loader ใช้ชื่อ/คีย์เดียวกับ entity (student/team/project/teacher)
+        clear_loaded(entity, entity_id)
+    names = [entity_key(entity, entity_id) for entity, entity_id in keys]
+    if _redis is None or not names:
+        return
+    try:
+        await _redis.delete(*names)
+    except Exception as e:
+        print(f"Entity cache invalidation error: {e}")
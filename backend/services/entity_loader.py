@@ -0,0 +1,139 @@
+"""
+Request-scoped batching and memoization of entity lookups (DataLoader style).
+
+Within one request every loader.load(key) made in the same event-loop tick
+is coalesced into a single batch call (one `in_()` query), and each key is
+resolved at most once for the rest of the request:
+
+    students = get_loader("student", batch_students)
+    a, b = await asyncio.gather(students.load("6401"), students.load("6402"))
+
+Loaders live in a per-request registry installed by
+RequestScopeMiddleware (or request_scope() in scripts); outside a request
+get_loader() returns a fresh, unshared loader so callers behave the same,
+just without reuse.
+"""
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+
+# batch function: รับ key หลายตัว คืน dict key -> row (key ที่ไม่พบไม่ต้องมีใน dict)
+BatchFn = Callable[[list[str]], Awaitable[dict[str, Any]]]
+
+_request_loaders: ContextVar[dict | None] = ContextVar("request_loaders", default=None)
+
+
+class DataLoader:
+    def __init__(self, batch_fn: BatchFn):
+        self.batch_fn = batch_fn
+        self._memo: dict[str, asyncio.Future] = {}
+        self._pending: list[tuple[str, asyncio.Future]] = []
+
+    def load(self, key) -> Awaitable[Any]:
+        """
+        Returns an awaitable for the row of key (None when not found).
+        """
+        key = str(key)
+        future = self._memo.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._memo[key] = future
+        if not self._pending:
+            # รวบ key ทั้งหมดที่ถูกขอใน tick นี้ แล้วค่อยยิง query เดียว
+            loop.call_soon(self._dispatch)
+        self._pending.append((key, future))
+        return future
+
+    async def load_many(self, keys) -> list[Any]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key, row):
+        """
+        Seeds the memo with a row fetched elsewhere (e.g. an embedded query).
+        """
+        key = str(key)
+        if key in self._memo:
+            return
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(row)
+        self._memo[key] = future
+
+    def clear(self, key):
+        """
+        Forgets key, so the next load() fetches it again (after a write).
+        """
+        self._memo.pop(str(key), None)
+
+    def _dispatch(self):
+        batch, self._pending = self._pending, []
+        asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]]):
+        try:
+            rows = await self.batch_fn([key for key, _ in batch])
+        except Exception as e:
+            for key, future in batch:
+                # ไม่ memo ความผิดพลาด: ครั้งหน้าจะลองใหม่
+                if self._memo.get(key) is future:
+                    del self._memo[key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # future ของ key ที่ถูก clear() ระหว่างรอยังได้ผลของ batch นี้ แต่ไม่อยู่ใน memo แล้ว
+        for key, future in batch:
+            if not future.done():
+                future.set_result(rows.get(key))
+
+
+def get_loader(name: str, batch_fn: BatchFn) -> DataLoader:
+    loaders = _request_loaders.get()
+    if loaders is None:
+        return DataLoader(batch_fn)
+
+    loader = loaders.get(name)
+    if loader is None:
+        loader = loaders[name] = DataLoader(batch_fn)
+    return loader
+
+
+def clear_loaded(name: str, key):
+    """
+    Drops key from the current request's loader name, if there is one.
+    """
+    loaders = _request_loaders.get()
+    if loaders is not None and name in loaders:
+        loaders[name].clear(key)
+
+
+@contextmanager
+def request_scope():
+    """
+    Gives the code inside the block its own loader registry (one request).
+    """
+    token = _request_loaders.set({})
+    try:
+        yield
+    finally:
+        _request_loaders.reset(token)
+
+
+class RequestScopeMiddleware:
+    """
+    ASGI middleware that gives every HTTP request its own loader registry.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with request_scope():
+            await self.app(scope, receive, send)
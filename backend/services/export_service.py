@@ -0,0 +1,81 @@
+"""
+Streaming export of whole Supabase tables as NDJSON or CSV.
+
+Rows are read EXPORT_PAGE_SIZE at a time with range (offset/limit) reads
+from the repository (ordered by the table's key so pages do not overlap) and each page is
+formatted and yielded before the next one is requested. Memory use does
+not depend on the table size and the first rows go out after the first
+page.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from config import EXPORT_PAGE_SIZE
+from services.repository import get_repository
+
+# ตารางที่ export ได้ -> คอลัมน์ที่ใช้เรียงลำดับ (ต้อง unique)
+EXPORT_TABLES = {
+    "student": "sid",
+    "team": "tmid",
+    "project": "pid",
+    "project_milestone": "pmid",
+    "topic": "tpid",
+    "doc": "did",
+}
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+async def iter_table_pages(table: str, page_size: int = EXPORT_PAGE_SIZE) -> AsyncIterator[list[dict]]:
+    """
+    Yields the rows of an EXPORT_TABLES table one page at a time.
+    Raises ValueError for a table that is not exportable.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table '{table}'. Available: {', '.join(EXPORT_TABLES)}")
+    order_column = EXPORT_TABLES[table]
+
+    start = 0
+    while True:
+        rows = await get_repository().select(table, order=[(order_column, False)], offset=start, limit=page_size)
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+async def stream_ndjson(pages: AsyncIterator[list[dict]]) -> AsyncIterator[str]:
+    async for rows in pages:
+        yield "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+
+
+async def stream_csv(pages: AsyncIterator[list[dict]]) -> AsyncIterator[str]:
+    """
+    CSV with a header taken from the first row; later columns that the first
+    row did not have are dropped.
+    """
+    writer = None
+    buffer = io.StringIO()
+    async for rows in pages:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(rows[0]), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerows({k: _csv_value(v) for k, v in row.items()} for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _csv_value(value):
+    # คอลัมน์ json/array เขียนเป็น JSON string
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def stream_export(table: str, fmt: str) -> AsyncIterator[str]:
+    pages = iter_table_pages(table)
+    return stream_csv(pages) if fmt == "csv" else stream_ndjson(pages)
@@ -0,0 +1,118 @@
+from starlette.concurrency import run_in_threadpool
+
+from config import PAGE_INDEX_ENABLED, KEYWORD_PROFILES, PDF_COMPACT_OUTPUT
+from services import page_index, pdf_service
+from services.pdf_executor import extract_pdf, index_pdf, run_pdf_task
+from services.pdf_service import SCAN_MODES
+from services.result_cache import get_result_cache, result_key
+from services.upload_service import new_temp_path, remove_file
+
+
+def resolve_keywords(profile: str | None = None, keywords: list[str] | None = None, mode: str | None = None) -> tuple[list[str], str]:
+    """
+    Resolves a request's keyword selection to (keywords, mode).
+    Inline keywords win over the profile's keywords and an explicit mode wins
+    over the profile's mode; with neither, the "abstract" profile is used.
+    Raises ValueError for an unknown profile or mode.
+    """
+    inline = [kw for kw in (keywords or []) if kw.strip()]
+    if profile is None and not inline:
+        profile = "abstract"
+    if profile is not None and profile not in KEYWORD_PROFILES:
+        raise ValueError(f"Unknown keyword profile '{profile}'. Available: {', '.join(KEYWORD_PROFILES)}")
+
+    selected = KEYWORD_PROFILES[profile] if profile else {}
+    keywords = inline or list(selected["keywords"])
+    mode = mode or selected.get("mode", "all")
+
+    if mode not in SCAN_MODES:
+        raise ValueError(f"Invalid mode. Must be one of {SCAN_MODES}.")
+    return keywords, mode
+
+
+async def _index_hash(sha256: str, index: bool) -> str | None:
+    """
+    The doc_hash to give the PDF pool: the upload's sha256 when the caller
+    asked for indexing, or when the document is already indexed (then the
+    stored text is only read). None keeps the scan away from the index.
+    """
+    if not PAGE_INDEX_ENABLED:
+        return None
+    if index or await run_in_threadpool(page_index.is_indexed, sha256):
+        return sha256
+    return None
+
+
+async def _complete_index(source: bytes | str, sha256: str):
+    """
+    Makes sure an index=true upload ends up queryable under /pdf-index: runs
+    a text-only full scan when the extraction did not index the document
+    (result cache hit, last-occurrence scan), then keeps the source.
+    """
+    if not PAGE_INDEX_ENABLED:
+        return
+    if not await run_in_threadpool(page_index.is_indexed, sha256):
+        await index_pdf(source, sha256)
+    # เก็บต้นฉบับไว้สำหรับ /pdf-index/{doc_hash}/extract โดยไม่ต้อง upload ใหม่
+    await run_in_threadpool(page_index.store_source, sha256, source)
+
+
+async def run_cached_extraction(source: bytes | str, sha256: str, mode: str, keywords: list[str], compact: bool = PDF_COMPACT_OUTPUT, index: bool = False) -> tuple[list[int], str, str | None]:
+    """
+    Runs a page extraction through the result cache.
+    Answers from the cache when the same document + mode + keyword set was seen
+    before, otherwise runs the scan on the PDF pool and caches the result.
+
+    Returns (matched_pages, doc_id, pdf_path). pdf_path is a private file the
+    caller owns (stream it with pdf_file_response or move it, then delete it);
+    it is None when nothing matched. doc_id is the cache key, so it is stable
+    across re-uploads of the same file. index=True stores the page text and
+    the upload for /pdf-index.
+    """
+    doc_id = result_key(sha256, mode, keywords, compact)
+    cache = get_result_cache()
+
+    if cache is not None:
+        cached = await run_in_threadpool(cache.get, doc_id)
+        if cached is not None:
+            # เจอใน cache: ไม่ต้องเปิด PDF เลย (ยกเว้นขอ index และเอกสารยังไม่อยู่ใน index)
+            matched_pages, serve_path = cached
+            if index:
+                await _complete_index(source, sha256)
+            return matched_pages, doc_id, serve_path
+
+    out_path = new_temp_path()
+    try:
+        # เอกสารใหญ่จะถูกแบ่ง shard ตามช่วงหน้า ข้อความทุกหน้าถูกเก็บลง page index เมื่อขอ index
+        doc_hash = await _index_hash(sha256, index)
+        matched_pages, _ = await extract_pdf(source, keywords, mode, out_path, doc_id, doc_hash, compact)
+    except BaseException:
+        remove_file(out_path)
+        raise
+
+    if index:
+        await _complete_index(source, sha256)
+
+    if cache is not None:
+        await run_in_threadpool(cache.put, doc_id, matched_pages, out_path if matched_pages else None)
+
+    if not matched_pages:
+        remove_file(out_path)
+        return matched_pages, doc_id, None
+
+    return matched_pages, doc_id, out_path
+
+
+async def locate_pages(source: bytes | str, sha256: str, mode: str, keywords: list[str], index: bool = False) -> list[dict]:
+    """
+    Page-list-only extraction for clients that already have the file:
+    returns [{"page", "matches": [{"keyword", "start", "end"}]}] without
+    building a PDF. Offsets are character offsets into the page text.
+    """
+    doc_hash = await _index_hash(sha256, index)
+    located = await run_pdf_task(pdf_service.locate_keyword_pages, source, keywords, mode, doc_hash)
+
+    if index:
+        await _complete_index(source, sha256)
+
+    return located
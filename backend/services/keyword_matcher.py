@@ -0,0 +1,170 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+from config import MATCHER_CACHE_SIZE
+
+# อักขระความกว้างศูนย์ / soft hyphen ถูกตัดทิ้ง ส่วนช่องว่างทุกชนิด (รวมขึ้นบรรทัดใหม่) กลายเป็น " "
+_TRANSLATE = {cp: " " for cp in range(0x3001) if chr(cp).isspace()}
+_TRANSLATE.update({cp: None for cp in (0x00AD, 0x200B, 0x200C, 0x200D, 0x2060, 0xFEFF)})
+
+# ช่องว่างที่ติดกันเหลือช่องเดียว แต่ถ้าอยู่ติดอักษรไทยจะตัดทิ้ง
+# (PDF ภาษาไทยมักมีช่องว่างหรือขึ้นบรรทัดใหม่แทรกกลางคำ เช่น "บทที่ 5" กับ "บทที่5";
+# ภาษาอังกฤษยังแยกคำเหมือนเดิม: "Key words" ไม่ match "Keywords")
+_SPACE_RUN = re.compile(" +")
+_THAI_CHAR = re.compile("[\u0e00-\u0e7f]")
+
+# ลำดับมาตรฐานของเครื่องหมายไทยที่ซ้อนบนตัวอักษรเดียวกัน:
+# สระบน/ล่าง -> วรรณยุกต์ -> การันต์/นิคหิต (สระอำถูก NFKC แยกเป็น นิคหิต + สระอา)
+_THAI_MARK_RANK = {ch: 0 for ch in "ัิีึืฺุู็"}
+_THAI_MARK_RANK.update({ch: 1 for ch in "่้๊๋"})
+_THAI_MARK_RANK.update({ch: 2 for ch in "์ํ๎"})
+_THAI_MARK_RUN = re.compile("[\u0e31\u0e34-\u0e3a\u0e47-\u0e4e]{2,}")
+
+
+def _space_runs(text: str):
+    """
+    Yields (start, end, keep) per run of spaces; keep is False when the run
+    touches a Thai character on either side.
+    """
+    for match in _SPACE_RUN.finditer(text):
+        start, end = match.span()
+        thai = (start > 0 and _THAI_CHAR.match(text, start - 1)) or (end < len(text) and _THAI_CHAR.match(text, end))
+        yield start, end, not thai
+
+
+def _sort_marks(match: re.Match) -> str:
+    return "".join(sorted(match.group(), key=_THAI_MARK_RANK.__getitem__))
+
+
+def normalize(text: str) -> str:
+    """
+    Normalizes text for keyword matching: NFKC, drops zero-width characters,
+    collapses each whitespace run to one space (removed next to Thai
+    characters), puts stacked Thai marks in a fixed order and casefolds.
+    Keywords and page text must go through the same function.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    text = text.translate(_TRANSLATE)
+    parts = []
+    last = 0
+    for start, end, keep in _space_runs(text):
+        parts.append(text[last:start])
+        if keep:
+            parts.append(" ")
+        last = end
+    parts.append(text[last:])
+    text = _THAI_MARK_RUN.sub(_sort_marks, "".join(parts))
+    return text.casefold()
+
+
+def normalize_with_offsets(text: str) -> tuple[str, list[int]]:
+    """
+    Same as normalize() (character by character), but also returns for every
+    normalized character the index of the original character it came from,
+    so match positions can be mapped back to the original text.
+    """
+    chars = []
+    offsets = []
+    for index, ch in enumerate(text):
+        for out in unicodedata.normalize("NFKC", ch).translate(_TRANSLATE).casefold():
+            chars.append(out)
+            offsets.append(index)
+
+    # ช่องว่างตามกฎเดียวกับ normalize(): เหลือตัวแรกของแต่ละช่วง หรือตัดทิ้งทั้งช่วงถ้าติดอักษรไทย
+    drop = set()
+    for start, end, keep in _space_runs("".join(chars)):
+        drop.update(range(start + 1 if keep else start, end))
+    if drop:
+        chars = [ch for i, ch in enumerate(chars) if i not in drop]
+        offsets = [index for i, index in enumerate(offsets) if i not in drop]
+
+    for run in _THAI_MARK_RUN.finditer("".join(chars)):
+        start, end = run.span()
+        marks = sorted(zip(chars[start:end], offsets[start:end]), key=lambda m: _THAI_MARK_RANK[m[0]])
+        chars[start:end] = [ch for ch, _ in marks]
+        offsets[start:end] = [index for _, index in marks]
+
+    return "".join(chars), offsets
+
+
+class KeywordMatcher:
+    """
+    Matches a fixed keyword set against text in a single pass.
+    Built once per keyword set; all keywords are compiled into one regex
+    alternation (longest first), so the scan runs in the C regex engine
+    instead of one substring search per keyword.
+    """
+
+    def __init__(self, keywords: list[str]):
+        self.keywords = list(keywords)
+
+        # keyword ที่ normalize แล้วได้คำเดียวกัน (เช่น "บทที่ 5" กับ "บทที่5") รวมเป็น pattern เดียว
+        self._originals: dict[str, list[str]] = {}
+        for kw in self.keywords:
+            # ช่องว่างหัวท้ายของ keyword ไม่มีความหมาย
+            pattern = normalize(kw).strip()
+            if pattern:
+                self._originals.setdefault(pattern, []).append(kw)
+
+        patterns = sorted(self._originals, key=len, reverse=True)
+        alternation = "|".join(re.escape(p) for p in patterns)
+        self._any = re.compile(alternation) if patterns else None
+        # lookahead ทำให้ได้ match ทุกตำแหน่งแม้ keyword จะซ้อนกัน
+        self._all = re.compile(f"(?=({alternation}))") if patterns else None
+
+        # ที่ตำแหน่งเดียวกัน keyword ที่สั้นกว่าจะ match ได้ก็ต่อเมื่อเป็น prefix ของตัวที่ยาวที่สุดที่ match
+        self._prefixes = {
+            p: [q for q in patterns if q != p and p.startswith(q)]
+            for p in patterns
+        }
+
+    def search_normalized(self, text: str) -> bool:
+        return self._any is not None and self._any.search(text) is not None
+
+    def search(self, text: str) -> bool:
+        """
+        True when any keyword occurs in text.
+        """
+        return self.search_normalized(normalize(text))
+
+    def find_normalized(self, text: str) -> set[str]:
+        found = set()
+        if self._all is None:
+            return found
+        for match in self._all.finditer(text):
+            pattern = match.group(1)
+            found.add(pattern)
+            found.update(self._prefixes[pattern])
+        return {kw for pattern in found for kw in self._originals[pattern]}
+
+    def spans_normalized(self, text: str) -> list[tuple[int, int, str]]:
+        """
+        Returns (start, end, keyword) for every occurrence in normalized text,
+        taking the longest keyword at each position.
+        """
+        if self._all is None:
+            return []
+        return [
+            (match.start(1), match.end(1), self._originals[match.group(1)][0])
+            for match in self._all.finditer(text)
+        ]
+
+    def find(self, text: str) -> set[str]:
+        """
+        Returns the keywords (as originally given) that occur in text.
+        """
+        return self.find_normalized(normalize(text))
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _cached_matcher(keywords: tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(list(keywords))
+
+
+def get_matcher(keywords: list[str]) -> KeywordMatcher:
+    """
+    Returns the compiled matcher for a keyword set from a small per-process LRU,
+    so repeated requests with the same profile don't rebuild it.
+    """
+    return _cached_matcher(tuple(sorted(set(keywords))))
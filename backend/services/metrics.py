@@ -0,0 +1,238 @@
+"""
+Request metrics: Prometheus counters/histograms and a Server-Timing header.
+
+MetricsMiddleware opens a per-request context. Code that talks to a
+backend wraps the call in track(category):
+
+    with metrics.track("n8n"):
+        response = await client.post(url, json=payload)
+
+- "db" calls are recorded by InstrumentedRepository
+  (services/repository.py), with table, operation and row count.
+- "n8n" calls are the webhook calls in the routers.
+- "pdf" time is spent on the PDF process pool.
+
+Per category the request keeps the wall time during which at least one
+such call was running. Concurrent calls are not double counted. That time
+is sent as
+
+    Server-Timing: db;dur=12.4;desc="5 calls", n8n;dur=850.1, pdf;dur=0, app;dur=870.3
+
+The same calls feed the metrics served at /metrics in the Prometheus text
+format, labelled by route template:
+
+    siam_http_requests_total / siam_http_request_duration_seconds
+    siam_db_calls_total / siam_db_call_duration_seconds / siam_db_rows_total
+    siam_external_call_duration_seconds (n8n, pdf)
+
+Metrics live in the worker process; with several workers each one serves
+its own numbers. The registry is small and in-house, so prometheus_client
+is not needed.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config import METRICS_ENABLED, SERVER_TIMING_ENABLED
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TIMING_CATEGORIES = ("db", "n8n", "pdf")
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> (type, help)
+        self._meta: dict[str, tuple[str, str]] = {}
+        # (name, labels) -> value / [bucket counts..., sum, count]
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._histograms: dict[tuple[str, tuple], list[float]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, labels: dict, value: float = 1.0):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: dict, value: float):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            state = self._histograms.get(key)
+            if state is None:
+                state = self._histograms[key] = [0.0] * (len(DEFAULT_BUCKETS) + 2)
+            for i, bound in enumerate(DEFAULT_BUCKETS):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+
+        for name, (kind, help_text) in sorted(self._meta.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            for (metric, labels), state in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(DEFAULT_BUCKETS, state):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {_number(count)}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {_number(state[-1])}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(state[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {_number(state[-1])}")
+        return "\n".join(lines) + "\n"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    pairs = (
+        f'{k}="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+registry = Registry()
+registry.describe("siam_http_requests_total", "counter", "HTTP requests by route, method and status.")
+registry.describe("siam_http_request_duration_seconds", "histogram", "HTTP request latency by route and method.")
+registry.describe("siam_db_calls_total", "counter", "Data-access calls by route, table and operation.")
+registry.describe("siam_db_call_duration_seconds", "histogram", "Data-access call latency by route, table and operation.")
+registry.describe("siam_db_rows_total", "counter", "Rows returned by data-access calls by route, table and operation.")
+registry.describe("siam_external_call_duration_seconds", "histogram", "n8n webhook and PDF pool call latency by route.")
+
+
+class RequestTiming:
+    """
+    Busy time per category for one request (overlapping calls count once).
+    """
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.totals = {category: 0.0 for category in TIMING_CATEGORIES}
+        self.calls = {category: 0 for category in TIMING_CATEGORIES}
+        self._active: dict[str, int] = {}
+        self._since: dict[str, float] = {}
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def enter(self, category: str):
+        self.calls[category] = self.calls.get(category, 0) + 1
+        if self._active.get(category, 0) == 0:
+            self._since[category] = time.perf_counter()
+        self._active[category] = self._active.get(category, 0) + 1
+
+    def leave(self, category: str):
+        self._active[category] -= 1
+        if self._active[category] == 0:
+            self.totals[category] = self.totals.get(category, 0.0) + time.perf_counter() - self._since.pop(category)
+
+    def server_timing(self) -> str:
+        parts = []
+        for category in TIMING_CATEGORIES:
+            part = f"{category};dur={self.totals[category] * 1000:.1f}"
+            calls = self.calls[category]
+            if calls:
+                part += f';desc="{calls} call{"s" if calls > 1 else ""}"'
+            parts.append(part)
+        parts.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def current_route() -> str:
+    timing = _current.get()
+    return timing.route if timing is not None else "-"
+
+
+@contextmanager
+def track(category: str):
+    """
+    Times the block as a call of category ("db", "n8n" or "pdf") for the
+    current request's Server-Timing; n8n/pdf calls are also observed in
+    siam_external_call_duration_seconds.
+    """
+    timing = _current.get()
+    if timing is not None:
+        timing.enter(category)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timing is not None:
+            timing.leave(category)
+        if METRICS_ENABLED and category != "db":
+            registry.observe("siam_external_call_duration_seconds", {"route": current_route(), "target": category}, elapsed)
+
+
+def record_db_call(table: str, operation: str, seconds: float, rows: int):
+    if not METRICS_ENABLED:
+        return
+    labels = {"route": current_route(), "table": table, "operation": operation}
+    registry.inc("siam_db_calls_total", labels)
+    registry.observe("siam_db_call_duration_seconds", labels, seconds)
+    registry.inc("siam_db_rows_total", labels, rows)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: per-request timing context, HTTP metrics and the
+    Server-Timing response header. For streaming responses the header
+    covers the time until the response started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(scope)
+        token = _current.set(timing)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timing.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if METRICS_ENABLED:
+                labels = {"route": timing.route, "method": scope["method"]}
+                registry.inc("siam_http_requests_total", {**labels, "status": str(status_code)})
+                registry.observe("siam_http_request_duration_seconds", labels, time.perf_counter() - timing.started)
@@ -0,0 +1,242 @@
+"""
+Persistent per-page text index of uploaded PDFs (SQLite + FTS5).
+
+The text of every page is stored once per document hash (sha256 of the upload),
+both as extracted and normalized for keyword matching. Keyword queries on an
+indexed document run against the stored text instead of re-running
+page.get_text() over the whole file, and the FTS5 trigram table answers
+free-text/phrase searches (trigram works for Thai, which has no word spaces).
+
+Documents are only indexed when the caller asks for it (index=true on the
+extraction routes). The index is capped by PAGE_INDEX_MAX_BYTES of stored
+text and PAGE_INDEX_MAX_AGE: mark_indexed() evicts the oldest documents,
+whose FTS rows go with them through the page_text_ad trigger.
+
+The database is written from the PDF worker processes, so it runs in WAL mode
+with a busy timeout; every call opens its own short-lived connection.
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from config import PAGE_INDEX_ENABLED, PAGE_INDEX_PATH, PAGE_INDEX_MAX_BYTES, PAGE_INDEX_MAX_AGE, SOURCE_STORE_DIR, SOURCE_STORE_MAX_BYTES
+from services.disk_store import DiskLRUStore
+from services.keyword_matcher import get_matcher
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_hash TEXT PRIMARY KEY,
+    page_count INTEGER NOT NULL,
+    indexed_at REAL NOT NULL,
+    text_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS page_text (
+    id INTEGER PRIMARY KEY,
+    doc_hash TEXT NOT NULL,
+    page_no INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    norm TEXT NOT NULL,
+    UNIQUE (doc_hash, page_no)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS page_fts USING fts5(
+    text, content='page_text', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS page_text_ai AFTER INSERT ON page_text BEGIN
+    INSERT INTO page_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS page_text_ad AFTER DELETE ON page_text BEGIN
+    INSERT INTO page_fts(page_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+_DROP_SCHEMA = """
+DROP TRIGGER IF EXISTS page_text_ai;
+DROP TRIGGER IF EXISTS page_text_ad;
+DROP TABLE IF EXISTS page_fts;
+DROP TABLE IF EXISTS page_text;
+DROP TABLE IF EXISTS documents;
+"""
+
+# เพิ่มค่านี้เมื่อ schema หรือ keyword_matcher.normalize() เปลี่ยน: index เดิมจะถูกสร้างใหม่ทั้งหมด
+INDEX_VERSION = 3
+
+_initialized = False
+
+
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    if not _initialized:
+        os.makedirs(os.path.dirname(PAGE_INDEX_PATH), exist_ok=True)
+
+    conn = sqlite3.connect(PAGE_INDEX_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if not _initialized:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+            conn.executescript(_DROP_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        conn.executescript(_SCHEMA)
+        _initialized = True
+    return conn
+
+
+@contextmanager
+def _db():
+    # commit เมื่อจบ block แล้วปิด connection ทุกครั้ง
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def is_indexed(doc_hash: str) -> bool:
+    if not PAGE_INDEX_ENABLED:
+        return False
+    with _db() as conn:
+        row = conn.execute("SELECT 1 FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+    return row is not None
+
+
+def get_document(doc_hash: str) -> dict | None:
+    with _db() as conn:
+        row = conn.execute(
+            "SELECT page_count, indexed_at FROM documents WHERE doc_hash = ?", (doc_hash,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {"doc_hash": doc_hash, "page_count": row[0], "indexed_at": row[1]}
+
+
+def store_pages(doc_hash: str, pages: list[tuple[int, str, str]]):
+    """
+    Stores (1-based page_no, text, normalized text) rows. Called per shard; the
+    document only becomes visible to queries once mark_indexed() is called for it.
+    """
+    if not pages:
+        return
+    rows = [(doc_hash, page_no, text, norm) for page_no, text, norm in pages]
+    with _db() as conn:
+        conn.execute(
+            "DELETE FROM page_text WHERE doc_hash = ? AND page_no BETWEEN ? AND ?",
+            (doc_hash, pages[0][0], pages[-1][0]),
+        )
+        conn.executemany(
+            "INSERT INTO page_text (doc_hash, page_no, text, norm) VALUES (?, ?, ?, ?)", rows
+        )
+
+
+def mark_indexed(doc_hash: str, page_count: int):
+    with _db() as conn:
+        (text_bytes,) = conn.execute(
+            "SELECT COALESCE(SUM(length(CAST(text AS BLOB)) + length(CAST(norm AS BLOB))), 0) FROM page_text WHERE doc_hash = ?",
+            (doc_hash,),
+        ).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (doc_hash, page_count, indexed_at, text_bytes) VALUES (?, ?, ?, ?)",
+            (doc_hash, page_count, time.time(), text_bytes),
+        )
+        _evict(conn)
+
+
+def _evict(conn: sqlite3.Connection):
+    """
+    Deletes documents older than PAGE_INDEX_MAX_AGE, then the oldest ones
+    until the stored text fits in PAGE_INDEX_MAX_BYTES.
+    """
+    min_indexed_at = time.time() - PAGE_INDEX_MAX_AGE if PAGE_INDEX_MAX_AGE > 0 else 0
+    stale = [
+        doc_hash for (doc_hash,) in conn.execute(
+            """
+            SELECT doc_hash FROM (
+                SELECT doc_hash, indexed_at,
+                       SUM(text_bytes) OVER (ORDER BY indexed_at DESC, doc_hash) AS running_bytes
+                FROM documents
+            )
+            WHERE running_bytes > ? OR indexed_at < ?
+            """,
+            (PAGE_INDEX_MAX_BYTES, min_indexed_at),
+        )
+    ]
+    for doc_hash in stale:
+        # ลบ page_text แล้ว trigger page_text_ad จะลบแถวใน page_fts ให้
+        conn.execute("DELETE FROM page_text WHERE doc_hash = ?", (doc_hash,))
+        conn.execute("DELETE FROM documents WHERE doc_hash = ?", (doc_hash,))
+
+
+def get_norms(doc_hash: str, start: int = 0, stop: int | None = None) -> list[tuple[int, str]]:
+    """
+    Returns [(1-based page_no, normalized text)] for 0-based pages [start, stop).
+    """
+    stop = stop if stop is not None else 2 ** 31
+    with _db() as conn:
+        return conn.execute(
+            "SELECT page_no, norm FROM page_text WHERE doc_hash = ? AND page_no > ? AND page_no <= ? ORDER BY page_no",
+            (doc_hash, start, stop),
+        ).fetchall()
+
+
+def query_pages(doc_hash: str, keywords: list[str], mode: str = "all") -> list[int]:
+    """
+    Keyword query against an indexed document, with the same matching rules as
+    pdf_service.scan_document(). Returns 1-based page numbers.
+    """
+    matcher = get_matcher(keywords)
+    rows = get_norms(doc_hash)
+
+    if mode == "last-occurrence":
+        for page_no, norm in reversed(rows):
+            if matcher.search_normalized(norm):
+                return [page_no]
+        return []
+
+    return [page_no for page_no, norm in rows if matcher.search_normalized(norm)]
+
+
+def search(doc_hash: str, query: str, limit: int = 50) -> list[dict]:
+    """
+    Free-text / phrase search in one document via FTS5 (queries need at least
+    3 characters for the trigram tokenizer). Returns [{"page", "snippet"}].
+    """
+    phrase = '"' + query.replace('"', '""') + '"'
+    with _db() as conn:
+        rows = conn.execute(
+            """
+            SELECT p.page_no, snippet(page_fts, 0, '[', ']', '…', 16)
+            FROM page_fts JOIN page_text p ON p.id = page_fts.rowid
+            WHERE page_fts MATCH ? AND p.doc_hash = ?
+            ORDER BY p.page_no
+            LIMIT ?
+            """,
+            (phrase, doc_hash, limit),
+        ).fetchall()
+    return [{"page": page_no, "snippet": snippet} for page_no, snippet in rows]
+
+
+_source_store: DiskLRUStore | None = None
+
+
+def get_source_store() -> DiskLRUStore:
+    """
+    Original uploads by document hash, so pages can be extracted from an indexed
+    document without uploading it again.
+    """
+    global _source_store
+    if _source_store is None:
+        _source_store = DiskLRUStore(SOURCE_STORE_DIR, SOURCE_STORE_MAX_BYTES)
+    return _source_store
+
+
+def store_source(doc_hash: str, source: bytes | str):
+    """
+    Keeps a copy of an upload (bytes or temp file path) in the source store.
+    """
+    store = get_source_store()
+    if store.contains(doc_hash):
+        return
+    if isinstance(source, str):
+        store.put(doc_hash, {}, source)
+    else:
+        store.put_bytes(doc_hash, {}, source)
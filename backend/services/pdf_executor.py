@@ -0,0 +1,137 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain
+
+from starlette.concurrency import run_in_threadpool
+
+from config import PDF_MAX_WORKERS, PDF_MAX_CONCURRENCY, PDF_SHARD_MIN_PAGES, PDF_SHARD_PAGES, PAGE_INDEX_ENABLED
+from services import metrics, page_index, pdf_service
+
+# งาน PyMuPDF ทั้งหมดรันใน process pool เพื่อไม่ให้ block event loop ของ uvicorn
+_executor: ProcessPoolExecutor | None = None
+_semaphore: asyncio.Semaphore | None = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # ใช้ spawn เพราะ fork จาก process ที่มี event loop/thread อยู่แล้วไม่ปลอดภัย
+        _executor = ProcessPoolExecutor(
+            max_workers=PDF_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor(wait: bool = False):
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PDF_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def _submit(fn, *args):
+    loop = asyncio.get_running_loop()
+    # เวลาใน process pool นับเป็น "pdf" ใน Server-Timing ของ request
+    with metrics.track("pdf"):
+        return await loop.run_in_executor(get_executor(), partial(fn, *args))
+
+
+async def run_pdf_task(fn, *args):
+    """
+    Runs a single pdf_service function on the process pool, queued behind
+    PDF_MAX_CONCURRENCY like extract_pdf().
+    """
+    async with _get_semaphore():
+        return await _submit(fn, *args)
+
+
+def page_shards(page_count: int) -> list[tuple[int, int]]:
+    """
+    Splits [0, page_count) into contiguous 0-based page ranges of PDF_SHARD_PAGES pages.
+    """
+    return [
+        (start, min(start + PDF_SHARD_PAGES, page_count))
+        for start in range(0, page_count, PDF_SHARD_PAGES)
+    ]
+
+
+async def _scan_all(source: bytes | str, keywords: list[str], out_path: str | None, doc_uuid: str | None, doc_hash: str | None, compact: bool) -> tuple[list[int], str | None] | None:
+    """
+    "all" extraction without a separate page count round trip: the first
+    worker extracts a small document completely, or scans the first shard of
+    a large one and reports the page count; only then are the remaining
+    shards scanned in parallel and the 1-based results merged. Returns
+    (pages, doc_uuid) when the first worker already wrote the PDF, or
+    (pages, None) for a sharded scan whose PDF is still to be built. Returns
+    None when the document is already in the page text index (then a single
+    worker answers from the index).
+    """
+    if doc_hash and await run_in_threadpool(page_index.is_indexed, doc_hash):
+        return None
+
+    page_count, head_pages, doc_uuid = await _submit(
+        pdf_service.extract_or_scan_first_shard,
+        source, keywords, out_path, doc_uuid, doc_hash, compact, PDF_SHARD_MIN_PAGES, PDF_SHARD_PAGES,
+    )
+    if page_count < PDF_SHARD_MIN_PAGES:
+        return head_pages, doc_uuid
+
+    results = await asyncio.gather(
+        *(
+            _submit(pdf_service.scan_keyword_page_range, source, keywords, start, stop, doc_hash)
+            for start, stop in page_shards(page_count)[1:]
+        )
+    )
+
+    # ทุก shard เขียนข้อความของช่วงหน้าตัวเองลง index แล้ว: ประกาศว่า index ครบ
+    if doc_hash and PAGE_INDEX_ENABLED:
+        await run_in_threadpool(page_index.mark_indexed, doc_hash, page_count)
+
+    return sorted(set(chain(head_pages, *results))), None
+
+
+async def extract_pdf(source: bytes | str, keywords: list[str], mode: str, out_path: str, doc_uuid: str | None = None, doc_hash: str | None = None, compact: bool = False) -> tuple[list[int], str | None]:
+    """
+    Selects the pages of `source` (bytes or a file path) for the scan mode on the
+    process pool and writes the filtered PDF to out_path. Returns (pages, doc_uuid).
+    doc_hash (sha256 of the upload) enables the page text index; compact
+    writes a compacted PDF (see pdf_service.save_pdf_from_doc).
+
+    "all" scans of large documents are sharded by page range; "last-occurrence"
+    is not, since the reverse scan stops at the first hit from the end and
+    usually reads only the tail of the document.
+    """
+    async with _get_semaphore():
+        scanned = None
+        if mode == "all":
+            scanned = await _scan_all(source, keywords, out_path, doc_uuid, doc_hash, compact)
+
+        # เอกสารที่ index แล้ว / last-occurrence: เปิดครั้งเดียวใน process เดียวทั้งค้นหาและสร้าง PDF
+        if scanned is None:
+            return await _submit(pdf_service.extract_pages_to_file, source, keywords, mode, out_path, doc_uuid, doc_hash, compact)
+
+        matched_pages, written_uuid = scanned
+        if written_uuid is not None or not matched_pages:
+            return matched_pages, written_uuid
+
+        doc_uuid = await _submit(pdf_service.create_pdf_file_with_pages, source, matched_pages, out_path, doc_uuid, compact)
+        return matched_pages, doc_uuid
+
+
+async def index_pdf(source: bytes | str, doc_hash: str):
+    """
+    Fills the page text index for a document without extracting anything:
+    a full "all" scan with no keywords (sharded like extract_pdf).
+    """
+    async with _get_semaphore():
+        await _scan_all(source, [], None, None, doc_hash, False)
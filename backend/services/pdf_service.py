@@ -1,64 +1,187 @@
 import fitz
 import io
 import uuid
+from typing import Iterator
 
-def filter_pages(file_obj: io.BytesIO, keywords: list[str]) -> list[int]:
+from config import CHAPTER_5_KEYWORDS
+from services import page_index
+from services.keyword_matcher import get_matcher, normalize, normalize_with_offsets
+from services.text_service import clean_pages
+
+# คำที่ใช้หาหน้าสุดท้ายของบทที่ 5 (matcher ตัดช่องว่างที่ติดอักษรไทย จึงครอบคลุม "บทที่5" ด้วย)
+SPECIFIC_KEYWORDS = CHAPTER_5_KEYWORDS
+
+# flags ที่ถูกที่สุดสำหรับดึงข้อความไว้ค้นหา: ไม่เก็บรูป, ไม่รักษา ligature/whitespace/layout
+# (matcher ยุบช่องว่างเองอยู่แล้ว และ ligature ที่ถูกแตกเป็นตัวอักษรปกติค้นหาได้ง่ายกว่า)
+SCAN_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+
+# โหมดการค้นหา: "all" = ทุกหน้าที่เจอ, "last-occurrence" = หน้าสุดท้ายที่เจอ + หน้าถัดไป
+SCAN_MODES = ("all", "last-occurrence")
+
+
+def scan_pages(doc: fitz.Document, keywords: list[str], start: int = 0, stop: int | None = None, doc_hash: str | None = None) -> list[int]:
     """
-    Finds pages in a PDF that contain any of the given keywords.
-    Special case: if the keyword is 'บทที่ 5', only keep the last page where it appears.
+    Scans pages [start, stop) of an opened document and returns the 1-based pages
+    that contain any of the keywords. Matching ignores case, the amount of
+    whitespace (and whitespace next to Thai text), zero-width characters and
+    Thai mark order (see services/keyword_matcher.py).
+
+    With doc_hash, pages come from the page text index when the document is
+    already indexed; otherwise the extracted text is written to the index.
     """
-    doc = fitz.open(stream=file_obj, filetype="pdf")
+    if stop is None or stop > len(doc):
+        stop = len(doc)
+
+    # compile matcher ครั้งเดียวก่อนวนทุกหน้า
+    matcher = get_matcher(keywords)
+
+    # เคย index แล้ว: ค้นจากข้อความที่เก็บไว้ ไม่ต้อง get_text() ใหม่
+    if doc_hash and page_index.is_indexed(doc_hash):
+        return [
+            page_no for page_no, norm in page_index.get_norms(doc_hash, start, stop)
+            if matcher.search_normalized(norm)
+        ]
+
+    store = bool(doc_hash) and page_index.PAGE_INDEX_ENABLED
+    indexed_rows = []
 
     matched_pages = []
-    special_keyword = "บทที่ 5"
-    special_pages = []
-    
-    for page_num in range(len(doc)):
+    for page_num in range(start, stop):
         page = doc.load_page(page_num)
-        text = page.get_text()
+        text = page.get_text("text", flags=SCAN_TEXT_FLAGS)
+        norm = normalize(text)
 
-        # lowercase เพื่อค้นหาแบบไม่สนตัวพิมพ์เล็ก/ใหญ่
-        lower_text = text.lower()
-
-        # เก็บหน้าสำหรับทุก keyword ปกติ
-        if any(kw.lower() in lower_text for kw in keywords if kw != special_keyword):
+        # ค้นหาทุก keyword ในการอ่านข้อความหน้าเดียวรอบเดียว
+        if matcher.search_normalized(norm):
             matched_pages.append(page_num + 1)
+        if store:
+            indexed_rows.append((page_num + 1, text, norm))
 
+    if store:
+        page_index.store_pages(doc_hash, indexed_rows)
 
+    return matched_pages
 
-    doc.close()
 
-    # ถ้ามีเจอ "บทที่ 5" ให้เอาเฉพาะหน้าสุดท้ายและหน้าสุดท้าย + 1
-    # if special_pages:
-    #     print(special_pages)
-    #     matched_pages.append(special_pages[-1])
-    #     matched_pages.append(special_pages[-1] + 1)
-        
+def find_last_page(doc: fitz.Document, keywords: list[str], doc_hash: str | None = None) -> int | None:
+    """
+    Walks pages from the end and returns the 1-based number of the last page
+    containing any keyword, stopping at the first hit. Returns None if none match.
+    """
+    if doc_hash and page_index.is_indexed(doc_hash):
+        pages = page_index.query_pages(doc_hash, keywords, "last-occurrence")
+        return pages[0] if pages else None
+
+    matcher = get_matcher(keywords)
+
+    for page_num in range(len(doc) - 1, -1, -1):
+        page = doc.load_page(page_num)
+        if matcher.search(page.get_text("text", flags=SCAN_TEXT_FLAGS)):
+            return page_num + 1
+
+    return None
+
 
+def find_keyword_pages(doc: fitz.Document, keywords: list[str], start: int = 0, stop: int | None = None, doc_hash: str | None = None) -> list[int]:
+    """
+    Scans an opened document and returns the 1-based pages that contain any
+    of the keywords. Every keyword is matched as given; the last-occurrence
+    rule for chapter 5 is a scan mode (see scan_document), not a keyword.
+    """
     # ลบเลขหน้าซ้ำ และเรียงลำดับ
-    matched_pages = sorted(set(matched_pages))
+    return sorted(set(scan_pages(doc, keywords, start, stop, doc_hash)))
 
-    return matched_pages
 
+def select_last_occurrence(matched_pages: list[int]) -> list[int]:
+    """
+    Keeps only the last matched page and the page right after it.
+    """
+    selected_pages = []
+
+    # ถ้ามีหน้าที่เจอ ให้เอาเฉพาะหน้าสุดท้ายและหน้าสุดท้าย + 1
+    if matched_pages:
+        last_page = max(matched_pages)
+        selected_pages.append(last_page)
+        selected_pages.append(last_page + 1)
+
+    # ลบเลขหน้าซ้ำ และเรียงลำดับ
+    return sorted(set(selected_pages))
 
-def create_pdf_with_pages(file_obj: io.BytesIO, pages_to_keep: list[int]) -> bytes:
+
+def scan_document(doc: fitz.Document, keywords: list[str], mode: str = "all", doc_hash: str | None = None) -> list[int]:
     """
-    Creates a new PDF containing only the specified pages from an in-memory file.
+    Returns the 1-based pages to keep for the given scan mode (see SCAN_MODES).
+    A full "all" scan with doc_hash also completes the page text index.
+    """
+    if mode == "all":
+        indexed = bool(doc_hash) and page_index.is_indexed(doc_hash)
+        matched_pages = find_keyword_pages(doc, keywords, doc_hash=doc_hash)
+        if doc_hash and page_index.PAGE_INDEX_ENABLED and not indexed:
+            page_index.mark_indexed(doc_hash, len(doc))
+        return matched_pages
+    if mode == "last-occurrence":
+        last_page = find_last_page(doc, keywords, doc_hash)
+        return select_last_occurrence([last_page] if last_page else [])
+    raise ValueError(f"Invalid scan mode. Must be one of {SCAN_MODES}.")
+
+
+def iter_page_texts(doc: fitz.Document, start: int = 0, stop: int | None = None) -> Iterator[str]:
+    """
+    Yields the plain text of pages [start, stop) one page at a time, for
+    text_service.clean_pages() and other page-level consumers.
+    """
+    if stop is None or stop > len(doc):
+        stop = len(doc)
+    for page_num in range(start, stop):
+        yield doc.load_page(page_num).get_text("text")
+
+
+def filter_pages(file_obj: io.BytesIO, keywords: list[str]) -> list[int]:
+    """
+    Finds the 1-based pages of a PDF that contain any of the given keywords.
+    """
+    doc = open_pdf(file_obj)
+    try:
+        return find_keyword_pages(doc, keywords)
+    finally:
+        doc.close()
+
+
+def open_pdf(source: io.BytesIO | bytes | str) -> fitz.Document:
+    """
+    Opens a PDF once so it can be scanned and sliced by the same handle.
+    A str is treated as a path on disk, which MuPDF reads lazily instead of
+    holding the whole file in memory.
+    """
+    if isinstance(source, str):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _select_pages(doc: fitz.Document, pages_to_keep: list[int], doc_uuid: str | None = None) -> str:
+    """
+    Reduces an opened document in place to the given 1-based pages and stamps
+    the SIAM metadata. Returns the document id (a new UUID unless one is given).
     """
     if not all(isinstance(p, int) for p in pages_to_keep):
         raise TypeError("pages_to_keep must be a list of integers.")
 
-    source_doc = fitz.open(stream=file_obj, filetype="pdf")
-    output_doc = fitz.open()
-    
-    # แปลงเป็น 0-based และลบซ้ำ
-    page_indices = sorted(set(p - 1 for p in pages_to_keep))
-    
-    # คัดลอกทีละหน้า
-    for idx in page_indices:
-        output_doc.insert_pdf(source_doc, from_page=idx, to_page=idx, links=False)
+    # แปลงเป็น 0-based, ลบซ้ำ และตัดหน้าที่เกินจำนวนหน้าจริงทิ้ง
+    page_indices = sorted(set(p - 1 for p in pages_to_keep if 0 < p <= len(doc)))
+
+    # เลือกหน้าทั้งหมดในครั้งเดียวแทนการคัดลอกทีละหน้า
+    doc.select(page_indices)
+
+    # ให้ผลลัพธ์เหมือนการ insert_pdf(links=False) ลงเอกสารใหม่: ไม่มีสารบัญ/ลิงก์/page label/XMP เดิม
+    doc.set_toc([])
+    doc.set_page_labels([])
+    for page in doc:
+        for link in page.get_links():
+            page.delete_link(link)
+    doc.del_xml_metadata()
 
-    doc_uuid = str(uuid.uuid4())
+    if doc_uuid is None:
+        doc_uuid = str(uuid.uuid4())
 
     # กำหนด metadata
     new_metadata = {
@@ -72,53 +195,195 @@ def create_pdf_with_pages(file_obj: io.BytesIO, pages_to_keep: list[int]) -> byt
         "modDate": "",
         "trapped": ""
     }
-    output_doc.set_metadata(new_metadata)
+    doc.set_metadata(new_metadata)
+
+    return doc_uuid
+
+
+def _save_options(doc: fitz.Document, compact: bool) -> dict:
+    """
+    Returns the save()/tobytes() options. Unused objects are always dropped:
+    the pages removed by select() are still in the file otherwise, so the
+    output would be as large as the source. In compact mode the fonts are
+    subset first, duplicates are merged and all streams are deflated.
+    """
+    if not compact:
+        return {"garbage": 1}
+
+    try:
+        doc.subset_fonts()
+    except Exception:
+        # PyMuPDF รุ่นเก่าต้องใช้ fontTools ในการ subset: ถ้าไม่มีก็ข้ามไปเงียบๆ (ยังบีบอัดส่วนอื่นได้)
+        pass
+
+    return {"garbage": 3, "deflate": True, "deflate_images": True, "deflate_fonts": True}
+
+
+def build_pdf_from_doc(doc: fitz.Document, pages_to_keep: list[int], compact: bool = False) -> tuple[bytes, str]:
+    """
+    Reduces an already opened document to the given 1-based pages and serializes it.
+    The document is modified in place, so it must not be scanned again afterwards.
+    """
+    doc_uuid = _select_pages(doc, pages_to_keep)
+    return doc.tobytes(**_save_options(doc, compact)), doc_uuid
+
+
+def save_pdf_from_doc(doc: fitz.Document, pages_to_keep: list[int], out_path: str, doc_uuid: str | None = None, compact: bool = False) -> str:
+    """
+    Same as build_pdf_from_doc but writes the result straight to out_path,
+    so no serialized copy of the output is kept in memory.
+    """
+    doc_uuid = _select_pages(doc, pages_to_keep, doc_uuid)
+    doc.save(out_path, **_save_options(doc, compact))
+    return doc_uuid
+
+
+def create_pdf_with_pages(file_obj: io.BytesIO | bytes, pages_to_keep: list[int], compact: bool = False) -> tuple[bytes, str]:
+    """
+    Creates a new PDF containing only the specified pages from an in-memory file.
+    compact=True removes unused objects, compresses streams and subsets fonts.
+    """
+    doc = open_pdf(file_obj)
+    try:
+        return build_pdf_from_doc(doc, pages_to_keep, compact)
+    finally:
+        doc.close()
 
-    output_bytes_io = io.BytesIO(output_doc.tobytes())
-    
-    source_doc.close()
-    output_doc.close()
-    
-    return output_bytes_io.getvalue(), doc_uuid
 
 def filter_spcific_pages(file_obj: io.BytesIO) -> list[int]:
     """
-    Finds pages in a PDF that contain any of the given keywords.
-    Special case: if the keyword is 'บทที่ 5', only keep the last page where it appears.
+    Finds the last page containing a chapter 5 heading (SPECIFIC_KEYWORDS)
+    and returns it with the page after it.
     """
-    doc = fitz.open(stream=file_obj, filetype="pdf")
+    doc = open_pdf(file_obj)
+    try:
+        # อ่านจากหน้าสุดท้ายย้อนขึ้นไป หยุดทันทีที่เจอ
+        return scan_document(doc, SPECIFIC_KEYWORDS, "last-occurrence")
+    finally:
+        doc.close()
 
-    matched_pages = []
-    special_keyword = ["บทที่ 5", "บทที่5"]
-    selected_pages = []
-    
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        text = page.get_text()
 
-        # lowercase เพื่อค้นหาแบบไม่สนตัวพิมพ์เล็ก/ใหญ่
-        lower_text = text.lower()
+# --- งานสำหรับ process pool (services/pdf_executor.py) ---
+# รับ bytes หรือ path ของไฟล์ (ไม่ใช่ BytesIO) เพื่อให้ส่งข้าม process ได้
+# และเขียนผลลัพธ์ลงไฟล์แทนการส่ง bytes ของ PDF กลับมาทาง pipe
 
-        # เก็บหน้าสำหรับทุก keyword ปกติ
-        if any(kw.lower() in lower_text for kw in special_keyword if kw):
-            matched_pages.append(page_num + 1)
-        
-        # เก็บหน้าที่เจอ keyword เฉพาะ
-        # if special_keyword.lower() in lower_text:
-        #     special_pages.append(page_num + 1) 
-        #     print(special_pages)
-        #     matched_pages.append(page_num + 1)
-    doc.close()
-
-    # ถ้ามีเจอ "บทที่ 5" ให้เอาเฉพาะหน้าสุดท้ายและหน้าสุดท้าย + 1
-    if matched_pages:
-        selected_pages.append(matched_pages[-1])
-        selected_pages.append(matched_pages[-1] + 1)
-        print(selected_pages)
+def scan_keyword_page_range(source: bytes | str, keywords: list[str], start: int, stop: int, doc_hash: str | None = None) -> list[int]:
+    doc = open_pdf(source)
+    try:
+        return find_keyword_pages(doc, keywords, start, stop, doc_hash)
+    finally:
+        doc.close()
 
-        
 
-    # ลบเลขหน้าซ้ำ และเรียงลำดับ
-    selected_pages = sorted(set(selected_pages))
+def create_pdf_file_with_pages(source: bytes | str, pages_to_keep: list[int], out_path: str, doc_uuid: str | None = None, compact: bool = False) -> str:
+    doc = open_pdf(source)
+    try:
+        return save_pdf_from_doc(doc, pages_to_keep, out_path, doc_uuid, compact)
+    finally:
+        doc.close()
+
 
-    return selected_pages
\ No newline at end of file
+def extract_pages_to_file(source: bytes | str, keywords: list[str], mode: str, out_path: str, doc_uuid: str | None = None, doc_hash: str | None = None, compact: bool = False) -> tuple[list[int], str | None]:
+    """
+    Opens the PDF once, selects pages with scan_document() and writes the filtered
+    PDF to out_path. Returns (selected_pages, doc_uuid); out_path is only written
+    when something matched.
+    """
+    doc = open_pdf(source)
+    try:
+        selected_pages = scan_document(doc, keywords, mode, doc_hash)
+        if not selected_pages:
+            return selected_pages, None
+        return selected_pages, save_pdf_from_doc(doc, selected_pages, out_path, doc_uuid, compact)
+    finally:
+        doc.close()
+
+
+def extract_or_scan_first_shard(source: bytes | str, keywords: list[str], out_path: str | None, doc_uuid: str | None, doc_hash: str | None, compact: bool, min_pages: int, shard_pages: int) -> tuple[int, list[int], str | None]:
+    """
+    First pool task of an "all" extraction, so the page count needs no round
+    trip of its own. Documents under min_pages pages are extracted completely
+    like extract_pages_to_file(); larger ones only get pages [0, shard_pages)
+    scanned and the caller fans out the rest. Returns (page_count,
+    matched_pages, doc_uuid); doc_uuid is None when no PDF was written.
+    out_path None only scans (page text indexing).
+    """
+    doc = open_pdf(source)
+    try:
+        page_count = len(doc)
+        if page_count >= min_pages:
+            return page_count, find_keyword_pages(doc, keywords, 0, shard_pages, doc_hash), None
+
+        selected_pages = scan_document(doc, keywords, "all", doc_hash)
+        if not selected_pages or out_path is None:
+            return page_count, selected_pages, None
+        return page_count, selected_pages, save_pdf_from_doc(doc, selected_pages, out_path, doc_uuid, compact)
+    finally:
+        doc.close()
+
+
+def keyword_offsets(text: str, keywords: list[str]) -> list[dict]:
+    """
+    Returns [{"keyword", "start", "end"}] for every keyword occurrence in text,
+    as character offsets into text itself (matching still ignores case,
+    whitespace and Thai mark order).
+    """
+    norm, offsets = normalize_with_offsets(text)
+    return [
+        {"keyword": keyword, "start": offsets[start], "end": offsets[end - 1] + 1}
+        for start, end, keyword in get_matcher(keywords).spans_normalized(norm)
+    ]
+
+
+def locate_keyword_pages(source: bytes | str, keywords: list[str], mode: str, doc_hash: str | None = None) -> list[dict]:
+    """
+    Selects pages like extract_pages_to_file() but builds no PDF. Returns
+    [{"page", "matches"}] where matches are keyword_offsets() into the page's
+    page.get_text("text") output.
+    """
+    doc = open_pdf(source)
+    try:
+        located = []
+        for page_no in scan_document(doc, keywords, mode, doc_hash):
+            if page_no > len(doc):
+                continue
+            text = doc.load_page(page_no - 1).get_text("text")
+            located.append({"page": page_no, "matches": keyword_offsets(text, keywords)})
+        return located
+    finally:
+        doc.close()
+
+
+def read_clean_pages(source: bytes | str, start: int, stop: int) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Returns (page_count, [(1-based page_no, cleaned text)]) for 0-based pages
+    [start, stop), cleaned with text_service.clean_pages().
+    """
+    doc = open_pdf(source)
+    try:
+        stop = min(stop, len(doc))
+        cleaned = clean_pages(iter_page_texts(doc, start, stop))
+        return len(doc), list(zip(range(start + 1, stop + 1), cleaned))
+    finally:
+        doc.close()
+
+
+def render_thumbnails(source: bytes | str, pages: list[int], dpi: int, fmt: str, jpeg_quality: int = 75) -> dict[int, bytes]:
+    """
+    Renders the given 1-based pages to PNG or JPEG images at dpi.
+    Pages outside the document are left out of the result.
+    """
+    doc = open_pdf(source)
+    try:
+        images = {}
+        for page_no in sorted(set(pages)):
+            if not 0 < page_no <= len(doc):
+                continue
+            pix = doc.load_page(page_no - 1).get_pixmap(dpi=dpi, alpha=False)
+            if fmt == "jpeg":
+                images[page_no] = pix.tobytes("jpeg", jpg_quality=jpeg_quality)
+            else:
+                images[page_no] = pix.tobytes("png")
+        return images
+    finally:
+        doc.close()
@@ -0,0 +1,121 @@
+"""
+In-process cache of verified (user id, role) principals.
+
+get_current_user() normally confirms on every request that the token's
+subject still exists in the student/teacher table. A confirmed principal is
+remembered here for PRINCIPAL_CACHE_TTL seconds, never past the token's
+exp, so repeated calls with a valid token only cost the JWT check.
+
+Entries are invalidated across workers through Redis pub/sub: publish
+"<role>:<user id>" (or just "<user id>" for every role) on
+PRINCIPAL_INVALIDATE_CHANNEL, e.g. with invalidate_principal() after
+deleting a user.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+from config import PRINCIPAL_CACHE_TTL, PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_INVALIDATE_CHANNEL
+
+
+class PrincipalCache:
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (user_id, role) -> เวลาหมดอายุ (unix time)
+        self._entries: OrderedDict[tuple[str, str], float] = OrderedDict()
+
+    def contains(self, user_id: str, role: str) -> bool:
+        key = (user_id, role)
+        expires_at = self._entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self._entries[key]
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def add(self, user_id: str, role: str, token_exp: float | None = None):
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+
+        key = (user_id, role)
+        self._entries[key] = expires_at
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, user_id: str, role: str | None = None):
+        if role is not None:
+            self._entries.pop((user_id, role), None)
+            return
+        for key in [k for k in self._entries if k[0] == user_id]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL, PRINCIPAL_CACHE_MAX_ENTRIES)
+
+_redis = None
+_listener: asyncio.Task | None = None
+
+
+def _apply_message(data: str):
+    role, sep, user_id = data.rpartition(":")
+    principal_cache.discard(user_id, role if sep else None)
+
+
+async def _listen(redis):
+    while True:
+        try:
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(PRINCIPAL_INVALIDATE_CHANNEL)
+            # ระหว่างที่หลุดจาก Redis อาจพลาดข้อความ: ล้าง cache ทุกครั้งที่ subscribe ใหม่
+            principal_cache.clear()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _apply_message(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Principal invalidation listener error: {e}")
+            principal_cache.clear()
+            await asyncio.sleep(5)
+
+
+def start_invalidation_listener(redis):
+    """
+    Subscribes to PRINCIPAL_INVALIDATE_CHANNEL on the given redis.asyncio
+    client (decode_responses=True) for the lifetime of the worker.
+    """
+    global _redis, _listener
+    _redis = redis
+    if _listener is None:
+        _listener = asyncio.create_task(_listen(redis))
+
+
+async def stop_invalidation_listener():
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
+
+
+async def invalidate_principal(user_id: str, role: str | None = None):
+    """
+    Drops a principal from this worker's cache and from every other worker's
+    through Redis. Call after deleting (or disabling) a user.
+    """
+    principal_cache.discard(user_id, role)
+    if _redis is not None:
+        await _redis.publish(PRINCIPAL_INVALIDATE_CHANNEL, f"{role}:{user_id}" if role else user_id)
@@ -0,0 +1,235 @@
+"""
+Data access for the tables used by supabase_service: student, teacher,
+team, topic, project, doc and project_milestone.
+
+Repository is the interface; DATA_BACKEND picks the implementation that
+init_repository() installs at startup:
+
+    supabase   services/supabase_repository.py  (PostgREST, the default)
+    sqlite     services/sqlite_repository.py    (local file or :memory:,
+               seeded with synthetic data, for offline load tests and
+               benchmarks of the service layer)
+
+Rows are plain dicts keyed by column name in both backends. Filters are
+equality-only (eq / neq / in_) on purpose: anything richer is a named
+method so each backend can run it as one query.
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Any
+
+from config import DATA_BACKEND, METRICS_ENABLED, SERVER_TIMING_ENABLED
+from services import metrics
+
+# ตารางและคอลัมน์ที่ service layer ใช้ (SQLite ใช้ตรวจชื่อคอลัมน์ก่อนประกอบ SQL)
+TABLES = {
+    "student": ("sid", "name", "teamid"),
+    "teacher": ("tid", "name"),
+    "team": ("tmid", "name", "status", "teacherid", "ajdv_pm_sheet"),
+    "topic": ("tpid", "teamid", "name", "tid", "academic_year", "status", "remark"),
+    "project": ("pid", "topic", "objective", "status", "year", "teamid", "recommendations", "additional_work"),
+    "doc": ("did", "doc_type", "status", "pid", "stamp_at"),
+    "project_milestone": ("pmid", "proposal", "research_doc", "proposal_slide", "final_slide_project"),
+}
+
+
+class Repository(ABC):
+    @abstractmethod
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        *,
+        eq: dict[str, Any] | None = None,
+        neq: dict[str, Any] | None = None,
+        in_: tuple[str, list] | None = None,
+        order: list[tuple[str, bool]] | None = None,
+        offset: int | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """
+        Rows of table matching every filter. columns is "*" or a
+        comma-separated list; order is [(column, descending), ...].
+        """
+
+    @abstractmethod
+    async def count(self, table: str, *, eq: dict[str, Any] | None = None, neq: dict[str, Any] | None = None) -> int:
+        ...
+
+    @abstractmethod
+    async def insert(self, table: str, rows: dict | list[dict]) -> list[dict]:
+        """
+        Inserts rows and returns them as stored (with generated keys).
+        """
+
+    @abstractmethod
+    async def update(self, table: str, values: dict, *, eq: dict[str, Any]) -> list[dict]:
+        """
+        Updates the rows matching eq and returns them as stored.
+        """
+
+    @abstractmethod
+    async def team_aggregate(self, tmid: str) -> dict | None:
+        """
+        The team row with "teacher" (row or None), "student" (member rows)
+        and "project" (rows, each with its "doc" rows) embedded.
+        """
+
+    @abstractmethod
+    async def team_documents(self, team_id: str) -> list[dict] | None:
+        """
+        The doc rows of the team's project; None when the team has no project.
+        """
+
+    @abstractmethod
+    async def teacher_projects(self, tid: str) -> list[dict] | None:
+        """
+        Project rows of every team advised by tid; None when tid has no team.
+        """
+
+    @abstractmethod
+    async def teacher_project_page(
+        self,
+        tid: str,
+        columns: list[str],
+        limit: int,
+        after: tuple[Any, Any] | None = None,
+        year: str | None = None,
+        status: str | None = None,
+    ) -> list[dict]:
+        """
+        Up to limit project rows of tid's teams ordered by (year, pid)
+        descending, starting after the (year, pid) key when given.
+        """
+
+    @abstractmethod
+    async def process_topic_decisions(self, decisions: list[dict]) -> list[dict]:
+        """
+        Applies accept/reject decisions, each atomically (see
+        sql/process_topic_decisions.sql for the contract).
+        """
+
+    @abstractmethod
+    async def group_task_summary(self, team_id: str) -> Any:
+        ...
+
+    async def close(self):
+        pass
+
+
+# ตารางหลักของเมธอดที่มีชื่อเฉพาะ (ใช้เป็น label "table" ของ metrics)
+NAMED_METHOD_TABLES = {
+    "team_aggregate": "team",
+    "team_documents": "doc",
+    "teacher_projects": "project",
+    "teacher_project_page": "project",
+    "process_topic_decisions": "topic",
+    "group_task_summary": "rpc",
+}
+
+
+def _row_count(result) -> int:
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, int) or result is None:
+        # count() คืนจำนวนแถวแต่ไม่ได้ส่งแถวกลับมา
+        return 0
+    return 1
+
+
+class InstrumentedRepository(Repository):
+    """
+    Wraps a repository and records every call (route, table, operation,
+    latency, rows returned) in services/metrics.py.
+    """
+
+    def __init__(self, inner: Repository):
+        self.inner = inner
+
+    async def _call(self, operation: str, table: str, *args, **kwargs):
+        start = time.perf_counter()
+        rows = 0
+        try:
+            with metrics.track("db"):
+                result = await getattr(self.inner, operation)(*args, **kwargs)
+            rows = _row_count(result)
+            return result
+        finally:
+            metrics.record_db_call(table, operation, time.perf_counter() - start, rows)
+
+    async def select(self, table, columns="*", **kwargs):
+        return await self._call("select", table, table, columns, **kwargs)
+
+    async def count(self, table, **kwargs):
+        return await self._call("count", table, table, **kwargs)
+
+    async def insert(self, table, rows):
+        return await self._call("insert", table, table, rows)
+
+    async def update(self, table, values, **kwargs):
+        return await self._call("update", table, table, values, **kwargs)
+
+    async def team_aggregate(self, tmid):
+        return await self._call("team_aggregate", NAMED_METHOD_TABLES["team_aggregate"], tmid)
+
+    async def team_documents(self, team_id):
+        return await self._call("team_documents", NAMED_METHOD_TABLES["team_documents"], team_id)
+
+    async def teacher_projects(self, tid):
+        return await self._call("teacher_projects", NAMED_METHOD_TABLES["teacher_projects"], tid)
+
+    async def teacher_project_page(self, tid, columns, limit, after=None, year=None, status=None):
+        return await self._call(
+            "teacher_project_page", NAMED_METHOD_TABLES["teacher_project_page"],
+            tid, columns, limit, after, year, status,
+        )
+
+    async def process_topic_decisions(self, decisions):
+        return await self._call("process_topic_decisions", NAMED_METHOD_TABLES["process_topic_decisions"], decisions)
+
+    async def group_task_summary(self, team_id):
+        return await self._call("group_task_summary", NAMED_METHOD_TABLES["group_task_summary"], team_id)
+
+    async def close(self):
+        await self.inner.close()
+
+
+_repository: Repository | None = None
+
+
+async def init_repository():
+    global _repository
+    if _repository is not None:
+        return
+    if DATA_BACKEND == "sqlite":
+        from services.sqlite_repository import SQLiteRepository
+        _repository = await SQLiteRepository.create()
+    elif DATA_BACKEND == "supabase":
+        from services.supabase_repository import SupabaseRepository
+        _repository = await SupabaseRepository.create()
+    else:
+        raise ValueError(f"Unknown DATA_BACKEND '{DATA_BACKEND}'. Must be 'supabase' or 'sqlite'.")
+    if METRICS_ENABLED or SERVER_TIMING_ENABLED:
+        _repository = InstrumentedRepository(_repository)
+
+
+async def close_repository():
+    global _repository
+    if _repository is not None:
+        await _repository.close()
+    _repository = None
+
+
+def get_repository() -> Repository:
+    if _repository is None:
+        raise RuntimeError("Repository is not initialized; call init_repository() at startup")
+    return _repository
+
+
+def set_repository(repository: Repository | None):
+    """
+    Installs a repository directly (benchmarks and scripts that do not run
+    the FastAPI startup hook).
+    """
+    global _repository
+    _repository = repository
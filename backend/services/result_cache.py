@@ -0,0 +1,98 @@
+"""
+Content-addressed cache for PDF extraction results.
+
+Results are keyed by sha256(upload bytes) + extraction mode + keyword set
+(+ compact output) and
+stored in a DiskLRUStore (see services/disk_store.py):
+
+    <key>.json   matched pages, sha256 and size of the filtered PDF
+    <key>.pdf    filtered PDF (absent when nothing matched)
+
+The key doubles as the document id returned in X-PDF-UUID, and GET
+/pdfs/{doc_id} serves the stored PDF by it (with Range and ETag support).
+"""
+import hashlib
+
+from config import RESULT_CACHE_ENABLED, RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES
+from services.disk_store import DiskLRUStore
+
+# เพิ่มค่านี้เมื่อวิธีค้นหา/สร้าง PDF เปลี่ยน เพื่อไม่ให้ใช้ผลลัพธ์เก่าใน cache
+CACHE_VERSION = 6
+
+
+def result_key(doc_sha256: str, mode: str, keywords: list[str], compact: bool = False) -> str:
+    """
+    Builds the cache key / stable document id for an upload and a keyword set.
+    Keyword order and duplicates do not change the key.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_VERSION}".encode())
+    digest.update(b"\0" + doc_sha256.encode())
+    digest.update(b"\0" + mode.encode())
+    for kw in sorted(set(keywords)):
+        digest.update(b"\0" + kw.encode("utf-8"))
+    if compact:
+        digest.update(b"\0compact")
+    return digest.hexdigest()
+
+
+class ResultCache(DiskLRUStore):
+    def get(self, key: str) -> tuple[list[int], str | None] | None:
+        """
+        Returns (matched_pages, serve_path) or None on a miss.
+        serve_path is a private hard link to the cached PDF that the caller
+        must delete after use; it is None when nothing matched.
+        """
+        entry = super().get(key)
+        if entry is None:
+            return None
+        meta, serve_path = entry
+        return meta["pages"], serve_path
+
+    def get_pdf(self, key: str) -> tuple[str, str, int] | None:
+        """
+        Returns (serve_path, sha256, size) of the stored PDF, or None when there
+        is none. serve_path must be deleted by the caller after use.
+        """
+        entry = super().get(key)
+        if entry is None:
+            return None
+        meta, serve_path = entry
+        if serve_path is None:
+            return None
+        return serve_path, meta["sha256"], meta["size"]
+
+    def put(self, key: str, pages: list[int], pdf_path: str | None) -> str | None:
+        meta = {"pages": pages}
+        if pdf_path is not None:
+            # sha256 ของเนื้อไฟล์ใช้เป็น ETag ตอน GET /pdfs/{doc_id}
+            meta["sha256"], meta["size"] = file_digest(pdf_path)
+        return super().put(key, meta, pdf_path)
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+_cache: ResultCache | None = None
+
+
+def get_result_cache() -> ResultCache | None:
+    """
+    Returns the shared cache, or None when RESULT_CACHE_ENABLED is off.
+    """
+    global _cache
+    if not RESULT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES)
+    return _cache
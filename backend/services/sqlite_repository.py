@@ -0,0 +1,362 @@
+"""
+Repository backed by SQLite, for running the API and the service layer
+without a Supabase project (load tests, capacity planning, benchmarks).
+
+The schema mirrors the columns supabase_service reads and writes. A new
+(empty) database is seeded with deterministic synthetic data sized by the
+SQLITE_SEED_* settings: teachers, teams with students, topics, and for most
+teams an accepted project with its four documents, spread over several
+academic years.
+
+SQLite calls are blocking, so they run in the thread pool on one shared
+connection guarded by a lock (SQLite serializes writers anyway).
+"""
+import random
+import sqlite3
+import threading
+from typing import Any
+
+from starlette.concurrency import run_in_threadpool
+
+from config import SQLITE_REPOSITORY_PATH, SQLITE_SEED_TEAMS, SQLITE_SEED_STUDENTS_PER_TEAM, SQLITE_SEED_YEARS
+from services.repository import Repository, TABLES
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS teacher (
+    tid INTEGER PRIMARY KEY,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS team (
+    tmid TEXT PRIMARY KEY,
+    name TEXT,
+    status TEXT,
+    teacherid INTEGER REFERENCES teacher(tid),
+    ajdv_pm_sheet TEXT
+);
+CREATE TABLE IF NOT EXISTS student (
+    sid TEXT PRIMARY KEY,
+    name TEXT,
+    teamid TEXT REFERENCES team(tmid)
+);
+CREATE TABLE IF NOT EXISTS topic (
+    tpid INTEGER PRIMARY KEY AUTOINCREMENT,
+    teamid TEXT REFERENCES team(tmid),
+    name TEXT,
+    tid INTEGER,
+    academic_year INTEGER,
+    status TEXT DEFAULT 'pending',
+    remark TEXT
+);
+CREATE TABLE IF NOT EXISTS project (
+    pid INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT,
+    objective TEXT,
+    status TEXT,
+    year TEXT,
+    teamid TEXT REFERENCES team(tmid),
+    recommendations TEXT,
+    additional_work TEXT
+);
+CREATE TABLE IF NOT EXISTS doc (
+    did INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_type TEXT,
+    status TEXT,
+    pid INTEGER REFERENCES project(pid),
+    stamp_at TEXT
+);
+CREATE TABLE IF NOT EXISTS project_milestone (
+    pmid INTEGER PRIMARY KEY,
+    proposal TEXT,
+    research_doc TEXT,
+    proposal_slide TEXT,
+    final_slide_project TEXT
+);
+CREATE INDEX IF NOT EXISTS student_teamid ON student (teamid);
+CREATE INDEX IF NOT EXISTS team_teacherid ON team (teacherid);
+CREATE INDEX IF NOT EXISTS topic_tid ON topic (tid);
+CREATE INDEX IF NOT EXISTS project_teamid ON project (teamid);
+CREATE INDEX IF NOT EXISTS project_year_pid ON project (year, pid);
+CREATE INDEX IF NOT EXISTS doc_pid ON doc (pid);
+"""
+
+DOC_TYPES = ("proposal", "slide-proposal", "thesis", "slide-final-present")
+
+
+class _DecisionError(Exception):
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def seed(conn: sqlite3.Connection, teams: int, students_per_team: int, years: int, rng_seed: int = 0):
+    """
+    Fills an empty database with synthetic data. The same arguments always
+    produce the same rows.
+    """
+    rng = random.Random(rng_seed)
+    teacher_count = max(1, teams // 8)
+    first_year = 2568 - years + 1
+
+    conn.executemany(
+        "INSERT INTO teacher (tid, name) VALUES (?, ?)",
+        [(tid, f"อาจารย์ {tid:03d}") for tid in range(1, teacher_count + 1)],
+    )
+    conn.execute(
+        "INSERT INTO project_milestone (pmid, proposal, research_doc, proposal_slide, final_slide_project) VALUES (1, ?, ?, ?, ?)",
+        ("2025-08-01", "2025-10-01", "2025-08-15", "2026-02-01"),
+    )
+
+    for n in range(1, teams + 1):
+        tmid = f"T{n:05d}"
+        tid = rng.randint(1, teacher_count)
+        year = str(first_year + (n - 1) % years)
+        accepted = n % 4 != 0
+        name = f"ระบบตัวอย่างหมายเลข {n}"
+
+        conn.execute(
+            "INSERT INTO team (tmid, name, status, teacherid, ajdv_pm_sheet) VALUES (?, ?, ?, ?, ?)",
+            (tmid, name if accepted else None, "on-going" if accepted else None, tid if accepted else None, f"https://sheets.example/{tmid}"),
+        )
+        conn.executemany(
+            "INSERT INTO student (sid, name, teamid) VALUES (?, ?, ?)",
+            [(f"{n:05d}{m:02d}", f"นักศึกษา {n:05d}-{m}", tmid) for m in range(1, students_per_team + 1)],
+        )
+        conn.execute(
+            "INSERT INTO topic (teamid, name, tid, academic_year, status) VALUES (?, ?, ?, ?, ?)",
+            (tmid, name, tid, int(year), "pass" if accepted else "pending"),
+        )
+        if not accepted:
+            continue
+
+        pid = conn.execute(
+            "INSERT INTO project (topic, objective, status, year, teamid, recommendations, additional_work) "
+            "VALUES (?, ?, 'on-going', ?, ?, '', '')",
+            (name, f"วัตถุประสงค์ของ {name}", year, tmid),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO doc (doc_type, status, pid) VALUES (?, ?, ?)",
+            [(doc_type, rng.choice(("not-submitted", "submitted", "approved")), pid) for doc_type in DOC_TYPES],
+        )
+
+
+class SQLiteRepository(Repository):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # autocommit: transaction เปิดเองด้วย SAVEPOINT เฉพาะตอนที่ต้องการ
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    async def create(cls, path: str = SQLITE_REPOSITORY_PATH) -> "SQLiteRepository":
+        repository = cls(path)
+        await run_in_threadpool(repository.seed_if_empty)
+        return repository
+
+    def seed_if_empty(self, teams: int = SQLITE_SEED_TEAMS, students_per_team: int = SQLITE_SEED_STUDENTS_PER_TEAM, years: int = SQLITE_SEED_YEARS):
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM team LIMIT 1").fetchone():
+                return
+            self._conn.execute("BEGIN")
+            try:
+                seed(self._conn, teams, students_per_team, years)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    async def close(self):
+        await run_in_threadpool(self._conn.close)
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(*args)
+        return await run_in_threadpool(locked)
+
+    def _rows(self, sql: str, params=()) -> list[dict]:
+        return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    # --- SQL building: ชื่อตาราง/คอลัมน์ต้องอยู่ใน TABLES เท่านั้น ค่าทั้งหมดเป็น parameter ---
+
+    @staticmethod
+    def _check(table: str, columns) -> list[str]:
+        if table not in TABLES:
+            raise ValueError(f"Unknown table '{table}'")
+        unknown = [c for c in columns if c not in TABLES[table]]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+        return list(columns)
+
+    def _columns(self, table: str, columns: str) -> list[str]:
+        self._check(table, [])
+        if columns.strip() == "*":
+            return list(TABLES[table])
+        return self._check(table, [c.strip() for c in columns.split(",") if c.strip()])
+
+    def _where(self, table: str, eq=None, neq=None, in_=None) -> tuple[str, list]:
+        clauses, params = [], []
+        for column, value in (eq or {}).items():
+            self._check(table, [column])
+            clauses.append(f"{column} = ?")
+            params.append(value)
+        for column, value in (neq or {}).items():
+            self._check(table, [column])
+            # เหมือน neq ของ PostgREST: แถวที่เป็น NULL ไม่ผ่านเงื่อนไข
+            clauses.append(f"{column} != ?")
+            params.append(value)
+        if in_ is not None:
+            column, values = in_
+            self._check(table, [column])
+            values = list(values)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})" if values else "0")
+            params.extend(values)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    # --- Repository ---
+
+    async def select(self, table, columns="*", *, eq=None, neq=None, in_=None, order=None, offset=None, limit=None):
+        selected = self._columns(table, columns)
+        where, params = self._where(table, eq, neq, in_)
+        sql = f"SELECT {', '.join(selected)} FROM {table}{where}"
+        if order:
+            self._check(table, [column for column, _ in order])
+            sql += " ORDER BY " + ", ".join(f"{column} {'DESC' if desc else 'ASC'}" for column, desc in order)
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset or 0]
+        return await self._run(self._rows, sql, params)
+
+    async def count(self, table, *, eq=None, neq=None):
+        self._check(table, [])
+        where, params = self._where(table, eq, neq)
+        rows = await self._run(self._rows, f"SELECT COUNT(*) AS n FROM {table}{where}", params)
+        return rows[0]["n"]
+
+    def _insert(self, table: str, rows: list[dict]) -> list[dict]:
+        inserted = []
+        for row in rows:
+            columns = self._check(table, row)
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) RETURNING *"
+            inserted.extend(self._rows(sql, [row[c] for c in columns]))
+        return inserted
+
+    async def insert(self, table, rows):
+        rows = [rows] if isinstance(rows, dict) else list(rows)
+        return await self._run(self._insert, table, rows)
+
+    async def update(self, table, values, *, eq):
+        columns = self._check(table, values)
+        where, params = self._where(table, eq)
+        sql = f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in columns)}{where} RETURNING *"
+        return await self._run(self._rows, sql, [values[c] for c in columns] + params)
+
+    def _team_aggregate(self, tmid: str) -> dict | None:
+        teams = self._rows("SELECT * FROM team WHERE tmid = ?", (tmid,))
+        if not teams:
+            return None
+        team = teams[0]
+        teachers = self._rows("SELECT * FROM teacher WHERE tid = ?", (team["teacherid"],))
+        team["teacher"] = teachers[0] if teachers else None
+        team["student"] = self._rows("SELECT * FROM student WHERE teamid = ?", (tmid,))
+        team["project"] = self._rows("SELECT * FROM project WHERE teamid = ? ORDER BY pid", (tmid,))
+        for project in team["project"]:
+            project["doc"] = self._rows("SELECT * FROM doc WHERE pid = ? ORDER BY did", (project["pid"],))
+        return team
+
+    async def team_aggregate(self, tmid):
+        return await self._run(self._team_aggregate, tmid)
+
+    def _team_documents(self, team_id: str) -> list[dict] | None:
+        projects = self._rows("SELECT pid FROM project WHERE teamid = ? ORDER BY pid LIMIT 1", (team_id,))
+        if not projects:
+            return None
+        return self._rows("SELECT * FROM doc WHERE pid = ? ORDER BY did", (projects[0]["pid"],))
+
+    async def team_documents(self, team_id):
+        return await self._run(self._team_documents, team_id)
+
+    def _teacher_projects(self, tid: str) -> list[dict] | None:
+        if not self._conn.execute("SELECT 1 FROM team WHERE teacherid = ? LIMIT 1", (tid,)).fetchone():
+            return None
+        return self._rows(
+            "SELECT p.* FROM project p JOIN team t ON t.tmid = p.teamid WHERE t.teacherid = ?", (tid,)
+        )
+
+    async def teacher_projects(self, tid):
+        return await self._run(self._teacher_projects, tid)
+
+    async def teacher_project_page(self, tid, columns, limit, after=None, year=None, status=None):
+        self._check("project", columns)
+        sql = f"SELECT {', '.join('p.' + c for c in columns)} FROM project p JOIN team t ON t.tmid = p.teamid WHERE t.teacherid = ?"
+        params: list[Any] = [tid]
+        if year is not None:
+            sql += " AND p.year = ?"
+            params.append(year)
+        if status is not None:
+            sql += " AND p.status = ?"
+            params.append(status)
+        if after is not None:
+            sql += " AND (p.year < ? OR (p.year = ? AND p.pid < ?))"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY p.year DESC, p.pid DESC LIMIT ?"
+        params.append(limit)
+        return await self._run(self._rows, sql, params)
+
+    def _apply_decision(self, d: dict) -> str:
+        # ตรรกะเดียวกับ sql/process_topic_decisions.sql
+        action = d.get("action")
+        if action == "accept":
+            new_status = "pass"
+        elif action == "reject":
+            new_status = "not-pass"
+        else:
+            raise _DecisionError("22023", "Invalid action. Must be 'accept' or 'reject'.")
+
+        if self._conn.execute("UPDATE topic SET status = ?, remark = ? WHERE tpid = ?", (new_status, d.get("remark"), d.get("tpid"))).rowcount == 0:
+            raise _DecisionError("P0002", "Topic not found or already processed")
+
+        if action == "accept":
+            updated = self._conn.execute(
+                "UPDATE team SET name = ?, status = 'on-going', teacherid = ? WHERE tmid = ?",
+                (d.get("topicName"), d.get("tid"), d.get("teamid")),
+            ).rowcount
+            if updated == 0:
+                raise _DecisionError("P0002", "Topic updated, but associated Team not found or failed to update.")
+            pid = self._conn.execute(
+                "INSERT INTO project (topic, objective, status, year, teamid) VALUES (?, '', 'on-going', ?, ?)",
+                (d.get("topicName"), d.get("year"), d.get("teamid")),
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO doc (doc_type, status, pid) VALUES (?, 'not-submitted', ?)",
+                [(doc_type, pid) for doc_type in DOC_TYPES],
+            )
+        return new_status
+
+    def _process_topic_decisions(self, decisions: list[dict]) -> list[dict]:
+        results = []
+        for d in decisions:
+            # แต่ละ decision อยู่ใน savepoint ของตัวเอง: สำเร็จทั้งหมดหรือไม่มีอะไรเปลี่ยน
+            self._conn.execute("SAVEPOINT decision")
+            try:
+                new_status = self._apply_decision(d)
+            except (_DecisionError, sqlite3.Error) as e:
+                self._conn.execute("ROLLBACK TO decision")
+                self._conn.execute("RELEASE decision")
+                code = e.code if isinstance(e, _DecisionError) else "SQLITE"
+                results.append({"tpid": d.get("tpid"), "ok": False, "code": code, "error": str(e)})
+                continue
+            self._conn.execute("RELEASE decision")
+            results.append({"tpid": d.get("tpid"), "ok": True, "new_status": new_status})
+        return results
+
+    async def process_topic_decisions(self, decisions):
+        return await self._run(self._process_topic_decisions, decisions)
+
+    async def group_task_summary(self, team_id: str) -> Any:
+        # ตาราง task ไม่อยู่ในฐานข้อมูลจำลอง: สรุปว่างเหมือนทีมที่ยังไม่มีงาน
+        return []
@@ -0,0 +1,139 @@
+"""
+Repository backed by Supabase (PostgREST) through the async client.
+"""
+import os
+from typing import Any
+
+import httpx
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
+
+from config import SUPABASE_TIMEOUT, SUPABASE_MAX_CONNECTIONS, SUPABASE_MAX_KEEPALIVE, SUPABASE_KEEPALIVE_EXPIRY
+from services.repository import Repository
+
+# ดึงข้อมูลทั้งทีมใน request เดียวด้วย PostgREST resource embedding
+# (ใช้ foreign key student.teamid, team.teacherid, project.teamid, doc.pid)
+TEAM_AGGREGATE_SELECT = (
+    "*, "
+    "teacher(*), "
+    "student(*), "
+    "project(*, doc(*))"
+)
+
+
+class SupabaseRepository(Repository):
+    def __init__(self, client: AsyncClient, http_client: httpx.AsyncClient | None = None):
+        self.client = client
+        self._http_client = http_client
+
+    @classmethod
+    async def create(cls) -> "SupabaseRepository":
+        """
+        Creates the shared async Supabase client. PostgREST calls go through one
+        httpx connection pool with keep-alive (HTTP/2 when the server supports it),
+        so requests reuse open connections instead of reconnecting per query.
+        """
+        http_client = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            timeout=SUPABASE_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=SUPABASE_MAX_CONNECTIONS,
+                max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+                keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+            ),
+        )
+        client = await acreate_client(
+            os.getenv("URL_SUPABASE"), os.getenv("KEY_SUPABASE"),
+            options=AsyncClientOptions(httpx_client=http_client, postgrest_client_timeout=SUPABASE_TIMEOUT),
+        )
+        return cls(client, http_client)
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    @staticmethod
+    def _filter(query, eq: dict | None, neq: dict | None):
+        for column, value in (eq or {}).items():
+            query = query.eq(column, value)
+        for column, value in (neq or {}).items():
+            query = query.neq(column, value)
+        return query
+
+    async def select(self, table, columns="*", *, eq=None, neq=None, in_=None, order=None, offset=None, limit=None):
+        query = self._filter(self.client.table(table).select(columns), eq, neq)
+        if in_ is not None:
+            query = query.in_(*in_)
+        for column, desc in order or []:
+            query = query.order(column, desc=desc)
+        if offset is not None and limit is not None:
+            # PostgREST แบ่งหน้าด้วย range (offset/limit)
+            query = query.range(offset, offset + limit - 1)
+        elif limit is not None:
+            query = query.limit(limit)
+        response = await query.execute()
+        return response.data or []
+
+    async def count(self, table, *, eq=None, neq=None):
+        response = await self._filter(self.client.table(table).select("*", count="exact", head=True), eq, neq).execute()
+        return response.count or 0
+
+    async def insert(self, table, rows):
+        response = await self.client.table(table).insert(rows).execute()
+        return response.data or []
+
+    async def update(self, table, values, *, eq):
+        response = await self._filter(self.client.table(table).update(values), eq, None).execute()
+        return response.data or []
+
+    async def team_aggregate(self, tmid):
+        response = await self.client.table("team").select(TEAM_AGGREGATE_SELECT).eq("tmid", tmid).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    async def team_documents(self, team_id):
+        response = await self.client.table("project").select("pid, doc(*)").eq("teamid", team_id).limit(1).execute()
+        if not response.data:
+            return None
+        return response.data[0].get("doc") or []
+
+    async def teacher_projects(self, tid):
+        # Step 1: Get all team IDs associated with the teacher
+        teams_response = await self.client.table("team").select("tmid").eq("teacherid", tid).execute()
+        if not teams_response.data:
+            return None
+        team_ids = [team["tmid"] for team in teams_response.data]
+
+        # Step 2: Query the 'project' table for any of these team IDs
+        projects_response = await self.client.table("project").select("*").in_("teamid", team_ids).execute()
+        return projects_response.data
+
+    async def teacher_project_page(self, tid, columns, limit, after=None, year=None, status=None):
+        # กรองอาจารย์ด้วย inner join กับ team ใน query เดียว
+        query = (
+            self.client.table("project")
+            .select(",".join(columns) + ",team!inner(teacherid)")
+            .eq("team.teacherid", tid)
+        )
+        if year is not None:
+            query = query.eq("year", year)
+        if status is not None:
+            query = query.eq("status", status)
+        if after is not None:
+            after_year, after_pid = after
+            # แถวที่อยู่หลัง (year, pid) ของ cursor ตามลำดับจากมากไปน้อย
+            query = query.or_(f"year.lt.{after_year},and(year.eq.{after_year},pid.lt.{after_pid})")
+
+        response = await query.order("year", desc=True).order("pid", desc=True).limit(limit).execute()
+        rows = response.data or []
+        for row in rows:
+            row.pop("team", None)
+        return rows
+
+    async def process_topic_decisions(self, decisions):
+        response = await self.client.rpc("process_topic_decisions", {"decisions": decisions}).execute()
+        return response.data or []
+
+    async def group_task_summary(self, team_id: str) -> Any:
+        response = await self.client.rpc("get_group_task_summary", {"team_id": team_id}).execute()
+        return response.data
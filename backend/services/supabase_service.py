@@ -1,5 +1,8 @@
-from supabase import create_client, Client
 from dotenv import load_dotenv
+import asyncio
+import base64
+import json
+import re
 import jwt, os
 from datetime import datetime
 from fastapi.security import HTTPBearer
@@ -8,18 +11,61 @@ from datetime import datetime, timedelta
 from typing import Optional
 from typing import List, Optional, Dict, Any
 from model import MilestoneData
+from services.principal_cache import principal_cache
+from services.entity_loader import get_loader
+from services import entity_cache
+from services.repository import get_repository
 
 load_dotenv()
 
 url = os.getenv("URL_SUPABASE")
 key = os.getenv("KEY_SUPABASE")
-supabase: Client = create_client(url, key)
 
 security = HTTPBearer()
 JWT_SECRET = key
 JWT_ALGORITHM = "HS256"
 
-def get_current_user(token: str = Depends(security)):
+
+# --- Request-scoped entity loaders (services/entity_loader.py) ---
+# lookup student/team/project/teacher ที่เกิดใน tick เดียวกันจะถูกรวมเป็น query in_() เดียว
+# และจำผลไว้ตลอด request
+
+def _rows_by(table: str, column: str):
+    async def batch(keys: list[str]) -> dict[str, dict]:
+        # อ่านจาก entity cache ก่อน แล้วค่อย query เฉพาะ key ที่ไม่มีใน cache
+        rows = await entity_cache.get_many(table, keys)
+        missing = [k for k in keys if k not in rows]
+        if missing:
+            found = {}
+            for row in await get_repository().select(table, in_=(column, missing)):
+                found.setdefault(str(row[column]), row)
+            fetched = {k: found.get(k) for k in missing}
+            await entity_cache.set_many(table, fetched)
+            rows.update(fetched)
+        return rows
+    return batch
+
+
+def student_loader():
+    return get_loader("student", _rows_by("student", "sid"))
+
+def team_loader():
+    return get_loader("team", _rows_by("team", "tmid"))
+
+def project_loader():
+    return get_loader("project", _rows_by("project", "teamid"))
+
+def teacher_loader():
+    return get_loader("teacher", _rows_by("teacher", "tid"))
+
+
+def _pick(row: Optional[dict], *columns: str) -> Optional[dict]:
+    if row is None:
+        return None
+    return {column: row.get(column) for column in columns}
+
+
+async def get_current_user(token: str = Depends(security)):
     try:
         payload = jwt.decode(token.credentials, JWT_SECRET, algorithms=["HS256"])
         
@@ -30,13 +76,16 @@ def get_current_user(token: str = Depends(security)):
             raise HTTPException(status_code=401, detail="Invalid token payload")
 
         # ตรวจสอบว่าผู้ใช้มีตัวตนจริงในฐานข้อมูล
-        # Query ฐานข้อมูลแค่ครั้งเดียว
-        table_name = "student" if user_role == "student" else "teacher"
-        id_column = "sid" if user_role == "student" else "tid"
+        # ถ้าเพิ่งตรวจไปแล้ว (อยู่ใน principal cache) ไม่ต้อง query ซ้ำ
+        if not principal_cache.contains(user_id, user_role):
+            table_name = "student" if user_role == "student" else "teacher"
+            id_column = "sid" if user_role == "student" else "tid"
+
+            rows = await get_repository().select(table_name, id_column, eq={id_column: user_id})
+            if not rows:
+                raise HTTPException(status_code=401, detail="User profile not found")
 
-        response = supabase.table(table_name).select(id_column).eq(id_column, user_id).execute()
-        if not response.data:
-            raise HTTPException(status_code=401, detail="User profile not found")
+            principal_cache.add(user_id, user_role, payload.get("exp"))
 
         return {
             "id": user_id,
@@ -47,11 +96,13 @@ def get_current_user(token: str = Depends(security)):
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    except HTTPException:
+        raise
     except Exception:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 def role_required(required_roles: list[str]):
-    def wrapper(user = Depends(get_current_user)):
+    async def wrapper(user = Depends(get_current_user)):
         role = user["role"]   # <-- ตอนนี้คืนค่ามาแบบนี้
         if role not in required_roles:
             raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -74,42 +125,41 @@ def decode_token(token: str):
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def get_student_profile(user_id: str):
+async def get_student_profile(user_id: str):
     try:
-        response = supabase.table("student").select("sid, name, teamid").eq("sid", user_id).single().execute()
-        return response.data
+        return _pick(await student_loader().load(user_id), "sid", "name", "teamid")
     except Exception as e:
         print(f"Error fetching user profile: {e}")
         return None
 
-def get_student_profile_for_sheet(user_id: str):
+async def get_student_profile_for_sheet(user_id: str):
     """
     ดึงข้อมูลโปรไฟล์นักศึกษา (sid, name, teamid) และ ajdv_pm_sheet ของทีม
     """
     try:
-        # 1. ดึงข้อมูลโปรไฟล์นักศึกษาโดยใช้ sid
-        student_response = supabase.table("student").select("sid, name, teamid").eq("sid", user_id).single().execute()
+        # 1. ดึงข้อมูลโปรไฟล์นักศึกษาโดยใช้ sid (ผ่าน loader / entity cache)
+        student = await student_loader().load(user_id)
         
         # ตรวจสอบว่าพบข้อมูลนักศึกษาหรือไม่
-        if not student_response.data:
+        if not student:
             print(f"Error: Student with sid '{user_id}' not found.")
             return None
 
-        team_id = student_response.data.get("teamid")
+        team_id = student.get("teamid")
         if not team_id:
             print(f"Error: Student '{user_id}' does not have a teamid.")
-            return student_response.data  # คืนข้อมูลที่ได้มาแม้ไม่พบ teamid
+            return _pick(student, "sid", "name", "teamid")  # คืนข้อมูลที่ได้มาแม้ไม่พบ teamid
 
         # 2. ดึงข้อมูล ajdv_pm_sheet จาก teamid ที่ได้มา
-        team_response = supabase.table("team").select("ajdv_pm_sheet").eq("tmid", team_id).single().execute()
+        team = await team_loader().load(team_id)
         
         # สร้าง dictionary ใหม่เพื่อรวมข้อมูลทั้งหมด
         result_data = {
-            "sid": student_response.data.get("sid"),
-            "name": student_response.data.get("name"),
+            "sid": student.get("sid"),
+            "name": student.get("name"),
             "teamid": team_id,
             # เพิ่ม ajdv_pm_sheet เข้าไปในผลลัพธ์
-            "ajdv_pm_sheet": team_response.data.get("ajdv_pm_sheet") if team_response.data else None
+            "ajdv_pm_sheet": team.get("ajdv_pm_sheet") if team else None
         }
 
         return result_data
@@ -118,22 +168,20 @@ def get_student_profile_for_sheet(user_id: str):
         print(f"Error fetching user profile for sheet: {e}")
         return None
 
-def authenticate_user(username: str, password: str) -> Optional[dict]:
+async def authenticate_user(username: str, password: str) -> Optional[dict]:
     """
     ตรวจสอบข้อมูลผู้ใช้จากตาราง student และ teacher
     """
     try:
         # 1. ตรวจสอบในตาราง student ก่อน
-        student_response = supabase.table('student').select("sid").eq("sid", username).execute()
-        student_data = student_response.data
+        student_data = await get_repository().select('student', "sid", eq={"sid": username})
         if student_data:
             user = student_data[0]
             if user['sid'] == password:
                 return {"id": user['sid'], "role": "student"}
         print("ไม่มี student")
         # 2. ถ้าไม่พบในตาราง student ให้ตรวจสอบในตาราง teacher
-        teacher_response = supabase.table('teacher').select("tid").eq("tid", username).execute()
-        teacher_data = teacher_response.data
+        teacher_data = await get_repository().select('teacher', "tid", eq={"tid": username})
         if teacher_data:
             print("มี teacher")
             user = teacher_data[0]
@@ -153,24 +201,16 @@ def authenticate_user(username: str, password: str) -> Optional[dict]:
 
 
 
-def get_projects():
-    response = supabase.table("student").select("*").execute()
-    return response.data
+async def get_projects():
+    return await get_repository().select("student")
 
-def update_milestone(pjid: int, update_dict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+async def update_milestone(pjid: int, update_dict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     อัปเดตเฉพาะ Field ที่ระบุสำหรับ Project Milestone ID (pmid) ที่กำหนดใน Supabase
     """
     try:
-        response = (
-            supabase.table('project_milestone')
-
-            .update(update_dict) 
-            .eq('pmid', pjid) 
-            .execute()
-        )
-        
-        updated_data = response.data
+        updated_data = await get_repository().update('project_milestone', update_dict, eq={'pmid': pjid})
+        await entity_cache.invalidate(("project_milestone", "all"), ("project_milestone", "single"))
 
         # 🛑 แก้ไข: ถ้าอัปเดตสำเร็จ (response.data ไม่ว่าง) ให้คืนค่าข้อมูลที่อัปเดตแล้ว
         if updated_data:
@@ -184,83 +224,105 @@ def update_milestone(pjid: int, update_dict: Dict[str, Any]) -> Optional[Dict[st
         # การจัดการข้อผิดพลาด เช่น DB Connection Error หรือ Invalid Data
         print(f"Supabase UPDATE error: {e}")
         return None
-def get_milestone():
-    response = supabase.table("project_milestone").select("*").execute()
-    return response.data
+async def get_milestone():
+    async def load():
+        return await get_repository().select("project_milestone")
+    return await entity_cache.cached("project_milestone", "all", load)
 
 
-def get_group_task(team_id: str):
-    response = supabase.rpc(
-        "get_group_task_summary", 
-        {"team_id": team_id} 
-    ).execute()
-    return response.data
+async def get_group_task(team_id: str):
+    return await get_repository().group_task_summary(team_id)
 
 
-def get_topic(tid: int):
-    response = supabase.table("topic").select("*").eq("tid", tid).execute()
-    return response.data
+async def get_topic(tid: int):
+    async def load():
+        return await get_repository().select("topic", eq={"tid": tid})
+    return await entity_cache.cached("topic_by_teacher", tid, load)
 
 
-def check_topic_for_team(team_id: str):
+async def check_topic_for_team(team_id: str):
     """
     ตรวจสอบว่าทีมนี้มีหัวข้อหรือโปรเจกต์แล้วหรือยัง
     """
     try:
         # สมมติว่าตารางโปรเจกต์คือ 'project' และมีคอลัมน์ 'team_id'
-        # ใช้ .count() เพื่อตรวจสอบการมีอยู่ของข้อมูลอย่างมีประสิทธิภาพ
-        response = supabase.table("project").select("teamid", count="exact").eq("teamid", team_id).execute()
-        return response.count > 0
+        # ใช้ count เพื่อตรวจสอบการมีอยู่ของข้อมูลอย่างมีประสิทธิภาพ
+        return await get_repository().count("project", eq={"teamid": team_id}) > 0
     except Exception as e:
         print(f"Error checking topic for team: {e}")
         return False
     
 
-def check_topic_for_sent(team_id: str):
+async def check_topic_for_sent(team_id: str):
     """
     ตรวจสอบว่าทีมนี้มีหัวข้อหรือโปรเจกต์แล้วหรือยัง
     """
     try:
         # สมมติว่าตารางโปรเจกต์คือ 'project' และมีคอลัมน์ 'team_id'
-        # ใช้ .count() เพื่อตรวจสอบการมีอยู่ของข้อมูลอย่างมีประสิทธิภาพ
-        response = supabase.table("topic").select("teamid", count="exact").eq("teamid", team_id).ne("status", "not-pass").execute()
-        return response.count > 0
+        # ใช้ count เพื่อตรวจสอบการมีอยู่ของข้อมูลอย่างมีประสิทธิภาพ
+        return await get_repository().count("topic", eq={"teamid": team_id}, neq={"status": "not-pass"}) > 0
     except Exception as e:
         print(f"Error checking topic for team: {e}")
         return False
     
     
-def submit_new_project(project_data: dict):
+async def submit_new_project(project_data: dict):
     """
     บันทึกข้อมูลโปรเจกต์ใหม่ลงในตาราง 'project'
     """
     try:
-        response = supabase.table("topic").insert(project_data).execute()
-        return response.data[0]
+        rows = await get_repository().insert("topic", project_data)
+        await entity_cache.invalidate(("topic_by_teacher", project_data.get("tid")))
+        return rows[0]
     except Exception as e:
         print(f"Error submitting new project: {e}")
         return None
     
 
-def get_student_team(student_id: str):
+async def get_student_team(student_id: str):
     try:
-        response = supabase.table("student").select("teamid").eq("sid", student_id).execute()
-        return response.data[0]
+        return _pick(await student_loader().load(student_id), "teamid")
     except Exception as e:
         print(f"Error find student team: {e}")
         return None
     
-def get_teacher_profile(teacher_id: str):
+async def get_teacher_profile(teacher_id: str):
     try:
-        response = supabase.table("teacher").select("tid, name").eq("tid", teacher_id).single().execute()
-        return response.data
+        return _pick(await teacher_loader().load(teacher_id), "tid", "name")
     except Exception as e:
         print(f"Error fetching user profile: {e}")
         return None
     
 
 
-def process_topic_action(
+async def process_topic_decisions(decisions: list[dict]) -> list[dict]:
+    """
+    Accepts / rejects topics with one repository call (on Supabase, the
+    process_topic_decisions Postgres function in
+    sql/process_topic_decisions.sql). Each decision
+    ({tpid, action, tid, teamid, topicName, year, remark}) is applied
+    atomically by the database: topic status, and on accept the team, the
+    project and its four documents. Returns one result per decision:
+    {"tpid", "ok", "new_status"} or {"tpid", "ok": False, "code", "error"}.
+    """
+    results = await get_repository().process_topic_decisions(decisions)
+
+    # ล้าง cache ของทีม/อาจารย์ที่ถูกแก้ไขจริงเท่านั้น
+    for decision, result in zip(decisions, results):
+        if not result.get("ok"):
+            continue
+        if decision["action"] == "accept":
+            await _invalidate_team(decision["teamid"], decision["tid"])
+        await entity_cache.invalidate(("topic_by_teacher", decision["tid"]))
+
+    return results
+
+
+# SQLSTATE จาก process_topic_decisions -> HTTP status
+_TOPIC_ERROR_STATUS = {"P0002": 404, "22023": 400}
+
+
+async def process_topic_action(
     tpid: str,
     action: str,
     tid: str,  # เปลี่ยนเป็น str
@@ -269,82 +331,38 @@ def process_topic_action(
     year: str,
     remark: str | None = None
 ) -> dict:
-    if action == "accept":
-        new_status = "pass"
-        # หากอนุมัติ ให้เตรียมข้อมูลอัปเดตของ team
-        update_team_data = {
-            "name": topicName,
-            "status": "on-going",
-            "teacherid": tid, 
-        }
-
-        create_project_data = {
-            "topic": topicName,
-            "objective": "",
-            "status": "on-going",
-            "year" : year,
-            "teamid": teamid
-        }
-    elif action == "reject":
-        new_status = "not-pass"
-        # หากปฏิเสธ ไม่ต้องอัปเดตตาราง team หรือกำหนดเป็นค่าว่าง
-        update_team_data = {} 
-    else:
+    if action not in ("accept", "reject"):
         raise ValueError("Invalid action. Must be 'accept' or 'reject'.")
 
-    update_topic_data = {
-        "status": new_status,
+    decision = {
+        "tpid": tpid,
+        "action": action,
+        "tid": tid,
+        "teamid": teamid,
+        "topicName": topicName,
+        "year": year,
         "remark": remark,
     }
 
     try:
-        topic_response = supabase.table("topic").update(update_topic_data).eq("tpid", tpid).execute()
-        if not topic_response.data:
-            raise HTTPException(status_code=404, detail="Topic not found or already processed")
-
-        # ถ้า action คือ 'accept' จึงจะทำการอัปเดตตาราง team
-        if action == "accept":
-            team_response = supabase.table("team").update(update_team_data).eq("tmid", teamid).execute()
-            if not team_response.data:
-                # ถ้าอัปเดต team ล้มเหลว ให้แจ้งเตือนและยกเลิก
-                print(f"Failed to update team: Team ID {teamid} not found.")
-                raise HTTPException(status_code=404, detail="Topic updated, but associated Team not found or failed to update.")
-            project_create = supabase.table("project").insert(create_project_data).execute()
-            if not project_create.data:
-                print(f"Failed to create project.")
-                raise HTTPException(status_code=404, detail="Topic updated, but associated Team not found or failed to update.")
-            # ดึง project_id ที่เพิ่งสร้าง
-            project_id = project_create.data[0].get("pid") 
-            if not project_id:
-                raise HTTPException(status_code=500, detail="Failed to retrieve new project ID.")
-
-            # สร้าง list ของ dictionary สำหรับเอกสารแต่ละประเภท
-            documents_to_insert = [
-                {"doc_type": "proposal", "status": "not-submitted", "pid": project_id},
-                {"doc_type": "slide-proposal", "status": "not-submitted", "pid": project_id},
-                {"doc_type": "thesis", "status": "not-submitted", "pid": project_id},
-                {"doc_type": "slide-final-present", "status": "not-submitted", "pid": project_id},
-            ]
-
-            # ส่งรายการทั้งหมดไป insert ใน Supabase ในการเรียกครั้งเดียว
-            doc_submit_create = supabase.table("doc").insert(documents_to_insert).execute()
-            
-            if not doc_submit_create.data:
-                print(f"Failed to create documents for project ID: {project_id}.")
-                raise HTTPException(status_code=500, detail="Failed to create initial documents.")
-            
-            
-        return {
-            "message": f"Topic '{tpid}' has been {new_status}.",
-            "new_status": new_status,
-        }
+        # topic, team, project และ doc ถูกเขียนใน transaction เดียวฝั่ง database
+        results = await process_topic_decisions([decision])
     except Exception as e:
-        # หากเกิดข้อผิดพลาด ให้ rollback หรือแจ้งผู้ใช้
         print(f"Error during topic and team update: {e}")
-        # คุณอาจพิจารณาเพิ่ม logic สำหรับ rollback ในกรณีที่อัปเดตบางส่วนสำเร็จ
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+    result = results[0] if results else {"ok": False, "code": None, "error": "No result from database"}
+    if not result["ok"]:
+        print(f"Error during topic and team update: {result['error']}")
+        raise HTTPException(status_code=_TOPIC_ERROR_STATUS.get(result.get("code"), 500), detail=result["error"])
+
+    new_status = result["new_status"]
+    return {
+        "message": f"Topic '{tpid}' has been {new_status}.",
+        "new_status": new_status,
+    }
     
-def check_teacher_teams_for_projects(tid: str):
+async def check_teacher_teams_for_projects(tid: str):
     """
     Checks for projects associated with a teacher's teams.
     
@@ -352,60 +370,203 @@ def check_teacher_teams_for_projects(tid: str):
         tid (str): The teacher ID.
         
     Returns:
-        The response object from the Supabase query, or None if an error occurs.
+        The project rows, or None if the teacher has no team or an error occurs.
     """
-    try:
-        # Step 1: Get all team IDs associated with the teacher
-        teams_response = supabase.table("team").select("tmid").eq("teacherid", tid).execute()
-        
+    async def load():
+        projects = await get_repository().teacher_projects(tid)
         # Check if the teacher has any teams
-        if not teams_response.data:
+        if projects is None:
             print("No teams found for this teacher.")
-            return None
-            
-        # Extract a list of team IDs
-        team_ids = [team['tmid'] for team in teams_response.data]
-
-        # Step 2: Query the 'project' table for any of these team IDs
-        # Use the 'in_' filter to check against an array of IDs
-        projects_response = supabase.table("project").select("*").in_("teamid", team_ids).execute()
-        print(projects_response.data)
-        return projects_response.data
-        
+        return projects
+
+    try:
+        return await entity_cache.cached("team_progress", tid, load)
     except Exception as e:
         print(f"Error checking teacher's teams for projects: {e}")
         return None
     
-def get_project_by_team(tmid: str):
-    # ค้นหาข้อมูล project จาก teamid
-    response = supabase.table("project").select("*").eq("teamid", tmid).execute()
-    project = response.data
-    if not project:
+# คอลัมน์ของ project ที่ผู้เรียกเลือกได้ใน team-progress แบบแบ่งหน้า
+PROJECT_PROGRESS_FIELDS = ("pid", "topic", "objective", "status", "year", "teamid", "recommendations", "additional_work")
+_CURSOR_VALUE = re.compile(r"^[\w.-]+$")
+
+
+def encode_progress_cursor(row: dict) -> str:
+    raw = json.dumps([row["year"], row["pid"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_progress_cursor(cursor: str) -> tuple[Any, Any]:
+    """
+    Raises ValueError for a cursor that was not produced by encode_progress_cursor.
+    """
+    try:
+        year, pid = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    # ค่าถูกใส่ลงใน filter or=(...) ของ PostgREST จึงรับเฉพาะตัวเลข/ตัวอักษร
+    if not all(_CURSOR_VALUE.match(str(v)) for v in (year, pid)):
+        raise ValueError("Invalid cursor")
+    return year, pid
+
+
+async def get_teacher_team_progress(
+    tid: str,
+    limit: int,
+    cursor: str | None = None,
+    year: str | None = None,
+    status: str | None = None,
+    fields: list[str] | None = None,
+) -> dict:
+    """
+    One page of the projects of a teacher's teams, newest first, ordered by
+    (year, pid) descending with keyset pagination. The teacher filter is a
+    join on team (one query, no growing in_() list); year and status are
+    filtered by the database. fields selects the project columns returned
+    (year and pid are always included for the cursor).
+    Returns {"items", "next_cursor"}; next_cursor is None on the last page.
+    Raises ValueError for an unknown field or a bad cursor.
+    """
+    fields = list(fields or PROJECT_PROGRESS_FIELDS)
+    unknown = [f for f in fields if f not in PROJECT_PROGRESS_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(PROJECT_PROGRESS_FIELDS)}")
+    columns = list(dict.fromkeys(fields + ["year", "pid"]))
+
+    after = decode_progress_cursor(cursor) if cursor else None
+
+    # ขอเกินมาหนึ่งแถวเพื่อรู้ว่ามีหน้าถัดไปหรือไม่
+    rows = await get_repository().teacher_project_page(tid, columns, limit + 1, after, year, status)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_progress_cursor(rows[-1]) if has_more else None
+    items = [{f: row.get(f) for f in fields} for row in rows]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def _invalidate_team(team_id: str, teacher_id=None):
+    """
+    Drops every cached read that includes the team's team/project/doc rows.
+    """
+    if teacher_id is None:
+        team = await team_loader().load(team_id)
+        teacher_id = team.get("teacherid") if team else None
+    await entity_cache.invalidate(
+        ("team", team_id),
+        ("project", team_id),
+        ("documents", team_id),
+        ("team_aggregate", team_id),
+        ("team_progress", teacher_id),
+    )
+
+
+def _first(value):
+    # embedding คืน object หรือ list ขึ้นกับ cardinality ของความสัมพันธ์
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+async def load_team_aggregate(tmid: str) -> Optional[dict]:
+    """
+    Loads a team with its members, advisor, project and the project's
+    documents in a single round trip. Returns
+    {"team", "members", "advisor", "project", "documents"} or None when the
+    team does not exist.
+    """
+    async def load():
+        return await get_repository().team_aggregate(tmid)
+
+    team = await entity_cache.cached("team_aggregate", tmid, load)
+    if not team:
+        return None
+    members = team.pop("student", None) or []
+    advisor = _first(team.pop("teacher", None))
+    project = _first(team.pop("project", None))
+    documents = (project or {}).pop("doc", None) or []
+
+    # แถวที่ได้มาแล้วใส่ไว้ใน loader ของ request นี้ lookup ถัดไปจะไม่ query ซ้ำ
+    team_loader().prime(tmid, team)
+    project_loader().prime(tmid, project)
+    for member in members:
+        student_loader().prime(member["sid"], member)
+    if advisor:
+        teacher_loader().prime(advisor["tid"], advisor)
+
+    return {
+        "team": team,
+        "members": members,
+        "advisor": advisor,
+        "project": project,
+        "documents": documents,
+    }
+
+
+def project_overview(aggregate: dict) -> dict:
+    """
+    Shapes a team aggregate into the response of /api/topics/overview/{tmid}.
+    """
+    project = aggregate["project"]
+    advisor = aggregate["advisor"]
+    return {
+        "title": project["topic"],
+        "team": [m["sid"] for m in aggregate["members"]],
+        "advisors": [advisor["name"]] if advisor else [],
+        "goal": project["objective"],
+        "year": project["year"],
+    }
+
+
+async def get_project_by_team(tmid: str):
+    # project, สมาชิก และอาจารย์ที่ปรึกษามาจาก query เดียว
+    aggregate = await load_team_aggregate(tmid)
+    if not aggregate or not aggregate["project"]:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    data_row = project[0]
-    
-    # ดึงข้อมูลสมาชิกจากตาราง "student"
-    members_response = supabase.table("student").select("sid").eq("teamid", tmid).execute()
-    team_members = [m['sid'] for m in members_response.data]
+    return project_overview(aggregate)
 
-    find_teacherID_team = supabase.table("team").select("teacherid").eq("tmid", tmid).execute()
-    teacher_id = find_teacherID_team.data[0]['teacherid']
 
-    advisors_names = []
-    if teacher_id:
-        find_teacher_name = supabase.table("teacher").select("name").eq("tid", teacher_id).execute()
-        advisors_names = [t['name'] for t in find_teacher_name.data]
+async def get_bootstrap(user: dict) -> dict:
+    """
+    Everything the first page needs for the signed-in user, from the
+    request-scoped loaders: profile, team sheet, project overview and
+    documents (student), or profile and topics (teacher). Missing pieces
+    are None / empty instead of errors.
+    """
+    if user["role"] != "student":
+        profile, topics = await asyncio.gather(get_teacher_profile(user["id"]), get_topic(user["id"]))
+        return {"user": user, "profile": profile, "topics": topics}
+
+    profile = await get_student_profile(user["id"])
+    result = {"user": user, "profile": profile, "team": None, "overview": None, "documents": []}
+    team_id = profile.get("teamid") if profile else None
+    if not team_id:
+        return result
+
+    aggregate = await load_team_aggregate(team_id)
+    if aggregate:
+        result["team"] = await get_team_profile_for_sheet(team_id)
+        result["documents"] = aggregate["documents"]
+        if aggregate["project"]:
+            result["overview"] = project_overview(aggregate)
+    return result
+
+
+async def get_team_dashboard(tmid: str) -> dict:
+    """
+    Overview and documents of a team from one query, for the dashboard's
+    first paint. Raises 404 when the team has no project.
+    """
+    aggregate = await load_team_aggregate(tmid)
+    if not aggregate or not aggregate["project"]:
+        raise HTTPException(status_code=404, detail="Project not found")
 
     return {
-        "title": data_row["topic"],  # แก้ไขจาก "title" เป็น "topic"
-        "team": team_members,
-        "advisors": advisors_names,
-        "goal": data_row["objective"], # แก้ไขจาก "goal" เป็น "objective"
-        "year": data_row["year"],      # ตรวจสอบอีกครั้งว่า year ใน DB มีค่าหรือไม่
+        "overview": project_overview(aggregate),
+        "documents": aggregate["documents"],
     }
 
-def update_project_goal(team_id: str, new_goal: str, user_id: str) -> dict:
+async def update_project_goal(team_id: str, new_goal: str, user_id: str) -> dict:
     """
     อัปเดตวัตถุประสงค์ (goal) ของโครงงาน
     :param team_id: ID ของทีม
@@ -416,7 +577,7 @@ def update_project_goal(team_id: str, new_goal: str, user_id: str) -> dict:
     # ---  Authorization Check ---
     # ตรวจสอบก่อนว่าผู้ใช้ที่ login อยู่ เป็นสมาชิกของทีมที่กำลังจะแก้ไขหรือไม่
 
-    if not is_user_member_of_team(user_id=user_id, team_id=team_id):
+    if not await is_user_member_of_team(user_id=user_id, team_id=team_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to edit this project."
@@ -424,15 +585,16 @@ def update_project_goal(team_id: str, new_goal: str, user_id: str) -> dict:
 
     # ถ้าผ่านการตรวจสอบด้านบนแล้ว จึงจะทำงานส่วนที่เหลือ
     try:
-        response = supabase.table('project').update({'objective': new_goal}).eq('teamid', team_id).execute()
-        if response.data:
-            return response.data[0]
+        rows = await get_repository().update('project', {'objective': new_goal}, eq={'teamid': team_id})
+        if rows:
+            await _invalidate_team(team_id)
+            return rows[0]
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Project for team {team_id} not found.")
     except Exception as e:
         print(f"Error updating project goal: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not update project goal.")
     
-def is_user_member_of_team(user_id: str, team_id: str) -> bool:
+async def is_user_member_of_team(user_id: str, team_id: str) -> bool:
     """
     ตรวจสอบว่า User ID ที่ระบุ เป็นสมาชิกของ Team ID ที่กำหนดหรือไม่
     :param user_id: ID ของผู้ใช้ (sid) ที่ได้จาก Token
@@ -443,9 +605,9 @@ def is_user_member_of_team(user_id: str, team_id: str) -> bool:
     print(team_id, user_id)
     try:
         # ค้นหาโปรไฟล์ของนักศึกษาจาก user_id ที่ login เข้ามา
-        response = supabase.table('student').select('teamid').eq('sid', user_id).single().execute()
+        student = await student_loader().load(user_id)
         
-        if response.data and response.data.get('teamid') == team_id:
+        if student and student.get('teamid') == team_id:
             return True
         return False
     except Exception:
@@ -454,26 +616,20 @@ def is_user_member_of_team(user_id: str, team_id: str) -> bool:
 async def get_documents_by_team_id(team_id: str):
     """
     ดึงข้อมูลเอกสารทั้งหมดของทีมที่กำหนดจากฐานข้อมูล
-    โดยค้นหา project_id ที่เชื่อมกับทีมก่อน
+    project และเอกสารของ project มาจาก query เดียว (embedding)
     """
-    try:
-        # 1. ค้นหา project_id ของทีม
-        project_response = supabase.table('project').select('pid').eq('teamid', team_id).single().execute()
-        
-        # ตรวจสอบว่าพบ project_id หรือไม่
-        if not project_response.data:
+    async def load():
+        documents = await get_repository().team_documents(team_id)
+
+        # ตรวจสอบว่าพบ project ของทีมหรือไม่
+        if documents is None:
             print(f"No project found for team ID: {team_id}")
             return []
-            
-        project_id = project_response.data.get('pid')
-        
-        # 2. ใช้ project_id ที่ได้ไปดึงข้อมูลเอกสารจากตาราง 'documents'
-        documents_response = supabase.table('doc').select('*').eq('pid', project_id).execute()
 
-        if not documents_response.data:
-            return []
+        return documents
 
-        return documents_response.data
+    try:
+        return await entity_cache.cached("documents", team_id, load)
         
     except Exception as e:
         print(f"Error fetching documents: {e}")
@@ -486,13 +642,17 @@ async def get_all_milestones() -> Optional[MilestoneData]:
     """
     try:
         # ดึงข้อมูลทั้งหมดจากตาราง 'milestone'
-        milestone_response = supabase.table('project_milestone').select('*').single().execute()
-        print(milestone_response)
-        if not milestone_response.data:
+        async def load():
+            rows = await get_repository().select('project_milestone', limit=2)
+            # ต้องมีแถวเดียวพอดี (เหมือน .single())
+            return rows[0] if len(rows) == 1 else None
+
+        data = await entity_cache.cached("project_milestone", "single", load)
+        if not data:
             return None # ไม่พบข้อมูล milestones
 
         # แปลงข้อมูลที่ได้จาก Supabase เป็น Pydantic Model
-        return MilestoneData.model_validate(milestone_response.data)
+        return MilestoneData.model_validate(data)
     except Exception as e:
         print(f"Error fetching milestones: {e}")
         return None
@@ -503,19 +663,15 @@ async def get_project_suggestions(team_id: str):
     Fetches recommendations and additional_work data for a given team from the project table.
     """
     try:
-        # The `await` goes here, before the entire chain of methods.
-        response = supabase.table("project").select("recommendations, additional_work").eq("teamid", team_id).single().execute()
-        return response.data
+        return _pick(await project_loader().load(team_id), "recommendations", "additional_work")
     except Exception as e:
         print(f"Error fetching project suggestions: {e}")
         return None
     
 
-def get_project_name(team_id: str):
+async def get_project_name(team_id: str):
     try:
-        # The `await` goes here, before the entire chain of methods.
-        response = supabase.table("project").select("topic").eq("teamid", team_id).single().execute()
-        return response.data
+        return _pick(await project_loader().load(team_id), "topic")
     
     except Exception as e:
         print(f"Error fetching project name: {e}")
@@ -552,12 +708,13 @@ async def set_project_suggestions(set_response: list, team_id: str):
     
     try:
 
-        response = supabase.table("project").update(payload).eq("teamid", team_id).execute()
+        rows = await get_repository().update("project", payload, eq={"teamid": team_id})
         
         # ตรวจสอบว่าอัปเดตสำเร็จ
-        if response.data:
+        if rows:
+            await _invalidate_team(team_id)
             print("Successfully updated project suggestions.")
-            return response.data
+            return rows
         else:
             print("Update operation successful but no data was returned.")
             return None
@@ -569,14 +726,15 @@ async def set_project_suggestions(set_response: list, team_id: str):
 
 
 
-def get_team_profile_for_sheet(teamid: str):
+async def get_team_profile_for_sheet(teamid: str):
     try:
+        team = await team_loader().load(teamid)
+        if team is None:
+            return None
 
-        team_response = supabase.table("team").select("ajdv_pm_sheet").eq("tmid", teamid).single().execute()
-        
         result_data = {
             "teamid": teamid,
-            "ajdv_pm_sheet": team_response.data.get("ajdv_pm_sheet") if team_response.data else None
+            "ajdv_pm_sheet": team.get("ajdv_pm_sheet")
         }
 
         return result_data
@@ -591,10 +749,15 @@ async def update_document(did: int, payload: dict):
         }
     try:
 
-        response = supabase.table("doc").update(update_data).eq("did", did).execute()
+        rows = await get_repository().update("doc", update_data, eq={"did": did})
 
+        # ล้าง cache ของทีมเจ้าของเอกสาร (doc -> project -> team)
+        if rows:
+            project = await get_repository().select("project", "teamid", eq={"pid": rows[0].get("pid")}, limit=1)
+            if project:
+                await _invalidate_team(project[0]["teamid"])
 
-        return response.data
+        return rows
 
     except Exception as e:
 
@@ -1,12 +1,61 @@
 import re
+from typing import Iterable, Iterator
+
+# กฎทำงานตามลำดับนี้ต่อหน้า: กฎที่อาศัยการขึ้นบรรทัดใหม่ต้องมาก่อนการยุบช่องว่าง
+# (ถ้ายุบช่องว่างก่อน \n จะหายหมดและ de-hyphenation / ลบเลขหน้าจะไม่เจออะไรเลย)
+
+# คำที่ถูกตัดด้วย "-" ท้ายบรรทัด: "infor-\nmation" -> "information"
+_HYPHEN_BREAK = re.compile(r"(\w)-[^\S\n]*\n\s*(?=\w)")
+# บรรทัดที่มีแต่เลขหน้า (รวมเลขไทยและแบบ "- 12 -")
+_PAGE_NUMBER_LINE = re.compile(r"^[^\S\n]*(?:-[^\S\n]*)?[0-9๐-๙]+(?:[^\S\n]*-)?[^\S\n]*$", re.MULTILINE)
+# glyph ใน Private Use Area ที่ฟอนต์ไทยเก่าใช้แทนสระ/วรรณยุกต์ตำแหน่งพิเศษ
+_PRIVATE_USE = re.compile("[\ue000-\uf8ff]+")
+# ช่องว่างรอบการขึ้นบรรทัดใหม่ (รวมบรรทัดว่าง) เหลือ \n เดียว
+_LINE_BREAKS = re.compile(r"\s*\n\s*")
+# ช่องว่างภายในบรรทัดเหลือช่องเดียว
+_INLINE_SPACE = re.compile(r"[^\S\n]+")
+# ส่วนของคำที่ค้างท้ายหน้า เช่น "...infor-"
+_TRAILING_FRAGMENT = re.compile(r"(\w+)-$")
+
+
+def clean_page(text: str) -> str:
+    """
+    Cleans the text of one page: joins words hyphenated across lines, drops
+    lines that only hold a page number, removes private-use glyphs and
+    collapses whitespace. Line breaks are kept (one per line, no blank lines).
+    """
+    text = _HYPHEN_BREAK.sub(r"\1", text)
+    text = _PAGE_NUMBER_LINE.sub("", text)
+    text = _PRIVATE_USE.sub("", text)
+    text = _LINE_BREAKS.sub("\n", text)
+    return _INLINE_SPACE.sub(" ", text).strip()
+
+
+def clean_pages(pages: Iterable[str]) -> Iterator[str]:
+    """
+    Generator version of clean_page over the pages of a document, e.g.
+    clean_pages(pdf_service.iter_page_texts(doc)). Pages are cleaned one at a
+    time, so the whole document is never held as one string; a word hyphenated
+    across a page break is moved onto the next page. Yields one string per page.
+    """
+    previous = None
+    for text in pages:
+        page = clean_page(text)
+        if previous is not None:
+            fragment = _TRAILING_FRAGMENT.search(previous)
+            if fragment and page[:1].isalnum():
+                # ย้ายส่วนต้นของคำไปต่อกับหน้าถัดไป
+                previous = previous[:fragment.start()].rstrip()
+                page = fragment.group(1) + page
+            yield previous
+        previous = page
+
+    if previous is not None:
+        yield previous
+
 
 def clean_text(text: str) -> str:
-    text = re.sub(r'\s+', ' ', text).strip()
-    text = re.sub(r'^\s*\d+\s*$', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
-    text = re.sub(r'[\uE000-\uF8FF]', '', text)
-    text = "\n".join([line.strip() for line in text.split('\n') if line.strip()])
-    return text
+    return clean_page(text)
 
 def contains_keywords(text: str, keywords: list[str]) -> bool:
     return any(keyword in text for keyword in keywords)
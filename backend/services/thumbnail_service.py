@@ -0,0 +1,87 @@
+"""
+Low-resolution page previews of stored PDFs.
+
+Thumbnails are rendered on the PDF process pool from the original kept in the
+source store (services/page_index.py) and cached in a DiskLRUStore keyed by
+(document hash, page, dpi, format), so a page is rendered once and every
+later view is a file read.
+"""
+from starlette.concurrency import run_in_threadpool
+
+from config import THUMBNAIL_DIR, THUMBNAIL_MAX_BYTES, THUMBNAIL_JPEG_QUALITY
+from services import page_index, pdf_service
+from services.disk_store import DiskLRUStore
+from services.pdf_executor import run_pdf_task
+from services.upload_service import remove_file
+
+# PyMuPDF เขียน WebP ไม่ได้ จึงรองรับเฉพาะ PNG/JPEG
+THUMBNAIL_FORMATS = {"png": "image/png", "jpeg": "image/jpeg"}
+
+_store: DiskLRUStore | None = None
+
+
+def get_thumbnail_store() -> DiskLRUStore:
+    global _store
+    if _store is None:
+        _store = DiskLRUStore(THUMBNAIL_DIR, THUMBNAIL_MAX_BYTES, blob_ext="img")
+    return _store
+
+
+def thumbnail_key(doc_hash: str, page: int, dpi: int, fmt: str) -> str:
+    return f"{doc_hash}-{page}-{dpi}-{fmt}"
+
+
+class SourceNotFound(Exception):
+    pass
+
+
+async def render_missing(doc_hash: str, pages: list[int], dpi: int, fmt: str) -> list[int]:
+    """
+    Renders the pages that are not cached yet (in one pool task) and stores them.
+    Returns the pages that are now available. Raises SourceNotFound when the
+    original PDF is no longer in the source store.
+    """
+    store = get_thumbnail_store()
+    missing = [p for p in pages if not store.contains(thumbnail_key(doc_hash, p, dpi, fmt))]
+    if not missing:
+        return list(pages)
+
+    source = await run_in_threadpool(page_index.get_source_store().get, doc_hash)
+    if source is None:
+        raise SourceNotFound(doc_hash)
+    _, source_path = source
+
+    try:
+        images = await run_pdf_task(pdf_service.render_thumbnails, source_path, missing, dpi, fmt, THUMBNAIL_JPEG_QUALITY)
+    finally:
+        remove_file(source_path)
+
+    # เขียนทุกหน้าแล้ว evict ครั้งเดียว แทนการ scandir ทั้ง directory ต่อหน้า
+    meta = {"media_type": THUMBNAIL_FORMATS[fmt]}
+    await run_in_threadpool(
+        store.put_bytes_many,
+        [(thumbnail_key(doc_hash, page, dpi, fmt), meta, data) for page, data in images.items()],
+    )
+
+    return [p for p in pages if p in images or p not in missing]
+
+
+async def get_thumbnail(doc_hash: str, page: int, dpi: int, fmt: str) -> tuple[str, str] | None:
+    """
+    Returns (serve_path, media_type) for one page, rendering it on a miss.
+    serve_path is a private link the caller must delete after use. Returns None
+    when the page does not exist; raises SourceNotFound like render_missing().
+    """
+    store = get_thumbnail_store()
+    key = thumbnail_key(doc_hash, page, dpi, fmt)
+
+    entry = await run_in_threadpool(store.get, key)
+    if entry is None:
+        if page not in await render_missing(doc_hash, [page], dpi, fmt):
+            return None
+        entry = await run_in_threadpool(store.get, key)
+        if entry is None:
+            return None
+
+    meta, serve_path = entry
+    return serve_path, meta["media_type"]
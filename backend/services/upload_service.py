@@ -0,0 +1,156 @@
+"""
+Bounded-memory handling of PDF uploads and responses.
+
+Peak memory per PDF request in the API process is about
+min(upload size, PDF_SPOOL_THRESHOLD) * (1 + pool tasks in flight) + PDF_STREAM_CHUNK:
+
+* uploads are read in PDF_STREAM_CHUNK pieces; anything larger than
+  PDF_SPOOL_THRESHOLD goes to a temp file and is handed to the PDF worker
+  as a path, which MuPDF opens lazily instead of loading it whole
+* an upload kept in memory is pickled into every pool task that reads it
+  (one per shard while a large document is fanned out, see
+  pdf_executor), so each of those tasks holds another copy until the
+  worker has received it; spooled files only send their path
+* the worker writes the filtered PDF straight to a temp file (no
+  tobytes()/BytesIO copies) and the response streams that file in
+  PDF_STREAM_CHUNK pieces, deleting it afterwards
+"""
+import hashlib
+import os
+import tempfile
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse
+
+from config import PDF_SPOOL_THRESHOLD, PDF_MAX_UPLOAD_BYTES, PDF_STREAM_CHUNK, PDF_TMP_DIR
+
+
+class SpooledUpload:
+    """
+    An uploaded PDF held either as bytes (small files) or as a temp file path (large files).
+    `source` can be passed directly to pdf_service/pdf_executor functions and
+    `sha256` is the hex digest of the uploaded bytes.
+    """
+
+    def __init__(self, source: bytearray | str, size: int, sha256: str):
+        self.source = source
+        self.size = size
+        self.sha256 = sha256
+
+    @property
+    def on_disk(self) -> bool:
+        return isinstance(self.source, str)
+
+    def cleanup(self):
+        if self.on_disk:
+            remove_file(self.source)
+
+
+def remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def new_temp_path(suffix: str = ".pdf") -> str:
+    """
+    Reserves a temp file path for worker output (the file is created empty).
+    """
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=PDF_TMP_DIR)
+    os.close(fd)
+    return path
+
+
+async def spool_upload(file: UploadFile) -> SpooledUpload:
+    """
+    Reads an UploadFile chunk by chunk, keeping it in memory only while it is
+    below PDF_SPOOL_THRESHOLD. Raises 413 above PDF_MAX_UPLOAD_BYTES.
+    """
+    buffer = bytearray()
+    size = 0
+    digest = hashlib.sha256()
+    tmp = None
+    try:
+        while True:
+            chunk = await file.read(PDF_STREAM_CHUNK)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            digest.update(chunk)
+            if size > PDF_MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File is larger than {PDF_MAX_UPLOAD_BYTES} bytes."
+                )
+
+            if tmp is None and size > PDF_SPOOL_THRESHOLD:
+                # เกิน threshold: ย้ายข้อมูลที่อ่านมาแล้วลงดิสก์แล้วเขียนต่อบนดิสก์
+                tmp = tempfile.NamedTemporaryFile(suffix=".pdf", dir=PDF_TMP_DIR, delete=False)
+                await run_in_threadpool(tmp.write, buffer)
+                buffer = bytearray()
+
+            if tmp is None:
+                buffer += chunk
+            else:
+                await run_in_threadpool(tmp.write, chunk)
+    except BaseException:
+        if tmp is not None:
+            tmp.close()
+            remove_file(tmp.name)
+        raise
+
+    if tmp is None:
+        # ส่ง bytearray ต่อไปเลยเพื่อไม่ให้มีสำเนาที่สอง (fitz และ pickle รับ bytearray ได้)
+        return SpooledUpload(buffer, size, digest.hexdigest())
+
+    tmp.close()
+    return SpooledUpload(tmp.name, size, digest.hexdigest())
+
+
+async def save_upload(file: UploadFile, path: str, max_bytes: int = PDF_MAX_UPLOAD_BYTES) -> tuple[int, str]:
+    """
+    Writes an UploadFile to `path` chunk by chunk without buffering it in memory.
+    Returns (size, sha256 hex digest). Raises 413 above max_bytes.
+    """
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        with open(path, "wb") as out:
+            while True:
+                chunk = await file.read(PDF_STREAM_CHUNK)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File '{file.filename}' is larger than {max_bytes} bytes."
+                    )
+                digest.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        remove_file(path)
+        raise
+
+    return size, digest.hexdigest()
+
+
+def pdf_file_response(path: str, headers: dict) -> FileResponse:
+    """
+    Streams a PDF from disk in PDF_STREAM_CHUNK pieces and removes `path` afterwards
+    (callers pass a temp file or a private hard link, never a shared file).
+    """
+    response = FileResponse(
+        path,
+        media_type="application/pdf",
+        filename="filtered.pdf",
+        headers=headers,
+        background=BackgroundTask(remove_file, path),
+    )
+    response.chunk_size = PDF_STREAM_CHUNK
+    return response
@@ -0,0 +1,80 @@
+-- Accept / reject topic proposals in one transactional call.
+--
+-- Called from services/supabase_service.py through
+--   supabase.rpc("process_topic_decisions", {"decisions": [...]})
+-- with a JSON array of decisions:
+--   {"tpid": ..., "action": "accept" | "reject", "tid": ..., "teamid": ...,
+--    "topicName": ..., "year": ..., "remark": ...}
+--
+-- Each decision runs in its own subtransaction: either every write of that
+-- decision is applied (topic status, team, project and its four doc rows)
+-- or none is. Returns one result per decision, in input order:
+--   {"tpid": ..., "ok": true, "new_status": "pass" | "not-pass"}
+--   {"tpid": ..., "ok": false, "code": "<sqlstate>", "error": "<message>"}
+--
+-- Apply with the Supabase SQL editor or `psql -f`.
+
+create or replace function public.process_topic_decisions(decisions jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  d jsonb;
+  v_action text;
+  v_status text;
+  v_tpid topic.tpid%type;
+  v_tid team.teacherid%type;
+  v_teamid team.tmid%type;
+  v_topic project.topic%type;
+  v_year project.year%type;
+  v_pid project.pid%type;
+  results jsonb := '[]'::jsonb;
+begin
+  for d in select value from jsonb_array_elements(decisions) loop
+    begin
+      v_action := d->>'action';
+      -- การ assign ค่า text ให้ตัวแปร %type จะแปลงเป็นชนิดของคอลัมน์ให้เอง
+      v_tpid := d->>'tpid';
+      v_tid := d->>'tid';
+      v_teamid := d->>'teamid';
+      v_topic := d->>'topicName';
+      v_year := d->>'year';
+
+      if v_action = 'accept' then
+        v_status := 'pass';
+      elsif v_action = 'reject' then
+        v_status := 'not-pass';
+      else
+        raise exception using errcode = '22023', message = 'Invalid action. Must be ''accept'' or ''reject''.';
+      end if;
+
+      update topic set status = v_status, remark = d->>'remark' where tpid = v_tpid;
+      if not found then
+        raise exception using errcode = 'P0002', message = 'Topic not found or already processed';
+      end if;
+
+      if v_action = 'accept' then
+        update team set name = v_topic, status = 'on-going', teacherid = v_tid where tmid = v_teamid;
+        if not found then
+          raise exception using errcode = 'P0002', message = 'Topic updated, but associated Team not found or failed to update.';
+        end if;
+
+        insert into project (topic, objective, status, year, teamid)
+        values (v_topic, '', 'on-going', v_year, v_teamid)
+        returning pid into v_pid;
+
+        insert into doc (doc_type, status, pid)
+        select doc_type, 'not-submitted', v_pid
+        from unnest(array['proposal', 'slide-proposal', 'thesis', 'slide-final-present']) as doc_type;
+      end if;
+
+      results := results || jsonb_build_array(jsonb_build_object('tpid', d->'tpid', 'ok', true, 'new_status', v_status));
+    exception when others then
+      -- ยกเลิกเฉพาะ decision นี้ (subtransaction) แล้วทำรายการถัดไปต่อ
+      results := results || jsonb_build_array(jsonb_build_object('tpid', d->'tpid', 'ok', false, 'code', sqlstate, 'error', sqlerrm));
+    end;
+  end loop;
+
+  return results;
+end;
+$$;